@@ -1,11 +1,14 @@
 import os
-from flask import Flask, request, abort
+import hmac
+import threading
+from flask import Flask, request, abort, jsonify
 from dotenv import load_dotenv
-from linebot.v3.messaging import MessagingApi, Configuration, ApiClient
 from linebot.v3.webhook import WebhookHandler
 from linebot.v3.webhooks import MessageEvent, TextMessageContent
-from linebot.v3.messaging.models import ReplyMessageRequest, TextMessage
-from logic.chatgpt_logic import askChatgpt
+from logic import profiling
+
+# ※ logic.chatgpt_logic（openai / googleapiclient など）と LINE Messaging API クライアントは
+#    import が重いため、初回メッセージ受信時かウォームアップ時にだけ読み込む
 
 # .envファイルを読み込む
 load_dotenv()
@@ -13,10 +16,66 @@ load_dotenv()
 # Flaskアプリケーション初期化
 app = Flask(__name__)
 
-# LINE Messaging API設定
-configuration = Configuration(access_token=os.getenv("LINE_CHANNEL_ACCESS_TOKEN"))
+# LINE Webhook設定
 handler = WebhookHandler(os.getenv("LINE_CHANNEL_SECRET"))
 
+# ワーカーの準備完了フラグ（/healthz で返す）
+ready = threading.Event()
+
+# 🔥 起動時ウォームアップ（WARMUP_ON_START=1: 完了まで待ってから受付 / background: 裏で実行）
+def startWarmUp():
+    mode = os.getenv("WARMUP_ON_START", "0").strip().lower()
+
+    def run():
+        from logic.warmup import warmUp
+        warmUp()
+        ready.set()
+
+    if mode in ("1", "true", "sync"):
+        run()
+    elif mode == "background":
+        threading.Thread(target=run, name="warmup", daemon=True).start()
+    else:
+        ready.set()
+
+# ⏰ リマインダーエンジン起動（REMINDER_ENABLED=1 のプロセスだけ。複数ワーカー構成では1プロセスに限定すること）
+def reminderEnabled():
+    return os.getenv("REMINDER_ENABLED", "0") == "1"
+
+def startReminders():
+    if reminderEnabled():
+        from logic import reminder
+        reminder.start()
+
+# 📡 Googleカレンダーのプッシュ通知チャネル管理を起動（CALENDAR_WATCH_ENABLED=1 のとき）
+def startCalendarWatch():
+    if os.getenv("CALENDAR_WATCH_ENABLED", "0") == "1":
+        from logic import calendar_watch
+        calendar_watch.start()
+
+# 📰 今日・明日・明後日の予定ダイジェストを裏で作成（DIGEST_ENABLED=1 のとき）
+def startDigests():
+    if os.getenv("DIGEST_ENABLED", "0") == "1":
+        from logic import digest
+        digest.start()
+
+# 📮 作業キュー（WORK_QUEUE_ENABLED=1 のとき、受信したメッセージをディスク上のキューに積んでから処理）
+def workQueueEnabled():
+    return os.getenv("WORK_QUEUE_ENABLED", "0") == "1"
+
+def startQueueWorkers():
+    count = int(os.getenv("WORK_QUEUE_THREADS", "1"))
+    if workQueueEnabled() and count > 0:
+        from logic.message_worker import startWorkers
+        startWorkers(count)
+
+# 🩺 準備完了チェック（ウォームアップが終わるまでは 503）
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    if not ready.is_set():
+        return "WARMING UP", 503
+    return "OK"
+
 # Webhookエンドポイント
 @app.route("/ai_butler_webhook", methods=["POST"])
 def ai_butler_webhook():
@@ -32,26 +91,78 @@ def ai_butler_webhook():
 
     return "OK"
 
+# 📬 Googleカレンダーのプッシュ通知受信（変更があれば差分同期してキャッシュを更新）
+@app.route("/calendar_notifications", methods=["POST"])
+def calendar_notifications():
+    from logic import calendar_watch
+
+    status = calendar_watch.handleNotification(request.headers)
+    return "", status
+
+# 🔬 プロファイリングの管理（ADMIN_TOKEN を Bearer で渡す。未設定なら 404）
+#    └─ GET：設定と集計（?format=folded|pstats|files）、POST：enabled / sample_rate / slow_ms などを変更
+@app.route("/admin/profiling", methods=["GET", "POST"])
+def admin_profiling():
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {admin_token}"):
+        abort(403)
+
+    if request.method == "POST":
+        try:
+            return jsonify(profiling.configure(**(request.get_json(silent=True) or request.form.to_dict())))
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+    fmt = request.args.get("format")
+    if fmt:
+        return profiling.aggregate(fmt, int(request.args.get("limit", "40"))), 200, {"Content-Type": "text/plain; charset=utf-8"}
+    return jsonify(profiling.getSettings())
+
 # LINEメッセージ受信処理
 @handler.add(MessageEvent, message=TextMessageContent)
+@profiling.profiled("handleMessage")
 def handleMessage(event):
     user_message = event.message.text
     print("✅ メッセージイベント発火！ 📩", user_message)
 
+    user_id = getattr(event.source, "user_id", None)
+
+    # 「リマインダー登録」「リマインダー解除」はその場で通知先を更新して返信
+    if reminderEnabled():
+        from logic import reminder
+        subscription_reply = reminder.handleSubscription(user_id, user_message)
+        if subscription_reply:
+            from logic.message_worker import replyText
+            replyText(event.reply_token, subscription_reply)
+            return
+
+    # キューに書き込めた時点で受付完了（処理はワーカーが行い、落ちても再取得される）
+    if workQueueEnabled():
+        from logic import work_queue
+        work_queue.enqueue(
+            {"text": user_message, "reply_token": event.reply_token, "user_id": user_id},
+            dedupe_key=getattr(event, "webhook_event_id", None) or event.message.id
+        )
+        return
+
+    from logic.chatgpt_logic import askChatgpt
+    from logic.message_worker import replyText
+
     try:
-        reply_text = askChatgpt(user_message)
+        reply_text = askChatgpt(user_message, user_id=user_id)
         print("🧠 応答内容：", reply_text)
     except Exception as error:
         reply_text = f"応答処理エラー: {error}"
 
-    with ApiClient(configuration) as api_client:
-        messaging_api = MessagingApi(api_client)
-        messaging_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text=reply_text)]
-            )
-        )
+    replyText(event.reply_token, reply_text)
+
+startWarmUp()
+startReminders()
+startCalendarWatch()
+startDigests()
+startQueueWorkers()
 
 # Flaskサーバ起動
 if __name__ == "__main__":
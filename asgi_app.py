@@ -0,0 +1,136 @@
+import os
+import asyncio
+from dotenv import load_dotenv
+
+# 🌀 AI執事の ASGI 版 Webhook サーバ（app.py の非同期版）
+#    └─ 受信したイベントは署名検証後すぐに 200 を返し、処理はイベントループ上のタスクで並行実行する
+#       OpenAI は AsyncOpenAI、Google Calendar / Tasks は httpx の非同期REST、LINE は AsyncMessagingApi を使う
+#    起動例：uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+# .envファイルを読み込む
+load_dotenv()
+
+_parser = None
+_line_api_client = None
+_messaging_api = None
+_inflight = set()
+
+# 🔌 起動時：Webhookパーサと LINE の非同期クライアントを用意（プロセスで1つを使い回す）
+async def startup():
+    global _parser, _line_api_client, _messaging_api
+    from linebot.v3 import WebhookParser
+    from linebot.v3.messaging import AsyncApiClient, AsyncMessagingApi, Configuration
+
+    _parser = WebhookParser(os.getenv("LINE_CHANNEL_SECRET"))
+    configuration = Configuration(access_token=os.getenv("LINE_CHANNEL_ACCESS_TOKEN"))
+    _line_api_client = AsyncApiClient(configuration)
+    _messaging_api = AsyncMessagingApi(_line_api_client)
+
+    # 予定ダイジェスト（DIGEST_ENABLED=1 のとき、作成はスレッドで行う）
+    if os.getenv("DIGEST_ENABLED", "0") == "1":
+        from logic import digest
+        digest.start()
+    print("✅ ASGI版 起動完了")
+
+# 🔌 終了時：処理中のメッセージを待ってから接続を閉じる
+async def shutdown():
+    from logic.async_google import closeHttpClient
+
+    if _inflight:
+        print(f"⏳ 処理中のメッセージ {len(_inflight)} 件の完了を待機します")
+        await asyncio.gather(*_inflight, return_exceptions=True)
+    await closeHttpClient()
+    if _line_api_client is not None:
+        await _line_api_client.close()
+
+# 📩 LINEメッセージ1件を処理して返信
+async def handleMessage(event):
+    from logic.async_logic import askChatgptAsync
+    from logic.line_client import splitReply
+    from linebot.v3.messaging.models import ReplyMessageRequest, TextMessage
+
+    user_message = event.message.text
+    print("✅ メッセージイベント発火！ 📩", user_message)
+
+    try:
+        reply_text = await askChatgptAsync(user_message, user_id=getattr(event.source, "user_id", None))
+        print("🧠 応答内容：", reply_text)
+    except Exception as error:
+        reply_text = f"応答処理エラー: {error}"
+
+    try:
+        await _messaging_api.reply_message(
+            ReplyMessageRequest(
+                reply_token=event.reply_token,
+                messages=[TextMessage(text=chunk) for chunk in splitReply(reply_text)]   # 長い応答は最大5通に分割
+            )
+        )
+    except Exception as error:
+        print("❌ 返信エラー：", error)
+
+# 🧵 バックグラウンドタスクとして起動（参照を保持してGCされないようにする）
+def _spawn(coroutine):
+    task = asyncio.create_task(coroutine)
+    _inflight.add(task)
+    task.add_done_callback(_inflight.discard)
+
+async def _readBody(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def _respond(send, status, text):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8")]
+    })
+    await send({"type": "http.response.body", "body": text.encode("utf-8")})
+
+# Webhookエンドポイント
+async def aiButlerWebhook(scope, receive, send):
+    from linebot.v3.webhooks import MessageEvent, TextMessageContent
+
+    headers = dict(scope.get("headers", []))
+    line_signature = headers.get(b"x-line-signature", b"").decode()
+    request_body = (await _readBody(receive)).decode("utf-8")
+    print("📦 Webhook受信ボディ：", request_body)
+
+    try:
+        events = _parser.parse(request_body, line_signature)
+    except Exception as error:
+        print("❌ Webhook handling failed:", error)
+        await _respond(send, 400, "Bad Request")
+        return
+
+    for event in events:
+        if isinstance(event, MessageEvent) and isinstance(event.message, TextMessageContent):
+            _spawn(handleMessage(event))
+
+    await _respond(send, 200, "OK")
+
+# 🚏 ASGI エントリポイント
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/ai_butler_webhook" and scope["method"] == "POST":
+        await aiButlerWebhook(scope, receive, send)
+    elif scope["path"] == "/healthz" and scope["method"] == "GET":
+        await _respond(send, 200 if _parser is not None else 503, "OK" if _parser is not None else "STARTING")
+    else:
+        await _respond(send, 404, "Not Found")
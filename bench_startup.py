@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# ⏱️ コールドスタート計測
+#    ・import: 新しい Python プロセスで `import app` にかかる時間
+#    ・first_request: 同じプロセスで初回メッセージ処理に必要な準備（重いimport＋クライアント生成）にかかる時間
+#      --live を付けると実際に askChatgpt を1回呼び出して計測する（OpenAI / Google API に接続します）
+#    しきい値を超えたら終了コード1を返すので、CIなどで退行検知に使える
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import app
+print(round((time.perf_counter() - started) * 1000, 1))
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import os, sys, time
+import app
+started = time.perf_counter()
+if os.getenv("BENCH_LIVE") == "1":
+    from logic.chatgpt_logic import askChatgpt
+    askChatgpt(os.getenv("BENCH_MESSAGE", "今日の予定を教えて"))
+else:
+    os.environ["WARMUP_NETWORK"] = "0"
+    from logic.warmup import warmUp
+    warmUp()
+print(round((time.perf_counter() - started) * 1000, 1))
+"""
+
+def runSnippet(snippet, env):
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    # ログ出力の最終行が計測値
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="AI執事のコールドスタート計測")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値を採用）")
+    parser.add_argument("--live", action="store_true", help="初回リクエストを実際のAPI呼び出しで計測する")
+    parser.add_argument("--message", default="今日の予定を教えて", help="--live 時に送るメッセージ")
+    parser.add_argument("--max-import-ms", type=float, help="import 時間の上限（ms）")
+    parser.add_argument("--max-first-request-ms", type=float, help="初回リクエスト準備時間の上限（ms）")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARMUP_ON_START="0", BENCH_MESSAGE=args.message)
+    if args.live:
+        env["BENCH_LIVE"] = "1"
+
+    import_ms = [runSnippet(IMPORT_SNIPPET, env) for _ in range(args.runs)]
+    first_ms = [runSnippet(FIRST_REQUEST_SNIPPET, env) for _ in range(args.runs)]
+
+    report = {
+        "import_ms": statistics.median(import_ms),
+        "first_request_ms": statistics.median(first_ms),
+        "runs": args.runs,
+        "live": args.live
+    }
+    print(json.dumps(report, ensure_ascii=False))
+
+    failed = False
+    if args.max_import_ms is not None and report["import_ms"] > args.max_import_ms:
+        print(f"❌ import 時間が上限を超えました：{report['import_ms']}ms > {args.max_import_ms}ms")
+        failed = True
+    if args.max_first_request_ms is not None and report["first_request_ms"] > args.max_first_request_ms:
+        print(f"❌ 初回リクエスト準備時間が上限を超えました：{report['first_request_ms']}ms > {args.max_first_request_ms}ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
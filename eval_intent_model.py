@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+import zlib
+import argparse
+from collections import Counter
+
+# 🧪 意図分類モデル（models/intent_model.json）の評価
+#    └─ fixtures/intent_corpus.jsonl の評価用の分（学習に使っていない約2割）で
+#       正解率・しきい値以上の件数（ChatGPT を呼ばずに済む割合）とその正解率・1件あたりの判定時間（p50/p99）を出力する
+#    例：python eval_intent_model.py
+#        python eval_intent_model.py --split all --threshold 0.8
+
+def loadCorpus(path):
+    with open(path) as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+# ✂️ 学習用・評価用の分け方（文の crc32 で決めるので、コーパスに追記しても既存の文の割り当ては変わらない）
+def isHoldout(text, ratio=5):
+    return zlib.crc32(text.encode("utf-8")) % ratio == 0
+
+def splitCorpus(cases, split):
+    if split == "all":
+        return cases
+    holdout = split == "holdout"
+    return [case for case in cases if isHoldout(case["text"]) == holdout]
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+# 📊 正解率・カバー率・判定時間を集計
+def evaluate(model, cases, threshold):
+    correct = confident = confident_correct = 0
+    latencies = []
+    mistakes = Counter()
+
+    for case in cases:
+        started = time.perf_counter()
+        label, confidence = model.predict(case["text"])
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+
+        if label == case["label"]:
+            correct += 1
+        else:
+            mistakes[(case["label"], label)] += 1
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += label == case["label"]
+
+    total = len(cases) or 1
+    return {
+        "cases": len(cases),
+        "accuracy": round(correct / total, 3),
+        "threshold": threshold,
+        "coverage": round(confident / total, 3),
+        "confident_accuracy": round(confident_correct / confident, 3) if confident else None,
+        "p50_us": round(percentile(latencies, 0.5), 1) if latencies else None,
+        "p99_us": round(percentile(latencies, 0.99), 1) if latencies else None,
+        "mistakes": [f"{expected} → {predicted}: {count}" for (expected, predicted), count in mistakes.most_common(10)]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="意図分類モデルの評価")
+    parser.add_argument("--corpus", default="fixtures/intent_corpus.jsonl")
+    parser.add_argument("--model", help="モデルファイル（省略時は INTENT_MODEL_PATH / models/intent_model.json）")
+    parser.add_argument("--split", default="holdout", choices=["holdout", "train", "all"])
+    parser.add_argument("--threshold", type=float, help="確信度のしきい値（省略時は INTENT_MODEL_THRESHOLD）")
+    parser.add_argument("--min-accuracy", type=float, default=0.0, help="正解率がこれ未満なら終了コード1")
+    args = parser.parse_args()
+
+    from logic import intent_model
+
+    model = intent_model.IntentModel.load(args.model or intent_model.modelPath())
+    threshold = intent_model.threshold() if args.threshold is None else args.threshold
+    result = evaluate(model, splitCorpus(loadCorpus(args.corpus), args.split), threshold)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if result["accuracy"] < args.min_accuracy:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+from dotenv import load_dotenv
+
+# 🧪 プロンプトのバージョン比較（オフライン評価）
+#    └─ fixtures/prompt_corpus.jsonl の各入力を指定バージョンのプロンプトで ChatGPT に投げ、
+#       パース結果の正解率・平均トークン数・レイテンシ（p50/p95）をバージョンごとに出力する
+#    例：python eval_prompts.py --versions v1,v2
+#        python eval_prompts.py --prompt event --versions v2 --dry-run
+
+load_dotenv()
+
+def loadCorpus(path, prompt_name=None):
+    with open(path) as corpus_file:
+        cases = [json.loads(line) for line in corpus_file if line.strip()]
+    return [case for case in cases if prompt_name in (None, case["prompt"])]
+
+# ✅ パース結果が期待値と一致するか
+def isCorrect(prompt_name, content, expected):
+    from logic.chatgpt_logic import parseEventDetails, parseTaskTitle, parseTaskDetails, parseOperations
+
+    if prompt_name == "event":
+        parsed = parseEventDetails(content, require_time=True)
+    elif prompt_name == "event_title":
+        parsed = parseEventDetails(content, require_time=False)
+    elif prompt_name == "task_title":
+        parsed = parseTaskTitle(content)
+    elif prompt_name == "task_details":
+        parsed = parseTaskDetails(content)
+        if parsed.get("due"):
+            parsed["due"] = parsed["due"][:10]
+    elif prompt_name == "operations":
+        return len(parseOperations(content)) == expected["count"]
+    else:
+        return False
+
+    return all(parsed.get(key) == value for key, value in expected.items())
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+def main():
+    parser = argparse.ArgumentParser(description="プロンプトのバージョン比較")
+    parser.add_argument("--corpus", default="fixtures/prompt_corpus.jsonl")
+    parser.add_argument("--prompt", help="対象のプロンプト名（省略時は全件）")
+    parser.add_argument("--versions", default="v1,v2", help="比較するバージョン（カンマ区切り）")
+    parser.add_argument("--dry-run", action="store_true", help="API を呼ばず、システムプロンプトの長さだけ比較する")
+    args = parser.parse_args()
+
+    from logic.prompts import PROMPTS, buildRequest, recordUsage
+
+    cases = loadCorpus(args.corpus, args.prompt)
+    versions = [v.strip() for v in args.versions.split(",") if v.strip()]
+    client = None
+    if not args.dry_run:
+        from logic.chatgpt_logic import getOpenAIClient
+        client = getOpenAIClient()
+
+    report = {}
+    for version in versions:
+        for case in cases:
+            if version not in PROMPTS[case["prompt"]]:
+                continue
+            key = f"{case['prompt']}/{version}"
+            row = report.setdefault(key, {"cases": 0, "correct": 0, "system_chars": 0,
+                                          "prompt_tokens": [], "completion_tokens": [], "latency_ms": []})
+            request, _ = buildRequest(case["prompt"], case["input"], version=version, today=case["today"])
+            row["cases"] += 1
+            row["system_chars"] = len(request["messages"][0]["content"])
+            if args.dry_run:
+                continue
+
+            started = time.perf_counter()
+            response = client.chat.completions.create(**request)
+            record = recordUsage(case["prompt"], version, response, (time.perf_counter() - started) * 1000)
+            content = response.choices[0].message.content
+            try:
+                correct = isCorrect(case["prompt"], content, case["expected"])
+            except ValueError:
+                correct = False
+            row["correct"] += int(correct)
+            row["prompt_tokens"].append(record["prompt_tokens"])
+            row["completion_tokens"].append(record["completion_tokens"])
+            row["latency_ms"].append(record["latency_ms"])
+            if not correct:
+                print(f"❌ {key}: {case['input']} → {content}", file=sys.stderr)
+
+    for key, row in sorted(report.items()):
+        summary = {"cases": row["cases"], "system_chars": row["system_chars"]}
+        if row["latency_ms"]:
+            summary.update({
+                "accuracy": round(row["correct"] / row["cases"], 3),
+                "avg_prompt_tokens": round(statistics.mean(row["prompt_tokens"]), 1),
+                "avg_completion_tokens": round(statistics.mean(row["completion_tokens"]), 1),
+                "p50_latency_ms": percentile(row["latency_ms"], 0.5),
+                "p95_latency_ms": percentile(row["latency_ms"], 0.95)
+            })
+        print(key, json.dumps(summary, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
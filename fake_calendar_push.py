@@ -0,0 +1,52 @@
+import json
+import argparse
+import urllib.error
+import urllib.request
+
+# 🧪 Googleカレンダーのプッシュ通知を手元で再現するスクリプト
+#    └─ calendar_watch.json に保存されたチャネル情報（または引数）を使い、
+#       Google と同じ X-Goog-* ヘッダーで /calendar_notifications に POST する
+#    例：python fake_calendar_push.py --state exists
+#        python fake_calendar_push.py --state sync --url http://localhost:5000/calendar_notifications
+
+def main():
+    parser = argparse.ArgumentParser(description="カレンダー変更通知のローカル送信")
+    parser.add_argument("--url", default="http://localhost:5000/calendar_notifications")
+    parser.add_argument("--state", default="exists", choices=["sync", "exists", "not_exists"])
+    parser.add_argument("--state-file", default="calendar_watch.json", help="チャネル情報の保存ファイル")
+    parser.add_argument("--calendar-id", help="保存ファイル内のどのカレンダーのチャネルを使うか（省略時は先頭）")
+    parser.add_argument("--channel-id", help="チャネルID（保存ファイルより優先）")
+    parser.add_argument("--resource-id", help="リソースID（保存ファイルより優先）")
+    parser.add_argument("--token", help="チャネルトークン（保存ファイルより優先）")
+    parser.add_argument("--message-number", type=int, default=1)
+    args = parser.parse_args()
+
+    channel = {}
+    try:
+        with open(args.state_file) as state_file:
+            channels = json.load(state_file)
+        calendar_id = args.calendar_id or next(iter(channels), None)
+        channel = channels.get(calendar_id, {})
+    except FileNotFoundError:
+        calendar_id = args.calendar_id
+
+    headers = {
+        "X-Goog-Channel-ID": args.channel_id or channel.get("id", ""),
+        "X-Goog-Channel-Token": args.token or channel.get("token", ""),
+        "X-Goog-Channel-Expiration": "Fri, 01 Jan 2100 00:00:00 GMT",
+        "X-Goog-Resource-ID": args.resource_id or channel.get("resource_id", ""),
+        "X-Goog-Resource-URI": f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events?alt=json",
+        "X-Goog-Resource-State": args.state,
+        "X-Goog-Message-Number": str(args.message_number),
+        "Content-Length": "0"
+    }
+
+    request = urllib.request.Request(args.url, data=b"", headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            print(f"✅ {response.status} {args.state} → {args.url}")
+    except urllib.error.HTTPError as error:
+        print(f"❌ {error.code} {args.state} → {args.url}")
+
+if __name__ == "__main__":
+    main()
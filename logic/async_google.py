@@ -0,0 +1,208 @@
+import os
+import asyncio
+from datetime import timedelta
+from urllib.parse import quote
+from logic import google_client
+from logic import calendar_utils
+from logic import context_store
+from logic import digest
+from logic import sync_utils
+from logic.calendar_utils import CALENDAR_SCOPES, getDayWindow, formatSchedule, getCalendarIds, mergeEvents
+from logic.task_utils import TASKS_SCOPES, getTasklistNames, formatTaskList, formatCompletedTasks, formatTasksWithDue
+
+# 🌐 Google Calendar / Tasks の REST API を httpx.AsyncClient で直接呼ぶ非同期版
+#    └─ googleapiclient は同期専用なので、ASGI版（asgi_app.py）ではこちらを使う
+#       認証情報・整形処理は同期版（google_client / calendar_utils / task_utils）と共通
+
+CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+TASKS_API = "https://tasks.googleapis.com/tasks/v1"
+
+_client = None
+_tasklist_ids = {}          # タスクリスト名の組 → ID一覧（プロセス内でキャッシュ）
+
+# 🔌 プロセス共通の AsyncClient（keep-alive・HTTP接続プールを使い回す）
+def getHttpClient():
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(15.0, connect=5.0))
+    return _client
+
+async def closeHttpClient():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# 🔐 アクセストークン付きヘッダー（リフレッシュが必要なときだけスレッドで実行）
+async def _authHeaders(scopes):
+    creds = google_client.getCachedCredentials(scopes)
+    if creds is None or not creds.valid:
+        creds = await asyncio.to_thread(google_client.getCredentials, scopes)
+    return {"Authorization": f"Bearer {creds.token}"}
+
+async def _request(method, url, scopes, **kwargs):
+    headers = await _authHeaders(scopes)
+    response = await getHttpClient().request(method, url, headers=headers, **kwargs)
+    response.raise_for_status()
+    return response.json() if response.content else {}
+
+def _calendarId():
+    calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+    if not calendar_id:
+        raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
+    return quote(calendar_id, safe="")
+
+# 📆 任意日数後の予定を取得（非同期版：対象の全カレンダーを同時に取得し、開始時刻順にマージ）
+async def getScheduleByOffset(day_offset: int):
+    cached = digest.getDigest(day_offset)
+    if cached is not None:
+        print(f"📰 予定ダイジェストから応答：{day_offset}日後")
+        return cached
+
+    start, end = getDayWindow(day_offset)
+    calendar_ids = getCalendarIds()
+
+    async def fetch(calendar_id):
+        result = await _request(
+            "GET", f"{CALENDAR_API}/calendars/{quote(calendar_id, safe='')}/events", CALENDAR_SCOPES,
+            params={"timeMin": start, "timeMax": end, "singleEvents": "true", "orderBy": "startTime"}
+        )
+        return result.get("items", [])
+
+    results = await asyncio.gather(*(fetch(cid) for cid in calendar_ids), return_exceptions=True)
+    lists = []
+    for calendar_id, result in zip(calendar_ids, results):
+        if isinstance(result, Exception):
+            print(f"❌ 同時取得エラー（{calendar_id}）：", result)
+            continue
+        lists.append((calendar_id, result))
+    if not lists:
+        raise results[0]
+    return formatSchedule([event for _, event in mergeEvents(lists)], day_offset)
+
+# 📅 予定を登録（非同期版：同時間・同タイトルのイベントがあるときだけ中止）
+async def registerSchedule(title, start_time):
+    # FreeBusy モードの重なり確認・インデックス更新は同期版に任せる
+    if calendar_utils.getConflictMode() == "freebusy":
+        return await asyncio.to_thread(calendar_utils.registerSchedule, title, start_time)
+
+    try:
+        from pytz import timezone
+        jst = timezone("Asia/Tokyo")
+        if start_time.tzinfo is None:
+            start_time = jst.localize(start_time)
+        end_time = start_time + timedelta(minutes=30)
+
+        events_url = f"{CALENDAR_API}/calendars/{_calendarId()}/events"
+        existing = await _request(
+            "GET", events_url, CALENDAR_SCOPES,
+            params={"timeMin": start_time.isoformat(), "timeMax": end_time.isoformat(),
+                    "singleEvents": "true", "orderBy": "startTime"}
+        )
+        for ev in existing.get("items", []):
+            if ev.get("summary") == title:
+                print("⚠️ 同タイトル・同時間の予定が既にあります")
+                return "その時間には同じ予定が既にあります。別の時間を指定してください。"
+
+        created = await _request("POST", events_url, CALENDAR_SCOPES, json={
+            "summary": title,
+            "start": {"dateTime": start_time.isoformat(), "timeZone": "Asia/Tokyo"},
+            "end":   {"dateTime": end_time.isoformat(),   "timeZone": "Asia/Tokyo"}
+        })
+        print("✅ 登録イベント情報：", created)
+        # 予定キャッシュ・ダイジェストなどのリスナーへ通知（同期版 registerSchedule と同じ）
+        sync_utils.publishEvents(os.getenv("GOOGLE_CALENDAR_ID"), [created])
+        context_store.remember("event", created.get("id"), os.getenv("GOOGLE_CALENDAR_ID"), title,
+                               start_time=start_time.isoformat(), end_time=end_time.isoformat())
+        return f"予定『{title}』を登録しました。"
+
+    except Exception as error:
+        print("❌ 登録エラー：", error)
+        return "予定の登録中にエラーが発生しました。"
+
+# ✅ 対象のタスクリスト（GOOGLE_TASKLISTS）のIDを検索（プロセス内でキャッシュ、先頭が登録先）
+async def getTasklistIds():
+    names = tuple(getTasklistNames())
+    if names in _tasklist_ids:
+        return _tasklist_ids[names]
+
+    results = await _request("GET", f"{TASKS_API}/users/@me/lists", TASKS_SCOPES)
+    by_title = {}
+    for item in results.get("items", []):
+        by_title.setdefault(item["title"].strip(), item["id"])
+    if names[0] not in by_title:
+        raise ValueError(f"『{names[0]}』が見つかりませんでした。")
+
+    _tasklist_ids[names] = [by_title[name] for name in names if name in by_title]
+    return _tasklist_ids[names]
+
+async def getDefaultTasklistId():
+    return (await getTasklistIds())[0]
+
+# 🌐 全タスクリストのタスクを同時に取得（同じIDは1件に。既定の20件で切れないよう100件ずつページをたどる）
+async def _listTasks(show_completed):
+    async def fetch(tasklist_id):
+        items, page_token = [], None
+        while True:
+            params = {"showCompleted": "true" if show_completed else "false", "maxResults": "100"}
+            if page_token:
+                params["pageToken"] = page_token
+            result = await _request("GET", f"{TASKS_API}/lists/{tasklist_id}/tasks", TASKS_SCOPES, params=params)
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    tasklist_ids = await getTasklistIds()
+    results = await asyncio.gather(*(fetch(tasklist_id) for tasklist_id in tasklist_ids))
+
+    tasks, seen = [], set()
+    for items in results:
+        for task in items:
+            if task.get("id") not in seen:
+                seen.add(task.get("id"))
+                tasks.append(task)
+    return tasks
+
+# ✅ タスク登録（非同期版）
+async def registerTask(title):
+    try:
+        tasklist_id = await getDefaultTasklistId()
+        result = await _request("POST", f"{TASKS_API}/lists/{tasklist_id}/tasks", TASKS_SCOPES,
+                                json={"title": title})
+        print("✅ 登録タスク:", result.get("title"))
+        sync_utils.publishTasks(tasklist_id, [result])
+        context_store.remember("task", result.get("id"), tasklist_id, title)
+        return f"タスク『{title}』を登録しました。"
+
+    except Exception as e:
+        print(f"❌ タスク登録エラー：{e}")
+        return f"タスク登録中にエラーが発生しました。エラー詳細: {e}"
+
+# ✅ タスク一覧（非同期版）
+async def listTasks():
+    try:
+        # 未完了だけ取得（完了済みがたまっても取得件数が増えない）
+        return formatTaskList(await _listTasks(show_completed=False))
+    except Exception as e:
+        print(f"❌ タスク一覧取得エラー：{e}")
+        return f"タスクの一覧取得中にエラーが発生しました。エラー詳細: {e}"
+
+# ✅ 完了済みタスク一覧（非同期版）
+async def listCompletedTasks():
+    try:
+        return formatCompletedTasks(await _listTasks(show_completed=True))
+    except Exception as e:
+        print("❌ 完了済みタスク取得エラー：", e)
+        return "完了済みタスク一覧の取得中にエラーが発生しました。"
+
+# ✅ 期限付きタスク一覧（非同期版）
+async def listTasksWithDue():
+    try:
+        tasks = await _listTasks(show_completed=False)
+        tasks.sort(key=lambda task: task.get("due") or "")
+        return formatTasksWithDue(tasks)
+    except Exception as e:
+        print("❌ 期限付きタスク一覧取得エラー：", e)
+        return "期限付きタスク一覧の取得中にエラーが発生しました。"
@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime
+from logic import async_google
+from logic import context_store
+from logic import prompts
+from logic import recurrence
+from logic import intent_model
+from logic.chatgpt_logic import (
+    actions,
+    askChatgpt,
+    detectExplicitType,
+    classifyIntent,
+    isMultiCommand,
+    handleFollowUp,
+    parseEventDetails,
+    parseTaskTitle
+)
+
+# ⚡ askChatgpt の非同期版（ASGI版 asgi_app.py から利用）
+#    └─ 振り分けは chatgpt_logic の detectExplicitType / classifyIntent をそのまま使い、
+#       よく使う処理（予定の表示・登録、タスクの登録・一覧、雑談）は AsyncOpenAI と非同期RESTで処理する
+#       それ以外（削除・変更・完了・複数コマンドなど）は同期版 askChatgpt をスレッドで実行する
+
+_async_openai_client = None
+_async_openai_lock = threading.Lock()
+
+# 🤖 AsyncOpenAI クライアント（プロセスで1つ）
+def getAsyncOpenAIClient():
+    global _async_openai_client
+    if _async_openai_client is None:
+        with _async_openai_lock:
+            if _async_openai_client is None:
+                from openai import AsyncOpenAI
+                _async_openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _async_openai_client
+
+async def _timedCall(name, version, request, hedge=False):
+    started = time.perf_counter()
+    response = await getAsyncOpenAIClient().chat.completions.create(**request)
+    prompts.recordUsage(name, version, response, (time.perf_counter() - started) * 1000, hedge=hedge)
+    return response.choices[0].message.content
+
+# 🤖 レジストリのプロンプトで ChatGPT を呼び出す（非同期版、トークン数・所要時間は同期版と同じく記録）
+#    └─ ヘッジの条件・予算は同期版と共通。非同期版では負けた側のリクエストを実際にキャンセルする
+async def _complete(name, user_input):
+    request, version = prompts.buildRequest(name, user_input)
+    if not prompts.hedgeEnabled(name):
+        return await _timedCall(name, version, request)
+
+    prompts.earnHedgeBudget()
+    primary = asyncio.create_task(_timedCall(name, version, request))
+    done, _ = await asyncio.wait({primary}, timeout=prompts.hedgeDelay(name, version))
+    if done or not prompts.takeHedgeBudget():
+        return await primary
+
+    print(f"🪁 応答が遅いためヘッジを送信：{name}/{version}")
+    pending = {primary, asyncio.create_task(_timedCall(name, version, request, True))}
+    content, error = None, None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                if prompts.isValidContent(name, version, task.result()):
+                    return task.result()
+                content = task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    if content is None and error is not None:
+        raise error
+    return content
+
+# 📤 予定のタイトルと開始時刻を抽出（非同期版）
+async def extractNewEventDetailsAsync(user_input, require_time=True):
+    content = await _complete("event" if require_time else "event_title", user_input)
+    print("📤 ChatGPTの返答（予定抽出）：", content)
+    return parseEventDetails(content, require_time)
+
+# 📤 タスク名を抽出（非同期版）
+async def extractTaskTitleAsync(user_input):
+    content = await _complete("task_title", user_input)
+    print("📤 ChatGPTの返答（タスク抽出）：", content)
+    return parseTaskTitle(content)
+
+# 🔁 同期版の処理をそのままスレッドで実行する
+async def _fallback(user_message):
+    print("🚩 同期版 askChatgpt へ委譲します")
+    return await asyncio.to_thread(askChatgpt, user_message)
+
+# 📅 予定の表示・登録（削除・変更は同期版へ）
+async def _handleScheduleAsync(user_message):
+    list_verbs = ["教えて", "見せて", "リスト", "一蘭"]
+    if any(v in user_message for v in list_verbs):
+        for word, offset in (("今日", 0), ("明日", 1), ("明後日", 2)):
+            if word in user_message:
+                return await async_google.getScheduleByOffset(offset)
+        return "予定の取得に失敗しました。"
+
+    if any(v in user_message for v in actions['delete'] + actions['update']):
+        return await _fallback(user_message)
+
+    # 繰り返し予定（RRULE 1件で登録）は同期版へ
+    if recurrence.parseRecurrence(user_message):
+        return await _fallback(user_message)
+
+    if any(v in user_message for v in actions['register']):
+        new_event = await extractNewEventDetailsAsync(user_message, require_time=True)
+        start_time = datetime.strptime(new_event["start_time"], "%Y-%m-%d %H:%M:%S")
+        print(f"🚩 予定登録：{new_event['title']} を登録します")
+        return await async_google.registerSchedule(new_event["title"], start_time)
+
+    return "リクエストが理解できませんでした。"
+
+# 🗂️ タスク系 intent の処理（登録・一覧のみ非同期、その他は同期版へ）
+async def _handleTaskActionsAsync(intent, user_message):
+    if intent == "task_register":
+        title = (await extractTaskTitleAsync(user_message)).get("title")
+        return await async_google.registerTask(title) if title else "タスク名が抽出できませんでした。"
+    elif intent == "task_list":
+        return await async_google.listTasks()
+    elif intent == "task_list_completed":
+        return await async_google.listCompletedTasks()
+    elif intent == "task_list_due":
+        return await async_google.listTasksWithDue()
+    return await _fallback(user_message)
+
+# 🎯 メイン処理（非同期版）：振り分けは同期版 askChatgpt と同じ順序
+#    └─ user_id は contextvar に設定され、_fallback のスレッドにも引き継がれる
+async def askChatgptAsync(user_message, user_id=None):
+    token = context_store.bindUser(user_id) if user_id else None
+    try:
+        return await _askChatgptAsync(user_message)
+    finally:
+        if token is not None:
+            context_store.resetUser(token)
+
+async def _askChatgptAsync(user_message):
+    try:
+        if isMultiCommand(user_message):
+            return await _fallback(user_message)
+
+        # 続きの発言は ID 指定の1回の API 呼び出しで済むので、同期版をスレッドで実行
+        if context_store.recall():
+            follow_up = await asyncio.to_thread(handleFollowUp, user_message)
+            if follow_up:
+                return follow_up
+
+        explicit_type = detectExplicitType(user_message)
+        print(f"🚩 explicit_type 判定結果: {explicit_type}")
+
+        if explicit_type == "schedule":
+            return await _handleScheduleAsync(user_message)
+
+        intent = classifyIntent(user_message)
+        print(f"🎯 intent 判定: {intent}")
+
+        if explicit_type == "task":
+            if intent in ("task_register", "task_list", "task_list_completed", "task_list_due"):
+                return await _handleTaskActionsAsync(intent, user_message)
+            return await _fallback(user_message)
+
+        if intent.startswith("schedule+"):
+            return await async_google.getScheduleByOffset(int(intent.split("+")[1]))
+
+        if intent.startswith("task_"):
+            return await _handleTaskActionsAsync(intent, user_message)
+
+        # ローカルの意図分類モデルが一覧表示と判定したら同期版へ（判定はマイクロ秒単位なのでそのまま呼ぶ。変更系は実行しない）
+        label = intent_model.classify(user_message)
+        if label in intent_model.READ_ONLY_LABELS:
+            return await _fallback(user_message)
+
+        print("🚩 fallback → 雑談応答を実行します")
+        return await _complete("free_chat", user_message)
+
+    except Exception as error:
+        print("❌ ChatGPT応答全体エラー：", error)
+        return "申し訳ありません。システムエラーが発生しました。後ほど再度お試しください。"
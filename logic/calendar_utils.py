@@ -1,41 +1,171 @@
 import os
+import time
+import bisect
+import heapq
+import threading
 from datetime import datetime, timedelta
 import pytz
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
 from dateutil.parser import parse
-
-# 🔐 Google API認証情報を取得
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from logic import google_client
+from logic.title_index import TitleIndex, normalizeTitle
+from logic import sync_utils
+from logic import context_store
+from logic import digest
 
 # 📅 Googleカレンダーに予定を登録（30分間の固定枠）
 from pytz import timezone
 
+CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+# 🔐 Google API認証情報を取得
 def getCredentials():
-    token_path = os.getenv("GOOGLE_TOKEN_JSON") or "/home/bepro/projects/ai_butler/token.json"
-    if not token_path:
-        raise ValueError("GOOGLE_TOKEN_JSON が未設定です")
+    return google_client.getCredentials(CALENDAR_SCOPES)
 
-    creds = Credentials.from_authorized_user_file(
-        token_path,
-        scopes=["https://www.googleapis.com/auth/calendar"]
-    )
+# 🧰 Calendar API サービスを取得（接続プールと一緒に使い回し）
+def getCalendarService():
+    return google_client.getService("calendar", "v3", CALENDAR_SCOPES)
+
+# 🧭 重複チェックの方式（title: 同時間帯イベントのタイトル比較 / freebusy: FreeBusy APIで重なりを警告）
+def getConflictMode():
+    mode = (os.getenv("SCHEDULE_CONFLICT_MODE") or "title").strip().lower()
+    return mode if mode in ("title", "freebusy") else "title"
 
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        with open(token_path, "w") as token_file:
-            token_file.write(creds.to_json())
+# 🗂️ FreeBusy の busy 区間インデックス
+#    └─ カレンダーID → {JST日付: (取得時刻, 開始時刻リスト, 終了時刻リスト)}
+#       FreeBusy の busy 区間は重なりのない昇順なので、開始・終了とも二分探索できる
+_busy_index = {}
+_busy_lock = threading.Lock()
 
-    print("✅ GOOGLE_TOKEN_JSON:", token_path)
-    return creds
+# 📚 予定の表示・検索に使うカレンダー一覧（登録先の GOOGLE_CALENDAR_ID が先頭、GOOGLE_CALENDAR_IDS で追加）
+def getCalendarIds():
+    calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+    if not calendar_id:
+        raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
+    extra = os.getenv("GOOGLE_CALENDAR_IDS", "")
+    return list(dict.fromkeys([calendar_id] + [c.strip() for c in extra.split(",") if c.strip()]))
+
+# 📋 FreeBusy で確認するカレンダー一覧（登録先 + 表示対象のカレンダー + GOOGLE_FREEBUSY_CALENDAR_IDS）
+def _busyCalendarIds(calendar_id):
+    extra = os.getenv("GOOGLE_FREEBUSY_CALENDAR_IDS", "")
+    calendar_ids = [calendar_id] + getCalendarIds() + [c.strip() for c in extra.split(",") if c.strip()]
+    return list(dict.fromkeys(calendar_ids))
+
+# 🔗 区間リストを昇順に並べ、重なる区間を結合する
+def _mergeIntervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [s for s, _ in merged], [e for _, e in merged]
+
+# 📡 指定日の busy 区間を取得（キャッシュ切れのカレンダーだけを1回の freebusy.query でまとめて取得）
+def getBusyIntervals(service, calendar_ids, day):
+    ttl = float(os.getenv("FREEBUSY_CACHE_TTL", "60"))
+    now = time.monotonic()
+    result = {}
+    missing = []
+
+    with _busy_lock:
+        for calendar_id in calendar_ids:
+            entry = _busy_index.get(calendar_id, {}).get(day)
+            if entry and now - entry[0] < ttl:
+                result[calendar_id] = entry[1:]
+            else:
+                missing.append(calendar_id)
+
+    if not missing:
+        return result
+
+    jst = timezone("Asia/Tokyo")
+    day_start = jst.localize(datetime(day.year, day.month, day.day))
+    day_end = day_start + timedelta(days=1)
+
+    response = service.freebusy().query(body={
+        "timeMin": day_start.isoformat(),
+        "timeMax": day_end.isoformat(),
+        "timeZone": "Asia/Tokyo",
+        "items": [{"id": calendar_id} for calendar_id in missing]
+    }).execute()
+
+    with _busy_lock:
+        for calendar_id in missing:
+            info = response.get("calendars", {}).get(calendar_id, {})
+            if info.get("errors"):
+                print("⚠️ FreeBusy取得エラー：", calendar_id, info["errors"])
+                result[calendar_id] = ([], [])
+                continue  # エラー結果はキャッシュしない
+
+            starts, ends = _mergeIntervals(
+                (parse(busy["start"]), parse(busy["end"])) for busy in info.get("busy", [])
+            )
+            _busy_index.setdefault(calendar_id, {})[day] = (now, starts, ends)
+            result[calendar_id] = (starts, ends)
+
+    return result
+
+# ⚔️ 指定の時間帯と重なる busy 区間を返す（[(開始, 終了), ...]）
+def findBusyConflicts(service, start_time, end_time, calendar_ids):
+    jst = timezone("Asia/Tokyo")
+    days = sorted({start_time.astimezone(jst).date(), (end_time - timedelta(seconds=1)).astimezone(jst).date()})
+
+    conflicts = []
+    for day in days:
+        for starts, ends in getBusyIntervals(service, calendar_ids, day).values():
+            # 終了 > 開始時刻 かつ 開始 < 終了時刻 の区間だけを二分探索で切り出す
+            first = bisect.bisect_right(ends, start_time)
+            last = bisect.bisect_left(starts, end_time)
+            conflicts.extend(zip(starts[first:last], ends[first:last]))
+
+    return sorted(set(conflicts))
+
+# ➕ 登録直後の予定をインデックスへ反映（再取得せずに次の重複チェックへ活かす）
+def _addBusyInterval(calendar_id, start_time, end_time):
+    jst = timezone("Asia/Tokyo")
+    with _busy_lock:
+        for day in {start_time.astimezone(jst).date(), (end_time - timedelta(seconds=1)).astimezone(jst).date()}:
+            entry = _busy_index.get(calendar_id, {}).get(day)
+            if not entry:
+                continue
+            starts, ends = _mergeIntervals(list(zip(entry[1], entry[2])) + [(start_time, end_time)])
+            _busy_index[calendar_id][day] = (entry[0], starts, ends)
+
+# 🧹 busy 区間インデックスを破棄（カレンダー直接編集や削除・変更のあとに呼ぶ）
+def invalidateBusyCache(calendar_id=None, day=None):
+    with _busy_lock:
+        targets = [calendar_id] if calendar_id else list(_busy_index)
+        for target in targets:
+            if day is None:
+                _busy_index.pop(target, None)
+            else:
+                _busy_index.get(target, {}).pop(day, None)
+
+# 🕒 重なっている区間を「10:00〜10:30」形式の文字列にする
+def _formatConflicts(conflicts):
+    jst = timezone("Asia/Tokyo")
+    return "、".join(
+        f"{start.astimezone(jst).strftime('%H:%M')}〜{end.astimezone(jst).strftime('%H:%M')}"
+        for start, end in conflicts
+    )
+
+# 📝 イベントを登録（id 指定で既に登録済み＝409 なら None。前回の試行で登録できていたもの）
+def _insertEvent(service, calendar_id, event_body):
+    from googleapiclient.errors import HttpError
+    try:
+        return service.events().insert(calendarId=calendar_id, body=event_body).execute()
+    except HttpError as error:
+        if event_body.get("id") and error.resp.status == 409:
+            print("♻️ 前回の試行で登録済みの予定です：", event_body["id"])
+            return None
+        raise
 
 # 📅 Googleカレンダーに予定を登録する関数  
 #    └─ 同時間・同タイトルのイベントがあるとき “だけ” 登録を中止する安全版
+#       SCHEDULE_CONFLICT_MODE=freebusy のときは FreeBusy で重なりを確認し、重なりがあれば警告を添える
 def registerSchedule(title, start_time):
     try:
-        credentials = getCredentials()
-        service = build("calendar", "v3", credentials=credentials)
+        service = getCalendarService()
 
         # --- JST にそろえ、30分枠を計算 -----------------------------------
         jst = timezone("Asia/Tokyo")
@@ -47,21 +177,38 @@ def registerSchedule(title, start_time):
         if not calendar_id:
             raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
 
-        # --- 同時間帯イベント取得（30分幅） -------------------------------
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=start_time.isoformat(),
-            timeMax=end_time.isoformat(),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-        events = events_result.get("items", [])
+        warning = ""
+        check_titles = True
+        # 作業キューからの処理では、再試行で二重登録しないようジョブごとに決まる ID で登録する
+        event_id = context_store.idempotencyId("event", calendar_id, title, start_time.isoformat())
 
-        # ★ タイトルも比較して完全重複だけブロック ------------------------
-        for ev in events:
-            if ev.get("summary") == title:
-                print("⚠️ 同タイトル・同時間の予定が既にあります")
-                return "その時間には同じ予定が既にあります。別の時間を指定してください。"
+        # --- FreeBusy モード：重なりがなければイベント本文は取得しない ------
+        if getConflictMode() == "freebusy":
+            conflicts = findBusyConflicts(service, start_time, end_time, _busyCalendarIds(calendar_id))
+            check_titles = bool(conflicts)
+            if conflicts:
+                print("⚠️ FreeBusyで重なりを検出：", conflicts)
+                warning = f"\n⚠️ 同じ時間帯に別の予定があります（{_formatConflicts(conflicts)}）"
+
+        # --- 同時間帯イベント取得（30分幅） -------------------------------
+        if check_titles:
+            events_result = service.events().list(
+                calendarId=calendar_id,
+                timeMin=start_time.isoformat(),
+                timeMax=end_time.isoformat(),
+                singleEvents=True,
+                orderBy="startTime"
+            ).execute()
+            events = events_result.get("items", [])
+
+            # ★ タイトルも比較して完全重複だけブロック ------------------------
+            for ev in events:
+                if event_id and ev.get("id") == event_id:
+                    print("♻️ 前回の試行で登録済みの予定です：", event_id)
+                    return f"予定『{title}』を登録しました。{warning}"
+                if ev.get("summary") == title:
+                    print("⚠️ 同タイトル・同時間の予定が既にあります")
+                    return "その時間には同じ予定が既にあります。別の時間を指定してください。"
 
         # --- 重複なし → 登録 ----------------------------------------------
         event_body = {
@@ -69,40 +216,35 @@ def registerSchedule(title, start_time):
             "start": {"dateTime": start_time.isoformat(), "timeZone": "Asia/Tokyo"},
             "end":   {"dateTime": end_time.isoformat(),   "timeZone": "Asia/Tokyo"}
         }
-        created = service.events().insert(calendarId=calendar_id, body=event_body).execute()
+        if event_id:
+            event_body["id"] = event_id
+        created = _insertEvent(service, calendar_id, event_body)
+        if created is None:
+            return f"予定『{title}』を登録しました。{warning}"
         print("✅ 登録イベント情報：", created)
+        _addBusyInterval(calendar_id, start_time, end_time)
+        sync_utils.publishEvents(calendar_id, [created])
+        context_store.remember("event", created.get("id"), calendar_id, title,
+                               start_time=start_time.isoformat(), end_time=end_time.isoformat())
 
-        return f"予定『{title}』を登録しました。"
+        return f"予定『{title}』を登録しました。{warning}"
 
     except Exception as error:
         # --- エラー時ログ＆ユーザー向け文言 -------------------------------
         print("❌ 登録エラー：", error)
         return "予定の登録中にエラーが発生しました。"
 
-# 📆 任意日数後の予定を取得
-def getScheduleByOffset(day_offset: int):
-    credentials = getCredentials()
-    service = build("calendar", "v3", credentials=credentials)
-
+# 🗓️ 任意日数後の1日分の取得範囲（JST 0:00〜23:59:59）を返す
+def getDayWindow(day_offset: int):
     jst = pytz.timezone("Asia/Tokyo")
     target_date = datetime.now(jst) + timedelta(days=day_offset)
 
     start = datetime(target_date.year, target_date.month, target_date.day, 0, 0, 0, tzinfo=jst).isoformat()
     end = datetime(target_date.year, target_date.month, target_date.day, 23, 59, 59, tzinfo=jst).isoformat()
+    return start, end
 
-    calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
-    if not calendar_id:
-        raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
-
-    events_result = service.events().list(
-        calendarId=calendar_id,
-        timeMin=start,
-        timeMax=end,
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
-
-    events = events_result.get("items", [])
+# 📝 取得したイベント一覧を返信用の文字列に整形
+def formatSchedule(events, day_offset: int):
     label = {0: "今日", 1: "明日", 2: "明後日"}.get(day_offset, f"{day_offset}日後")
 
     if not events:
@@ -114,7 +256,159 @@ def getScheduleByOffset(day_offset: int):
         result += f"・{start_time}：{event['summary']}\n"
     return result
 
-# 🗑️ 予定を名前と時刻で削除（JSTベースの30日前〜30日後範囲）
+# 🔢 イベントの開始時刻（並べ替え用の UNIX 時刻。終日予定は JST の 0:00）
+def _eventStartKey(event):
+    start = event.get("start", {})
+    if start.get("dateTime"):
+        return parse(start["dateTime"]).timestamp()
+    if start.get("date"):
+        return pytz.timezone("Asia/Tokyo").localize(parse(start["date"])).timestamp()
+    return 0.0
+
+# 🔀 カレンダーごとの開始時刻順リストを k-way マージし、共有カレンダーで重複する同じ予定（iCalUID）を1件にまとめる
+#    └─ lists は [(カレンダーID, イベント一覧), ...]。戻り値は (カレンダーID, イベント) の開始時刻順リスト
+def mergeEvents(lists):
+    streams = [[(calendar_id, event) for event in events] for calendar_id, events in lists]
+    merged, seen = [], set()
+    for calendar_id, event in heapq.merge(*streams, key=lambda pair: _eventStartKey(pair[1])):
+        key = event.get("iCalUID") or event.get("id")
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append((calendar_id, event))
+    return merged
+
+# 🌐 複数カレンダーの指定期間のイベントを同時に取得して開始時刻順にマージ
+#    └─ single_events=False なら繰り返し予定は展開せず、親イベント（recurrence 付き）1件で返す
+def listEventsAcross(time_min, time_max, calendar_ids=None, single_events=True):
+    def fetch(calendar_id):
+        params = {"calendarId": calendar_id, "timeMin": time_min, "timeMax": time_max, "singleEvents": single_events}
+        if single_events:
+            params["orderBy"] = "startTime"
+        events = getCalendarService().events().list(**params).execute().get("items", [])
+        return events if single_events else sorted(events, key=_eventStartKey)
+
+    calendar_ids = calendar_ids or getCalendarIds()
+    results = google_client.fanOut(fetch, calendar_ids)
+    return mergeEvents([(cid, results[cid]) for cid in calendar_ids if cid in results])
+
+# 🗃️ 日別の予定キャッシュ（(カレンダーID, JST日付) → (取得時刻, イベント一覧, イベントID集合)）
+#    └─ プッシュ通知チャネルが有効な間は変更通知が来るまで使い続け（上限 SCHEDULE_CACHE_MAX_AGE 秒）、
+#       無効なときは SCHEDULE_CACHE_TTL 秒（既定0＝毎回取得）だけ使う
+#       _schedule_changed は変更通知の時刻（(カレンダーID, JST日付) → monotonic。日付不明の削除通知は日付 None）
+#       取得中に変更通知が来た日は、取得結果をキャッシュしない
+_schedule_cache = {}
+_schedule_changed = {}
+_schedule_lock = threading.Lock()
+
+def _scheduleCacheAge(calendar_id):
+    from logic.calendar_watch import isWatchActive
+    if isWatchActive(calendar_id):
+        return float(os.getenv("SCHEDULE_CACHE_MAX_AGE", "3600"))
+    return float(os.getenv("SCHEDULE_CACHE_TTL", "0"))
+
+# 📥 1日分のイベント一覧を取得（キャッシュが有効ならAPIを呼ばない）
+def getEventsForDay(service, calendar_id, day_offset: int):
+    jst = pytz.timezone("Asia/Tokyo")
+    key = (calendar_id, (datetime.now(jst) + timedelta(days=day_offset)).date())
+    max_age = _scheduleCacheAge(calendar_id)
+
+    with _schedule_lock:
+        entry = _schedule_cache.get(key)
+    if entry and time.monotonic() - entry[0] < max_age:
+        print(f"🗃️ 予定キャッシュを使用：{key[1]}")
+        return entry[1]
+
+    start, end = getDayWindow(day_offset)
+    fetched_at = time.monotonic()
+    events = service.events().list(
+        calendarId=calendar_id,
+        timeMin=start,
+        timeMax=end,
+        singleEvents=True,
+        orderBy="startTime"
+    ).execute().get("items", [])
+
+    if max_age > 0:
+        with _schedule_lock:
+            changed_at = max(_schedule_changed.get(key, float("-inf")),
+                             _schedule_changed.get((calendar_id, None), float("-inf")))
+            if changed_at < fetched_at:
+                _schedule_cache[key] = (fetched_at, events, {event.get("id") for event in events})
+            else:
+                print(f"🗃️ 取得中に変更通知があったためキャッシュしません：{key[1]}")
+    return events
+
+# 📆 イベントが掛かる JST 日付の一覧（終日予定は終了日を含まない、最大31日分）
+def _eventDates(event):
+    jst = pytz.timezone("Asia/Tokyo")
+    bounds = []
+    for edge in ("start", "end"):
+        value = event.get(edge, {})
+        if value.get("dateTime"):
+            moment = parse(value["dateTime"]).astimezone(jst)
+            bounds.append((moment - timedelta(seconds=1)).date() if edge == "end" else moment.date())
+        elif value.get("date"):
+            day = parse(value["date"]).date()
+            bounds.append(day - timedelta(days=1) if edge == "end" else day)
+    if not bounds:
+        return set()
+
+    first, last = bounds[0], max(bounds)
+    return {first + timedelta(days=i) for i in range(min((last - first).days, 30) + 1)}
+
+# 🧹 変更されたイベントが掛かる日だけ、予定キャッシュ・busy 区間・タイトル索引を更新（sync_utils のリスナー）
+def onEventsChanged(calendar_id, events):
+    stale = set()
+    now = time.monotonic()
+    with _schedule_lock:
+        for event in events:
+            days = _eventDates(event)
+            if not days:
+                # 日時のない通知（削除など）は、取得中のどの日に掛かるか分からないのでカレンダー全体を変更扱いにする
+                _schedule_changed[(calendar_id, None)] = now
+            # 削除通知には日時が含まれないので、そのイベントを含むキャッシュ日も対象にする
+            days.update(day for (cid, day), entry in _schedule_cache.items()
+                        if cid == calendar_id and event.get("id") in entry[2])
+            for day in days:
+                _schedule_changed[(calendar_id, day)] = now
+                if _schedule_cache.pop((calendar_id, day), None) is not None:
+                    stale.add(day)
+                invalidateBusyCache(calendar_id, day)
+
+        # 取得中の分との比較にしか使わないので、古い通知時刻は捨てる
+        for key in [k for k, changed_at in _schedule_changed.items() if now - changed_at > 3600]:
+            del _schedule_changed[key]
+
+    for event in events:
+        if event.get("status") == "cancelled":
+            _event_index.remove(event.get("id"))
+        elif event.get("id"):
+            _event_index.add(event["id"], event.get("summary", ""))
+
+    if stale:
+        print(f"🧹 予定キャッシュを破棄：{calendar_id} {sorted(str(day) for day in stale)}")
+
+# 📆 任意日数後の予定を取得（対象の全カレンダーを同時に取得し、開始時刻順にマージ）
+def getScheduleByOffset(day_offset: int):
+    cached = digest.getDigest(day_offset)
+    if cached is not None:
+        print(f"📰 予定ダイジェストから応答：{day_offset}日後")
+        return cached
+
+    calendar_ids = getCalendarIds()
+    results = google_client.fanOut(
+        lambda calendar_id: getEventsForDay(getCalendarService(), calendar_id, day_offset), calendar_ids
+    )
+    merged = mergeEvents([(cid, results[cid]) for cid in calendar_ids if cid in results])
+    return formatSchedule([event for _, event in merged], day_offset)
+
+# 🔤 予定名の類似検索インデックス（取得したイベント一覧から差分で更新）
+_event_index = TitleIndex()
+
+sync_utils.addEventListener(onEventsChanged)
+
+# 🗑️ 予定を名前と時刻で削除（指定時刻の前後1分、タイトルは類似一致も許容。繰り返し予定ならその回だけ）
 def deleteEvent(event_name, start_time):
     try:
         # ✅ タイトルを正規化
@@ -124,15 +418,9 @@ def deleteEvent(event_name, start_time):
         event_name = event_name.strip()
         print(f"デバッグ: 正規化後のイベント名 - {event_name}")
         
-        credentials = getCredentials()
-        service = build("calendar", "v3", credentials=credentials)
+        service = getCalendarService()
 
         jst = pytz.timezone("Asia/Tokyo")
-        now = datetime.now(jst)
-        past = now - timedelta(days=30)
-        future = now + timedelta(days=30)
-
-        print(f"デバッグ: 現在時刻 - {now}, 過去30日 - {past}, 未来30日 - {future}")
 
         # 🔍 文字列なら datetime に変換
         if isinstance(start_time, str):
@@ -143,17 +431,27 @@ def deleteEvent(event_name, start_time):
 
         print(f"デバッグ: 変換後のターゲット開始時刻 - {target_start}")
 
-        events_result = service.events().list(
-            calendarId=os.getenv("GOOGLE_CALENDAR_ID"),
-            timeMin=past.isoformat(),
-            timeMax=future.isoformat(),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
+        # 作業キューの再試行：前回の試行で対象にした予定を ID で削除し直す（削除済みなら成功扱い）
+        operation = f"event_delete:{event_name}:{target_start.isoformat()}"
+        touched = context_store.touchedBefore(operation)
+        if touched:
+            return deleteEventById({"container_id": touched["container_id"], "id": touched["id"],
+                                    "title": touched["title"], "start_time": target_start.isoformat()})
 
-        print(f"デバッグ: イベントリストの取得完了。取得件数: {len(events_result.get('items', []))}")
+        # 📏 指定時刻の前後1分だけを取得（繰り返し予定も該当する1回分しか展開されない）
+        target_local = jst.localize(target_start) if target_start.tzinfo is None else target_start
+        pairs = listEventsAcross(
+            (target_local - timedelta(minutes=1)).isoformat(),
+            (target_local + timedelta(minutes=1)).isoformat()
+        )
 
-        for event in events_result.get("items", []):
+        print(f"デバッグ: イベントリストの取得完了。取得件数: {len(pairs)}")
+
+        _event_index.sync({event["id"]: event.get("summary", "") for _, event in pairs})
+
+        # ⏱️ 開始時刻が1分以内のイベントを候補にする
+        candidates = {}
+        for calendar_id, event in pairs:
             event_start_str = event["start"].get("dateTime")
             if not event_start_str:
                 continue
@@ -167,17 +465,31 @@ def deleteEvent(event_name, start_time):
             # デバッグ: イベントの開始時刻とターゲット時刻をログ出力
             print(f"デバッグ: イベント開始時刻 - {event_start_without_tz}, ターゲット開始時刻 - {target_start_without_tz}")
 
-            # イベント名と時刻の一致をチェック
-            if (event.get("summary") == event_name and 
-                abs((event_start_without_tz - target_start_without_tz).total_seconds()) < 60):  # 1分以内の差を許容
-                print(f"デバッグ: 削除対象のイベントが見つかりました: {event_name}, 開始時刻 - {event_start}")
-
-                service.events().delete(
-                    calendarId=os.getenv("GOOGLE_CALENDAR_ID"),
-                    eventId=event["id"]
-                ).execute()
-                print("✅ 削除成功：", event_name)
-                return f"予定『{event_name}』を削除しました。"
+            if abs((event_start_without_tz - target_start_without_tz).total_seconds()) < 60:  # 1分以内の差を許容
+                candidates[event["id"]] = (event, event_start, calendar_id)
+
+        # イベント名の一致をチェック（完全一致を優先し、なければ類似タイトルで照合）
+        # 作業キューの再試行では完全一致だけ（前回削除した予定の代わりに似た別の予定を消さない）
+        target_id = next((event_id for event_id, (event, _, _) in candidates.items()
+                          if event.get("summary") == event_name), None)
+        if target_id is None and candidates and context_store.retrySince() is None:
+            target_id = _event_index.best(event_name, candidates=candidates.keys())
+
+        if target_id:
+            event, event_start, calendar_id = candidates[target_id]
+            summary = event.get("summary", event_name)
+            print(f"デバッグ: 削除対象のイベントが見つかりました: {summary}, 開始時刻 - {event_start}（{calendar_id}）")
+            context_store.recordTouched(operation, calendar_id, target_id, summary)
+
+            service.events().delete(
+                calendarId=calendar_id,
+                eventId=target_id
+            ).execute()
+            _event_index.remove(target_id)
+            sync_utils.publishEvents(calendar_id, [{"id": target_id, "status": "cancelled"}])
+            invalidateBusyCache(calendar_id, event_start.astimezone(jst).date())
+            print("✅ 削除成功：", summary)
+            return f"予定『{summary}』を削除しました。"
 
         print(f"デバッグ: イベントが見つかりませんでした - {event_name}")
         return f"予定『{event_name}』は見つかりませんでした。"
@@ -187,10 +499,10 @@ def deleteEvent(event_name, start_time):
         return "予定削除中にエラーが発生しました。"
 
 # 🔁 旧予定をすべて削除してから新しい内容で再登録する更新処理（タイトルゆらぎ対策）
-def updateEvent(event_name, new_event):
+#    └─ original_day は変更前の日付（「明日の朝会を明後日10時に変更」の「明日」。繰り返し予定の回を選ぶのに使う）
+def updateEvent(event_name, new_event, original_day=None):
     try:
-        credentials = getCredentials()
-        service = build("calendar", "v3", credentials=credentials)
+        service = getCalendarService()
 
         jst   = pytz.timezone("Asia/Tokyo")
         now   = datetime.now(jst)
@@ -207,28 +519,7 @@ def updateEvent(event_name, new_event):
                 t = t.replace(junk, "")
             return t.strip()
 
-        # --- 30 日幅でタイトル一致候補を取得 -------------------------------
-        events = service.events().list(
-            calendarId=calendar_id,
-            timeMin=past.isoformat(),
-            timeMax=future.isoformat(),
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute().get("items", [])
-
-        # --- 正規化タイトルが一致する旧予定を“全部”削除 --------------------
-        deleted_any = False
-        for ev in events:
-            if _normalize(ev.get("summary", "")) == _normalize(event_name):
-                service.events().delete(calendarId=calendar_id,
-                                        eventId=ev["id"]).execute()
-                print("🗑️ 削除：", ev["summary"], ev["start"].get("dateTime"))
-                deleted_any = True   # break しない＝同タイトル複数も全削除
-
-        if not deleted_any:
-            return f"予定『{event_name}』は見つかりませんでした。"
-
-        # --- 新しい予定を登録 ---------------------------------------------
+        # --- 新しい日時 ---------------------------------------------------
         new_title = new_event["title"]
         new_start_time = new_event["start_time"]
 
@@ -242,18 +533,60 @@ def updateEvent(event_name, new_event):
 
         new_end_time = new_start_time + timedelta(minutes=30)
 
-        event_body = {
-            "summary": new_title,
+        # --- 30 日幅でタイトル一致候補を取得（対象の全カレンダー、繰り返し予定は展開せず親イベント1件） ---
+        pairs = listEventsAcross(past.isoformat(), future.isoformat(), single_events=False)
+        matches = [(cid, ev) for cid, ev in pairs if _normalize(ev.get("summary", "")) == _normalize(event_name)]
+        plain = [(cid, ev) for cid, ev in matches if not ev.get("recurrence") and not ev.get("recurringEventId")]
+        series = [(cid, ev) for cid, ev in matches if ev.get("recurrence")]
+
+        # --- 繰り返し予定だけが一致したら、元の日付の回だけを変更（全体は updateEventSeries） ---
+        #     元の日付が分からなければ日付は変わらないものとして、変更後の日付の回を対象にする
+        if series and not plain:
+            occurrence_day = original_day or new_start_time.astimezone(jst).date()
+            return _patchInstanceTime(series[0][0], series[0][1], new_start_time, occurrence_day)
+
+        if not plain:
+            return f"予定『{event_name}』は見つかりませんでした。"
+
+        # --- 一致した予定のうち1件だけを、その予定のカレンダー上で変更 ---------
+        #     （共有・家族カレンダーの同名予定まで消さない。今後の予定で一番近いもの、なければ直近の過去の予定）
+        def _startOf(pair):
+            start = pair[1]["start"]
+            value = parse(start.get("dateTime") or start["date"])
+            return value if value.tzinfo else jst.localize(value)   # 終日予定は JST の0時
+
+        upcoming = [pair for pair in plain if _startOf(pair) >= now]
+        target_calendar_id, target = (min(upcoming, key=_startOf) if upcoming
+                                      else max(plain, key=_startOf))
+        if len(plain) > 1:
+            print(f"⚠️ 同名の予定が {len(plain)} 件あるため、{target['start']} の1件だけ変更します")
+
+        old_start = _startOf((target_calendar_id, target))
+        if target["end"].get("dateTime") and target["start"].get("dateTime"):
+            new_end_time = new_start_time + (parse(target["end"]["dateTime"]) - old_start)
+
+        body = {
             "start": {"dateTime": new_start_time.isoformat(), "timeZone": "Asia/Tokyo"},
             "end": {"dateTime": new_end_time.isoformat(), "timeZone": "Asia/Tokyo"}
         }
+        if new_title and _normalize(new_title) != _normalize(target.get("summary", "")):
+            body["summary"] = new_title
 
-        created = service.events().insert(
-            calendarId=calendar_id,
-            body=event_body
+        updated = service.events().patch(
+            calendarId=target_calendar_id,
+            eventId=target["id"],
+            body=body
         ).execute()
 
-        print("✅ 新予定を登録：", created.get("summary"))
+        print("✅ 予定を変更：", updated.get("summary"), new_start_time, target_calendar_id)
+        # 新しい日付側は変更通知（onEventsChanged）で破棄される
+        if target["start"].get("dateTime"):
+            invalidateBusyCache(target_calendar_id, old_start.astimezone(jst).date())
+        else:
+            invalidateBusyCache(target_calendar_id)
+        sync_utils.publishEvents(target_calendar_id, [updated])
+        context_store.remember("event", updated.get("id"), target_calendar_id, updated.get("summary", new_title),
+                               start_time=new_start_time.isoformat(), end_time=new_end_time.isoformat())
         return f"予定『{event_name}』を新しい内容で更新しました。"
 
     except Exception as error:
@@ -261,3 +594,189 @@ def updateEvent(event_name, new_event):
         return f"更新中にエラーが発生しました：{error}"
     
 
+# ⏩ 直前に操作した予定（会話コンテキスト）の時刻だけを変更（一覧取得なしの patch 1回、長さはそのまま）
+def patchEventTime(context, new_start_time):
+    try:
+        service = getCalendarService()
+        jst = pytz.timezone("Asia/Tokyo")
+
+        old_start = parse(context["start_time"])
+        old_end = parse(context["end_time"]) if context.get("end_time") else old_start + timedelta(minutes=30)
+        if new_start_time.tzinfo is None:
+            new_start_time = jst.localize(new_start_time)
+        new_end_time = new_start_time + (old_end - old_start)
+
+        updated = service.events().patch(
+            calendarId=context["container_id"],
+            eventId=context["id"],
+            body={
+                "start": {"dateTime": new_start_time.isoformat(), "timeZone": "Asia/Tokyo"},
+                "end":   {"dateTime": new_end_time.isoformat(),   "timeZone": "Asia/Tokyo"}
+            }
+        ).execute()
+        print("✅ 予定の時刻を変更：", updated.get("summary"), new_start_time)
+
+        # 新しい日付側は変更通知（onEventsChanged）で破棄される
+        invalidateBusyCache(context["container_id"], old_start.astimezone(jst).date())
+        sync_utils.publishEvents(context["container_id"], [updated])
+        context_store.remember("event", updated["id"], context["container_id"], updated.get("summary", context["title"]),
+                               start_time=new_start_time.isoformat(), end_time=new_end_time.isoformat())
+        return f"予定『{context['title']}』を{new_start_time.strftime('%m/%d %H:%M')}に変更しました。"
+
+    except Exception as error:
+        print("❌ 予定時刻の変更エラー：", error)
+        return "予定の変更中にエラーが発生しました。"
+
+# 🗑️ 直前に操作した予定（会話コンテキスト）を ID 指定で削除
+def deleteEventById(context):
+    try:
+        service = getCalendarService()
+        service.events().delete(calendarId=context["container_id"], eventId=context["id"]).execute()
+        print("✅ 削除成功：", context["title"])
+
+        jst = pytz.timezone("Asia/Tokyo")
+        _event_index.remove(context["id"])
+        invalidateBusyCache(context["container_id"], parse(context["start_time"]).astimezone(jst).date())
+        sync_utils.publishEvents(context["container_id"], [{"id": context["id"], "status": "cancelled"}])
+        return f"予定『{context['title']}』を削除しました。"
+
+    except Exception as error:
+        # 再試行で見つからない（410 Gone など）＝前回の試行で削除済み
+        if context_store.retrySince() is not None and google_client.isNotFound(error):
+            print("♻️ 前回の試行で削除済みの予定です：", context["title"])
+            _event_index.remove(context["id"])
+            sync_utils.publishEvents(context["container_id"], [{"id": context["id"], "status": "cancelled"}])
+            return f"予定『{context['title']}』を削除しました。"
+        print("❌ 削除エラー：", error)
+        return "予定削除中にエラーが発生しました。"
+
+# 🔁 繰り返し予定を1回の insert で登録（RRULE 付き、各回30分）
+def registerRecurringSchedule(title, start_time, rrule):
+    try:
+        service = getCalendarService()
+        jst = pytz.timezone("Asia/Tokyo")
+        if start_time.tzinfo is None:
+            start_time = jst.localize(start_time)
+        end_time = start_time + timedelta(minutes=30)
+
+        calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+        if not calendar_id:
+            raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
+
+        event_body = {
+            "summary": title,
+            "start": {"dateTime": start_time.isoformat(), "timeZone": "Asia/Tokyo"},
+            "end":   {"dateTime": end_time.isoformat(),   "timeZone": "Asia/Tokyo"},
+            "recurrence": [f"RRULE:{rrule}"]
+        }
+        event_id = context_store.idempotencyId("series", calendar_id, title, start_time.isoformat(), rrule)
+        if event_id:
+            event_body["id"] = event_id
+        created = _insertEvent(service, calendar_id, event_body)
+        if created is None:
+            return service.events().get(calendarId=calendar_id, eventId=event_id).execute()
+        print("✅ 繰り返し予定を登録：", created.get("summary"), rrule)
+
+        # 繰り返し予定の busy 区間は展開しないとわからないので、インデックスは破棄して取り直す
+        invalidateBusyCache(calendar_id)
+        sync_utils.publishEvents(calendar_id, [created])
+        context_store.remember("event", created.get("id"), calendar_id, title,
+                               start_time=start_time.isoformat(), end_time=end_time.isoformat())
+        return created
+
+    except Exception as error:
+        print("❌ 繰り返し予定の登録エラー：", error)
+        return None
+
+# 🔎 タイトルに合う繰り返し予定の親イベントを探す（展開はしない。完全一致か、正規化したタイトルの一致のみ）
+def findEventSeries(event_name):
+    jst = pytz.timezone("Asia/Tokyo")
+    now = datetime.now(jst)
+    pairs = listEventsAcross(now.isoformat(), (now + timedelta(days=366)).isoformat(), single_events=False)
+    masters = {event["id"]: (calendar_id, event) for calendar_id, event in pairs if event.get("recurrence")}
+    if not masters:
+        return None
+
+    # シリーズ全体を消す・変えるので類似一致は使わない（「定例」で「週次定例会議」を消さない）
+    target = normalizeTitle(event_name)
+    for calendar_id, event in masters.values():
+        if event.get("summary", "").strip() == event_name or normalizeTitle(event.get("summary", "")) == target:
+            return calendar_id, event
+    return None
+
+# 🗑️ 繰り返し予定をシリーズごと削除（親イベントを1回削除するだけ）
+def deleteEventSeries(event_name):
+    try:
+        found = findEventSeries(event_name)
+        if not found:
+            return f"繰り返し予定『{event_name}』は見つかりませんでした。"
+
+        calendar_id, master = found
+        getCalendarService().events().delete(calendarId=calendar_id, eventId=master["id"]).execute()
+        print("✅ 繰り返し予定を削除：", master.get("summary"))
+
+        invalidateBusyCache(calendar_id)
+        sync_utils.publishEvents(calendar_id, [{"id": master["id"], "status": "cancelled"}])
+        return f"繰り返し予定『{master.get('summary', event_name)}』をすべて削除しました。"
+
+    except Exception as error:
+        print("❌ 繰り返し予定の削除エラー：", error)
+        return "予定削除中にエラーが発生しました。"
+
+# ⏰ 繰り返し予定の時刻をシリーズごと変更（親イベントの開始・終了時刻を patch、長さはそのまま）
+def updateEventSeries(event_name, hour, minute):
+    try:
+        found = findEventSeries(event_name)
+        if not found:
+            return f"繰り返し予定『{event_name}』は見つかりませんでした。"
+
+        calendar_id, master = found
+        old_start = parse(master["start"]["dateTime"])
+        old_end = parse(master["end"]["dateTime"])
+        new_start = old_start.replace(hour=hour, minute=minute)
+        new_end = new_start + (old_end - old_start)
+        time_zone = master["start"].get("timeZone", "Asia/Tokyo")
+
+        updated = getCalendarService().events().patch(calendarId=calendar_id, eventId=master["id"], body={
+            "start": {"dateTime": new_start.isoformat(), "timeZone": time_zone},
+            "end":   {"dateTime": new_end.isoformat(),   "timeZone": time_zone}
+        }).execute()
+        print("✅ 繰り返し予定の時刻を変更：", updated.get("summary"), new_start)
+
+        invalidateBusyCache(calendar_id)
+        sync_utils.publishEvents(calendar_id, [updated])
+        return f"繰り返し予定『{updated.get('summary', event_name)}』を毎回 {hour:02d}:{minute:02d} に変更しました。"
+
+    except Exception as error:
+        print("❌ 繰り返し予定の変更エラー：", error)
+        return f"更新中にエラーが発生しました：{error}"
+
+# ✏️ 繰り返し予定のうち occurrence_day の回だけを new_start に変更（その日の分だけ instances で取得）
+def _patchInstanceTime(calendar_id, master, new_start, occurrence_day):
+    service = getCalendarService()
+    jst = pytz.timezone("Asia/Tokyo")
+    day_start = jst.localize(datetime(occurrence_day.year, occurrence_day.month, occurrence_day.day))
+
+    instances = service.events().instances(
+        calendarId=calendar_id,
+        eventId=master["id"],
+        timeMin=day_start.isoformat(),
+        timeMax=(day_start + timedelta(days=1)).isoformat()
+    ).execute().get("items", [])
+    if not instances:
+        return f"{day_start.strftime('%m/%d')}に繰り返し予定『{master.get('summary', '')}』の回はありません。"
+
+    instance = instances[0]
+    duration = parse(master["end"]["dateTime"]) - parse(master["start"]["dateTime"])
+    new_end = new_start + duration
+    updated = service.events().patch(calendarId=calendar_id, eventId=instance["id"], body={
+        "start": {"dateTime": new_start.isoformat(), "timeZone": "Asia/Tokyo"},
+        "end":   {"dateTime": new_end.isoformat(),   "timeZone": "Asia/Tokyo"}
+    }).execute()
+    print("✅ 繰り返し予定の1回分を変更：", updated.get("summary"), new_start)
+
+    invalidateBusyCache(calendar_id, day_start.date())
+    sync_utils.publishEvents(calendar_id, [updated])
+    context_store.remember("event", updated["id"], calendar_id, updated.get("summary", ""),
+                           start_time=new_start.isoformat(), end_time=new_end.isoformat())
+    return f"繰り返し予定『{updated.get('summary', '')}』の{day_start.strftime('%m/%d')}の回を{new_start.strftime('%m/%d %H:%M')}に変更しました。"
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import threading
+from logic import sync_utils
+from logic import shared_changes
+
+# 📡 Google Calendar のプッシュ通知（events.watch チャネル）
+#    └─ チャネルを登録・更新し、/calendar_notifications に届いた変更通知で差分同期（sync_utils.syncEvents）を走らせる
+#       差分同期の結果は sync_utils の変更通知として配られ、予定キャッシュ・リマインダーなどが対象日だけ更新される
+#    ※ 複数ワーカー構成では、ロックファイル（CALENDAR_WATCH_LOCK_PATH）を取れた1プロセスだけがチャネルを登録・更新し差分同期する
+#       ほかのプロセスは状態ファイルからチャネルを読み、届いた通知は共有変更ログ（shared_changes）で担当プロセスへ回す
+#       担当プロセスが終了すると、待っていた別のプロセスがロックを取って引き継ぐ
+
+WATCH_STATE_PATH = os.getenv("CALENDAR_WATCH_STATE_PATH") or "calendar_watch.json"
+WATCH_LOCK_PATH = os.getenv("CALENDAR_WATCH_LOCK_PATH") or WATCH_STATE_PATH + ".lock"
+
+_channels = None            # calendar_id → {"id", "resource_id", "expiration", "token"}
+_channels_mtime = None
+_channels_lock = threading.Lock()
+_pending = set()            # 差分同期の実行待ちカレンダー（連続した通知はまとめて1回に）
+_pending_lock = threading.Lock()
+_owner = threading.Event()  # このプロセスがチャネルの担当か
+_lock_file = None
+_started = False
+
+# 📂 チャネルの状態（担当プロセスが更新したらファイルの更新時刻の変化で読み直す）
+def _loadChannels():
+    global _channels, _channels_mtime
+    try:
+        mtime = os.path.getmtime(WATCH_STATE_PATH)
+    except OSError:
+        mtime = None
+    if _channels is None or mtime != _channels_mtime:
+        try:
+            with open(WATCH_STATE_PATH) as state_file:
+                _channels = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _channels = {}
+        _channels_mtime = mtime
+    return _channels
+
+def _saveChannels():
+    global _channels_mtime
+    tmp_path = WATCH_STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as state_file:
+        json.dump(_channels, state_file, ensure_ascii=False)
+    os.replace(tmp_path, WATCH_STATE_PATH)
+    _channels_mtime = os.path.getmtime(WATCH_STATE_PATH)
+
+def isOwner():
+    return _owner.is_set()
+
+def _calendarIds():
+    from logic.calendar_utils import getCalendarIds
+    return getCalendarIds()
+
+# ✅ チャネルが有効（期限内）で、その変更がこのプロセスまで届くかどうか（予定キャッシュの有効期間判定に使う）
+#    └─ 担当プロセス以外は、共有変更ログがなければ差分同期の結果を受け取れないので False
+def isWatchActive(calendar_id):
+    if not _started or not (isOwner() or shared_changes.enabled()):
+        return False
+    with _channels_lock:
+        channel = _loadChannels().get(calendar_id)
+    return bool(channel and channel["expiration"] > time.time())
+
+# 📝 events.watch でチャネルを登録
+def registerWatch(calendar_id):
+    from logic.calendar_utils import getCalendarService
+
+    address = os.getenv("CALENDAR_WEBHOOK_URL")
+    if not address:
+        raise ValueError("CALENDAR_WEBHOOK_URL が未設定です")
+
+    ttl = int(os.getenv("CALENDAR_WATCH_TTL", str(7 * 24 * 3600)))
+    token = os.getenv("CALENDAR_WEBHOOK_TOKEN") or uuid.uuid4().hex
+    response = getCalendarService().events().watch(calendarId=calendar_id, body={
+        "id": str(uuid.uuid4()),
+        "type": "web_hook",
+        "address": address,
+        "token": token,
+        "params": {"ttl": str(ttl)}
+    }).execute()
+
+    channel = {
+        "id": response["id"],
+        "resource_id": response["resourceId"],
+        "expiration": int(response.get("expiration", (time.time() + ttl) * 1000)) / 1000,
+        "token": token
+    }
+    with _channels_lock:
+        _loadChannels()[calendar_id] = channel
+        _saveChannels()
+    print("📡 カレンダー通知チャネル登録：", calendar_id, channel["id"])
+    return channel
+
+# 🛑 チャネルを停止
+def stopWatch(channel):
+    from logic.calendar_utils import getCalendarService
+    try:
+        getCalendarService().channels().stop(body={"id": channel["id"], "resourceId": channel["resource_id"]}).execute()
+        print("🛑 カレンダー通知チャネル停止：", channel["id"])
+    except Exception as error:
+        print("⚠️ チャネル停止エラー：", error)
+
+# 🔁 期限が近いチャネルを更新（新チャネル登録 → 旧チャネル停止の順で通知の取りこぼしを防ぐ）
+def renewWatches():
+    margin = int(os.getenv("CALENDAR_WATCH_RENEW_MARGIN", "3600"))
+    for calendar_id in _calendarIds():
+        with _channels_lock:
+            old = _loadChannels().get(calendar_id)
+        if old and old["expiration"] - margin > time.time():
+            continue
+        registerWatch(calendar_id)
+        if old:
+            stopWatch(old)
+        # 通知が止まっていた間の変更を拾う
+        scheduleSync(calendar_id)
+
+def _renewLoop():
+    margin = int(os.getenv("CALENDAR_WATCH_RENEW_MARGIN", "3600"))
+    while True:
+        try:
+            renewWatches()
+        except Exception as error:
+            print("❌ カレンダー通知チャネル更新エラー：", error)
+            time.sleep(300)
+            continue
+
+        with _channels_lock:
+            expirations = [channel["expiration"] for channel in _loadChannels().values()]
+        wake_at = min(expirations) - margin if expirations else time.time() + 3600
+        time.sleep(max(60, wake_at - time.time()))
+
+# 🔄 差分同期を裏で実行（同じカレンダーの同期待ちがあれば追加しない）
+def scheduleSync(calendar_id):
+    with _pending_lock:
+        if calendar_id in _pending:
+            return
+        _pending.add(calendar_id)
+
+    def run():
+        with _pending_lock:
+            _pending.discard(calendar_id)
+        try:
+            sync_utils.syncEvents(calendar_id)
+        except Exception as error:
+            print("❌ 通知による差分同期エラー：", error)
+
+    threading.Thread(target=run, name="calendar-sync", daemon=True).start()
+
+# 📬 プッシュ通知を処理して HTTP ステータスを返す
+#    └─ X-Goog-Resource-State が sync（登録直後の確認）なら何もしない、exists / not_exists なら差分同期
+def handleNotification(headers):
+    channel_id = headers.get("X-Goog-Channel-ID", "")
+    resource_id = headers.get("X-Goog-Resource-ID", "")
+    token = headers.get("X-Goog-Channel-Token", "")
+    state = headers.get("X-Goog-Resource-State", "")
+    print(f"📬 カレンダー通知：channel={channel_id} state={state} no={headers.get('X-Goog-Message-Number', '')}")
+
+    with _channels_lock:
+        matched = [
+            calendar_id for calendar_id, channel in _loadChannels().items()
+            if channel["id"] == channel_id and channel["resource_id"] == resource_id
+        ]
+        expected_token = _channels[matched[0]]["token"] if matched else None
+
+    if not matched:
+        # 知らないチャネル（停止漏れなど）は 404 を返すと Google 側で配信が止まる
+        print("⚠️ 未登録チャネルからの通知です：", channel_id)
+        return 404
+    if expected_token and token != expected_token:
+        print("⚠️ チャネルトークン不一致のため無視します：", channel_id)
+        return 403
+
+    if state in ("exists", "not_exists"):
+        if isOwner() or not shared_changes.enabled():
+            scheduleSync(matched[0])
+        else:
+            # 差分同期（syncToken の更新）は担当プロセスだけが行う
+            shared_changes.requestSync(matched[0])
+    return 200
+
+# 🔒 ロックファイルを取れるまで待ち、取れたらこのプロセスが担当としてチャネルを登録・更新する
+#    └─ ロックはプロセスが終了すると OS が外すので、担当が落ちれば待っている別のプロセスが引き継ぐ
+def _ownerLoop():
+    global _lock_file
+    _lock_file = open(WATCH_LOCK_PATH, "a")
+    fcntl.flock(_lock_file, fcntl.LOCK_EX)
+    _owner.set()
+    shared_changes.addSyncHandler(scheduleSync)
+    print(f"📡 カレンダー通知チャネルの担当プロセスになりました（pid={os.getpid()}）")
+    _renewLoop()
+
+# 🚀 チャネル管理を起動（プロセス内で1回だけ。実際に登録・更新するのはロックを取れた1プロセス）
+def start():
+    global _started
+    if _started:
+        return
+    _started = True
+    shared_changes.start()
+    threading.Thread(target=_ownerLoop, name="calendar-watch", daemon=True).start()
+    print("📡 カレンダー通知チャネル管理を開始")
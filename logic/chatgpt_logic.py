@@ -1,14 +1,24 @@
 import os
 import re
 import json
-from datetime import datetime
-from openai import OpenAI
-from dateutil.parser import parse
+import threading
+import contextvars
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from logic.prompts import callLLM
+from logic import context_store
+from logic import recurrence
+from logic import intent_model
 from logic.calendar_utils import (
     registerSchedule,
     getScheduleByOffset,
     deleteEvent,
-    updateEvent
+    updateEvent,
+    patchEventTime,
+    deleteEventById,
+    registerRecurringSchedule,
+    deleteEventSeries,
+    updateEventSeries
 )
 from logic.task_utils import (
     registerTask,
@@ -17,9 +27,27 @@ from logic.task_utils import (
     deleteTask,
     listCompletedTasks,
     registerTaskWithDue,
-    listTasksWithDue
+    listTasksWithDue,
+    completeTaskById,
+    deleteTaskById,
+    clearCompletedTasks,
+    completeOverdueTasks,
+    deleteOverdueTasks
 )
 
+# 🤖 OpenAIクライアント（openai の import と接続プールはプロセス内で1つだけ用意して使い回す）
+_openai_client = None
+_openai_lock = threading.Lock()
+
+def getOpenAIClient():
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_client
+
 # グローバルに動詞セット（actions）を定義
 actions = {
     'register': ["入れて", "追加", "登録", "作成", "予定"],  # 予定の登録を含む
@@ -64,11 +92,43 @@ def detectExplicitType(user_message: str):
     print("ℹ️ detectExplicitType: 判定できず None を返します（AI判定へ委譲）")
     return None
 
+# 🧹 タスクの一括処理（「完了したタスクを全部削除」「期限切れタスクを全部完了にして」）を判定（該当しなければ None）
+#    └─ 「完了したタスクを全部教えて」のような確認の発言は一覧表示なので、一括で変更しない
+#       まとめて完了にするのは「完了にして」などの明示的な動詞があるときだけ
+_BULK_WORDS = ["全部", "すべて", "全て", "まとめて", "一括"]
+_OVERDUE_WORDS = ["期限切れ", "期限が過ぎた", "期限を過ぎた", "期限の過ぎた"]
+_BULK_QUERY_WORDS = ["教えて", "見せて", "一覧", "表示", "確認", "ある?", "ある？"]
+_BULK_COMPLETE_VERBS = ["完了にして", "完了して", "完了させて", "済にして", "済みにして"]
+
+def detectBulkTaskIntent(user_input):
+    if "タスク" not in user_input and "やること" not in user_input:
+        return None
+    # 一括処理は「全部」「すべて」などがあるときだけ（「完了したタスクの牛乳を削除」は1件の削除）
+    if not any(w in user_input for w in _BULK_WORDS):
+        return None
+    if any(w in user_input for w in _BULK_QUERY_WORDS):
+        return None
+    is_delete = any(v in user_input for v in actions['delete']) or "片付け" in user_input or "クリア" in user_input
+
+    if is_delete and ("完了済" in user_input or "完了した" in user_input):
+        return "task_clear_completed"
+    if any(w in user_input for w in _OVERDUE_WORDS):
+        if is_delete:
+            return "task_delete_overdue"
+        if any(v in user_input for v in _BULK_COMPLETE_VERBS):
+            return "task_complete_overdue"
+    return None
+
 # 🔍 ユーザーの発言から意図を判定（登録・更新・削除・予定確認など）
 def classifyIntent(user_input):
     user_input = user_input.lower()
     print(f"📩 ユーザーの入力: {user_input}")
 
+    bulk_intent = detectBulkTaskIntent(user_input)
+    if bulk_intent:
+        print(f"✅ 意図判定: タスクの一括処理（{bulk_intent}）を返します")
+        return bulk_intent
+
     if "削除" in user_input:
         print("✅ 意図判定: 削除を返します")
         return "delete"  # 削除意図として返す
@@ -78,7 +138,8 @@ def classifyIntent(user_input):
     elif "完了済" in user_input or "完了した" in user_input:
         print("✅ 意図判定: 完了したタスクのリストを返します")
         return "task_list_completed"
-    elif "期限付き" in user_input or "締め切り" in user_input or "期日" in user_input:
+    elif "期限付き" in user_input or "締め切り" in user_input or "期日" in user_input \
+            or any(w in user_input for w in _OVERDUE_WORDS):
         print("✅ 意図判定: 期限付きタスクリストを返します")
         return "task_list_due"
     elif "入れて" in user_input or "登録" in user_input or "追加" in user_input:
@@ -114,42 +175,8 @@ def classifyIntent(user_input):
         print("✅ 意図判定: 一般的なリクエスト")
         return "general"
     
-# 📤 ChatGPTを使って予定のタイトルと（必要なら）開始時刻を抽出する
-def extractNewEventDetails(user_input, require_time=True):
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    if require_time:
-        system_content = (
-            f"あなたは自然文から予定の日時とタイトルを抽出するアシスタントです。\n"
-            f"今日の日付は {today} です。『明日』『明後日』なども正しく認識してください。\n"
-            f"絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
-            f"{{\"title\": \"予定名\", \"start_time\": \"2025-04-30 15:00:00\"}}\n"
-            f"※形式が正しくないと処理ができません。"
-        )
-    else:
-        system_content = (
-            f"あなたは自然文から予定のタイトルだけを抽出するアシスタントです。\n"
-            f"今日の日付は {today} です。『明日』『明後日』なども正しく認識してください。\n"
-            f"絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
-            f"{{\"title\": \"予定名\"}}\n"
-            f"※形式が正しくないと処理ができません。"
-        )
-
-    messages = [
-        {"role": "system", "content": system_content},
-        {"role": "user", "content": user_input}
-    ]
-
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    )
-    content = response.choices[0].message.content
-    
-    # ChatGPTのレスポンス内容を表示
-    print("📤 ChatGPTの返答（予定抽出）：", content)
-
+# 🧹 ChatGPTの返答（予定抽出）をパースしてタイトルを正規化する
+def parseEventDetails(content, require_time=True):
     try:
         parsed = json.loads(content)
     except json.JSONDecodeError as e:
@@ -179,33 +206,60 @@ def extractNewEventDetails(user_input, require_time=True):
     else:
         return {"title": title}
 
-# タスク関連の動詞（削除や完了など）を除去する正規表現
-_PAT_TAIL = re.compile(r"(タスク)?(を)?(削除|消す|完了)(する|して)?$")
+# ⚡ 定型の予定文（「明日14時に歯医者の予定を入れて」「5月10日9時に健康診断を登録」）をローカルで解析する
+#    └─ 日付・時刻・タイトル・動詞がこの順に並ぶ文だけを対象にし、当てはまらなければ None（ChatGPTで抽出）
+_LOCAL_EVENT = re.compile(
+    r"^(?:(今日|明日|明後日)|(\d{1,2})月(\d{1,2})日)の?(\d{1,2})(?:時(半|(\d{1,2})分)?|:(\d{2}))(?:に|の|から)?"
+    r"(?P<title>[^\s、。,0-9０-９]+?)(?:の予定|の予約|予定|予約)?を?"
+    r"(?:入れて|追加|登録|作成|削除|消して|キャンセル)"
+)
 
-def extractTaskTitle(user_input):
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    system_content = (
-        f"あなたは自然文からタスク名を抽出するアシスタントです。\n"
-        f"今日の日付は {today} です。『明日までにやること』などの文脈を正しく判断してください。\n"
-        f"絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
-        f"{{\"title\": \"タスク名\"}}\n"
-        f"※形式が正しくないと処理ができません。"
-    )
-
-    messages = [
-        {"role": "system", "content": system_content},
-        {"role": "user", "content": user_input}
-    ]
+def parseEventLocally(user_input):
+    match = _LOCAL_EVENT.match(user_input.strip())
+    if not match:
+        return None
 
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    )
-    content = response.choices[0].message.content
-    print("📤 ChatGPTの返答（タスク抽出）：", content)
+    today = datetime.now().date()
+    if match.group(1):
+        day = today + timedelta(days={"今日": 0, "明日": 1, "明後日": 2}[match.group(1)])
+    else:
+        try:
+            day = today.replace(month=int(match.group(2)), day=int(match.group(3)))
+        except ValueError:
+            return None
+        if day < today:
+            day = day.replace(year=day.year + 1)
+
+    hour = int(match.group(4))
+    minute = 30 if match.group(5) == "半" else int(match.group(6) or match.group(7) or 0)
+    title = match.group("title")
+    if hour > 23 or minute > 59 or any(w in title for w in ("今日", "明日", "明後日", "時")):
+        return None
+
+    start_time = datetime(day.year, day.month, day.day, hour, minute)
+    print(f"⚡ ローカル解析で予定を抽出：{title} {start_time}")
+    return {"title": title, "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")}
+
+# 📤 ChatGPTを使って予定のタイトルと（必要なら）開始時刻を抽出する
+#    └─ LLM_LOCAL_PARSE=1 のときは定型文をまずローカルで解析し、解析できればChatGPTを呼ばない
+def extractNewEventDetails(user_input, require_time=True):
+    if os.getenv("LLM_LOCAL_PARSE", "0") == "1":
+        local = parseEventLocally(user_input)
+        if local:
+            return local if require_time else {"title": local["title"]}
+
+    content = callLLM(getOpenAIClient(), "event" if require_time else "event_title", user_input)
+
+    # ChatGPTのレスポンス内容を表示
+    print("📤 ChatGPTの返答（予定抽出）：", content)
 
+    return parseEventDetails(content, require_time)
+
+# タスク関連の動詞（削除や完了など）を除去する正規表現
+_PAT_TAIL = re.compile(r"(タスク)?(を)?(削除|消す|完了)(する|して)?$")
+
+# 🧹 ChatGPTの返答（タスク抽出）をパースしてタスク名を正規化する
+def parseTaskTitle(content):
     try:
         parsed = json.loads(content)
     except json.JSONDecodeError:
@@ -226,33 +280,21 @@ def extractTaskTitle(user_input):
 
     return {"title": title.strip()}
 
-# 📥 タスクのタイトル＋期限（due）を抽出する
-def extractTaskDetails(user_input):
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    system_content = (
-        f"あなたは自然文からタスク名と期限日を抽出するアシスタントです。\n"
-        f"今日の日付は {today} です。『明日までに』などの文脈も正しく解釈してください。\n"
-        f"絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
-        f"{{\"title\": \"タスク名\", \"due\": \"2025-05-10T00:00:00.000Z\"}}\n"
-        f"期限がない場合は \"due\": null を設定してください。\n"
-        f"※形式が正しくないと処理ができません。"
-    )
-
-    messages = [
-        {"role": "system", "content": system_content},
-        {"role": "user", "content": user_input}
-    ]
+def extractTaskTitle(user_input):
+    content = callLLM(getOpenAIClient(), "task_title", user_input)
+    print("📤 ChatGPTの返答（タスク抽出）：", content)
 
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    )
+    return parseTaskTitle(content)
 
-    content = response.choices[0].message.content
+# 📥 タスクのタイトル＋期限（due）を抽出する
+def extractTaskDetails(user_input):
+    content = callLLM(getOpenAIClient(), "task_details", user_input)
     print("📥 ChatGPTの返答（タスク抽出＋期限）:", content)
 
+    return parseTaskDetails(content)
+
+# 🧹 ChatGPTの返答（タスク名＋期限）をパースして正規化する
+def parseTaskDetails(content):
     try:
         parsed = json.loads(content)
     except json.JSONDecodeError as e:
@@ -275,11 +317,238 @@ def extractTaskDetails(user_input):
 
     return {"title": title, "due": due}
 
+# 🧩 複数コマンドの区切り（「、」「。」改行・「あと」「それと」など）
+_MULTI_SPLIT = re.compile(r"[、。\n]|あと|それと|それから|ついでに")
+_TIME_HINT = re.compile(r"\d{1,2}時|\d{1,2}:\d{2}|今日|明日|明後日")
+# 一覧・確認だけの言い回し（「今日の予定を教えて。明日の予定も」は複数命令として扱わない）
+_LIST_ONLY_WORDS = ["教えて", "見せて", "一覧", "リスト", "確認", "ある？", "ある?"]
+
+# 🔎 1メッセージに複数の命令（予定・タスク）が含まれていそうかを判定する
+def isMultiCommand(user_message):
+    segments = [seg.strip() for seg in _MULTI_SPLIT.split(user_message) if seg.strip()]
+    if len(segments) < 2:
+        return False
+
+    # 「予定」は一覧の問い合わせにも含まれるので、ここでは操作の動詞として数えない
+    verbs = [v for v in actions['register'] if v != "予定"] + actions['delete'] + actions['complete'] + actions['update']
+    if any(w in user_message for w in _LIST_ONLY_WORDS) and not any(v in user_message for v in verbs):
+        print("🧩 isMultiCommand: 一覧の問い合わせのみ → 複数命令として扱いません")
+        return False
+
+    commands = [
+        seg for seg in segments
+        if any(v in seg for v in verbs)
+        or ((_TIME_HINT.search(seg) or "タスク" in seg) and not any(w in seg for w in _LIST_ONLY_WORDS))
+    ]
+    print(f"🧩 isMultiCommand: 区切り {len(segments)} 件中 命令らしきもの {len(commands)} 件")
+    return len(commands) >= 2
+
+# 📤 ChatGPTで1メッセージから操作リストをまとめて抽出する（1回のLLM呼び出しで全件）
+def extractOperations(user_input):
+    content = callLLM(getOpenAIClient(), "operations", user_input)
+    print("📤 ChatGPTの返答（複数操作抽出）：", content)
+
+    return parseOperations(content)
+
+# ✅ 種類ごとに実行してよい操作（これ以外の action は登録に化けないよう捨てる）
+_OPERATION_ACTIONS = {
+    "schedule": ("register", "delete", "update"),
+    "task": ("register", "delete", "complete")
+}
+
+# 🧹 ChatGPTの返答（操作リスト）をパースしてタイトルを正規化する
+def parseOperations(content):
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError as e:
+        print("❌ JSON解析失敗：", e)
+        raise ValueError("ChatGPTの応答が正しい形式ではありません。")
+
+    operations = []
+    for op in parsed.get("operations", []):
+        title = (op.get("title") or "").strip()
+        if not title or op.get("type") not in _OPERATION_ACTIONS:
+            continue
+        if op.get("action") not in _OPERATION_ACTIONS[op["type"]]:
+            print("⚠️ 未対応の操作を除外：", op)
+            continue
+        for junk in ["の予定", "の予約", "のタスク", "タスク"]:
+            title = title.replace(junk, "")
+        op["title"] = title.strip()
+        operations.append(op)
+
+    print("📤 抽出された操作：", operations)
+    return operations
+
+# ⚙️ 抽出済みの操作1件を既存の予定・タスク処理へ振り分けて実行する
+def runOperation(op):
+    title = op["title"]
+    action = op.get("action")
+    if action not in _OPERATION_ACTIONS.get(op.get("type"), ()):
+        return f"『{title}』の操作（{action}）には対応していません。"
+
+    try:
+        if op["type"] == "schedule":
+            start_time = op.get("start_time")
+            if action in ("register", "delete") and not start_time:
+                return f"予定『{title}』の日時が分かりませんでした。"
+
+            if action == "delete":
+                return deleteEvent(title, datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S"))
+            elif action == "update":
+                if not op.get("new_start_time"):
+                    return f"予定『{title}』の変更後の日時が分かりませんでした。"
+                original_day = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S").date() if start_time else None
+                return updateEvent(title, {"title": title, "start_time": op["new_start_time"]}, original_day)
+            return registerSchedule(title, datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S"))
+
+        if action == "delete":
+            return deleteTask(title)
+        elif action == "complete":
+            return completeTask(title)
+        due = op.get("due")
+        return registerTaskWithDue(title, due) if due else registerTask(title)
+
+    except Exception as error:
+        print("❌ 操作実行エラー：", op, error)
+        return f"『{title}』の処理中にエラーが発生しました。"
+
+# 🧵 複数の操作を上限付きスレッドプールで並行実行し、1通の返信にまとめる
+def handleMultiCommand(user_message):
+    operations = extractOperations(user_message)
+    if not operations:
+        return None
+
+    if len(operations) == 1:
+        return runOperation(operations[0])
+
+    max_workers = int(os.getenv("MULTI_COMMAND_WORKERS", "4"))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(operations)))) as pool:
+        # 会話コンテキストのユーザーをワーカースレッドへ引き継ぐ
+        futures = [pool.submit(contextvars.copy_context().run, runOperation, op) for op in operations]
+        results = [future.result() for future in futures]
+
+    return "\n".join(f"{i}. {result.strip()}" for i, result in enumerate(results, start=1))
+
+# 💬 直前の予定・タスクを指す言い回し（「それと」「それから」などの接続詞は除く）
+#    ※「やっぱり」「さっきの」だけでは指していると見なさない
+_FOLLOWUP = re.compile(r"^(?:やっぱり?|やはり)?[、\s]*それ(?!と|から|ぞれ|で|に|より)|それを|その予定|そのタスク|さっきの(?:予定|タスク)")
+# 予定の日時を変える動詞（「やっぱり16時に」だけでは動かさない）
+_FOLLOWUP_MOVE_VERBS = actions['update'] + ["変えて", "ずらして", "移して", "移動"]
+# 一覧・確認の問い合わせ（「明日の歯医者の予定を教えて」）では何も変えない
+_FOLLOWUP_LIST_WORDS = ["教えて", "見せて", "一覧", "リスト", "確認", "ある？", "ある?", "いつ"]
+_FOLLOWUP_TIME = re.compile(r"(\d{1,2})(?:時(半|(\d{1,2})分)?|:(\d{2}))")
+_FOLLOWUP_DAYS = (("明後日", 2), ("明日", 1), ("今日", 0))
+
+# 🕒 続きの発言から新しい日時をローカルで読み取る（日付だけ・時刻だけの指定は元の予定から補う）
+def parseFollowUpTime(user_message, base_start):
+    day_offset = next((offset for word, offset in _FOLLOWUP_DAYS if word in user_message), None)
+    match = _FOLLOWUP_TIME.search(user_message)
+    if day_offset is None and not match:
+        return None
+
+    new_start = base_start.replace(tzinfo=None, second=0, microsecond=0)
+    if day_offset is not None:
+        new_date = (datetime.now() + timedelta(days=day_offset)).date()
+        new_start = new_start.replace(year=new_date.year, month=new_date.month, day=new_date.day)
+    if match:
+        hour = int(match.group(1))
+        minute = 30 if match.group(2) == "半" else int(match.group(3) or match.group(4) or 0)
+        if hour > 23 or minute > 59:
+            return None
+        new_start = new_start.replace(hour=hour, minute=minute)
+    return new_start
+
+# 🎯 続きの発言が覚えている予定・タスクを指しているか
+#    └─ 日時のない「それ」「さっきの」なら指している。日時があれば、覚えている開始日時（タスクは期限日）と一致するときだけ
+#       「予定」「タスク」と書いてあれば、覚えている種類と一致すること
+#    ※ 予定の変更（moving）の日時は移動先なので、「それ」「その予定」で指しているときだけ
+def _isFollowUpTarget(user_message, context, moving=False):
+    if "予定" in user_message and context["kind"] != "event":
+        return False
+    if "タスク" in user_message and context["kind"] != "task":
+        return False
+
+    is_pronoun = bool(_FOLLOWUP.search(user_message))
+    has_datetime = bool(_FOLLOWUP_TIME.search(user_message)) or any(word in user_message for word, _ in _FOLLOWUP_DAYS)
+    if moving or not has_datetime:
+        return is_pronoun
+
+    if context["kind"] == "event":
+        start = datetime.fromisoformat(context["start_time"]).replace(tzinfo=None, second=0, microsecond=0)
+        return parseFollowUpTime(user_message, start) == start
+    if not context.get("due") or _FOLLOWUP_TIME.search(user_message):
+        return False
+    due = datetime.fromisoformat(context["due"][:10])
+    return parseFollowUpTime(user_message, due) == due
+
+# 💬 直前に操作した予定・タスクへの続きの発言なら、LLM・一覧検索なしで ID 指定の操作を実行する
+#    └─ 当てはまらなければ None を返し、通常の振り分け（タイトル・日時での検索）へ
+def handleFollowUp(user_message):
+    context = context_store.recall()
+    if not context:
+        return None
+    if not _FOLLOWUP.search(user_message) and context["title"] not in user_message:
+        return None
+    if any(w in user_message for w in _FOLLOWUP_LIST_WORDS):
+        return None
+
+    if context["kind"] == "event":
+        # 「明日14時に歯医者の予定を入れて」のような新規登録は対象外
+        if any(v in user_message for v in ("入れて", "追加", "登録", "作成")):
+            return None
+        if any(v in user_message for v in actions['delete']):
+            if not _isFollowUpTarget(user_message, context):
+                return None
+            print(f"💬 会話コンテキストで処理：削除 {context['title']}")
+            return deleteEventById(context)
+        if not any(v in user_message for v in _FOLLOWUP_MOVE_VERBS):
+            return None
+        if not _isFollowUpTarget(user_message, context, moving=True):
+            return None
+        new_start = parseFollowUpTime(user_message, datetime.fromisoformat(context["start_time"]))
+        if new_start is not None:
+            print(f"💬 会話コンテキストで処理：変更 {context['title']}")
+            return patchEventTime(context, new_start)
+        return None
+
+    if not _isFollowUpTarget(user_message, context):
+        return None
+    if any(v in user_message for v in actions['delete']):
+        print(f"💬 会話コンテキストで処理：削除 {context['title']}")
+        return deleteTaskById(context)
+    if any(v in user_message for v in actions['complete']):
+        print(f"💬 会話コンテキストで処理：完了 {context['title']}")
+        return completeTaskById(context)
+    return None
+
 # 🎯 メイン処理：ユーザーの発言に応じて処理を振り分ける
-def askChatgpt(user_message, forced_type=None):
+#    └─ user_id を渡すと、そのユーザーの会話コンテキスト（直前の予定・タスク）を使う
+#       raise_errors=True なら処理全体のエラーを返信文にせず送出する（作業キューで再試行させるため）
+def askChatgpt(user_message, forced_type=None, user_id=None, raise_errors=False):
+    token = context_store.bindUser(user_id) if user_id else None
     try:
-        # OpenAIクライアントの初期化（複数関数で使うので先に生成）
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _askChatgpt(user_message, forced_type, raise_errors)
+    finally:
+        if token is not None:
+            context_store.resetUser(token)
+
+def _askChatgpt(user_message, forced_type=None, raise_errors=False):
+    try:
+        # OpenAIクライアントの取得（複数関数で使うので先に取得）
+        client = getOpenAIClient()
+
+        # ⓪ 複数の命令が並んでいる場合は一括抽出して並行実行
+        if isMultiCommand(user_message):
+            print("🚩 複数コマンド処理開始")
+            multi_result = handleMultiCommand(user_message)
+            if multi_result:
+                return multi_result
+
+        # ⓪ 直前の予定・タスクへの続きの発言（「それ削除して」「それ16時に変更して」）
+        follow_up = handleFollowUp(user_message)
+        if follow_up:
+            return follow_up
 
         # ① 明示ルールに基づくタイプ判定（予定 or タスク or None）
         explicit_type = detectExplicitType(user_message)
@@ -299,7 +568,8 @@ def askChatgpt(user_message, forced_type=None):
             # タスクの意図が明確に分類できた場合は handleTaskActions を使用
             if intent in [
                 "task_register", "task_list", "task_complete",
-                "task_delete", "task_list_completed", "task_list_due"
+                "task_delete", "task_list_completed", "task_list_due",
+                "task_clear_completed", "task_complete_overdue", "task_delete_overdue"
             ]:
                 return handleTaskActions(intent, user_message, client)
 
@@ -319,18 +589,42 @@ def askChatgpt(user_message, forced_type=None):
         # intentが明確なタスク系であれば handleTaskActions を使って処理
         if intent in [
             "task_register", "task_list", "task_complete",
-            "task_delete", "task_list_completed", "task_list_due"
+            "task_delete", "task_list_completed", "task_list_due",
+            "task_clear_completed", "task_complete_overdue", "task_delete_overdue"
         ]:
             return handleTaskActions(intent, user_message, client)
 
-        # ⑤ 意図不明または一般雑談系 → ChatGPT雑談応答へフォールバック
+        # ⑤ ルールで判定できなかった発言はローカルの意図分類モデルで予定・タスク操作かを判定
+        routed = routeByModel(user_message, client)
+        if routed is not None:
+            return routed
+
+        # ⑥ 意図不明または一般雑談系 → ChatGPT雑談応答へフォールバック
         print("🚩 fallback → 雑談応答を実行します")
         return askFreeChat(user_message, client)
 
     except Exception as error:
         print("❌ ChatGPT応答全体エラー：", error)
+        if raise_errors:
+            raise
         return "申し訳ありません。システムエラーが発生しました。後ほど再度お試しください。"
 
+# 🧭 意図分類モデル（intent_model）の判定で一覧表示だけを振り分ける（雑談・確信度不足・変更系なら None）
+#    └─ 登録・変更・削除・完了はモデルの判定だけでは実行しない（雑談を取り違えて予定やタスクを変えてしまうため）
+def routeByModel(user_message, client):
+    label = intent_model.classify(user_message)
+    if label is None or label == "chat":
+        return None
+    if label not in intent_model.READ_ONLY_LABELS:
+        print(f"🧭 意図分類：{label} は変更系のためモデルの判定では実行しません（ChatGPT へ）")
+        return None
+
+    if label == "schedule_list":
+        offset = 2 if "明後日" in user_message else 1 if ("明日" in user_message or "あした" in user_message) else 0
+        return getScheduleByOffset(offset)
+
+    return handleTaskActions(label, user_message, client)
+
 def handleSchedule(user_message):
     result_messages = []  # 結果を格納するリスト
     list_verbs = ["教えて", "見せて", "リスト", "一蘭"]
@@ -365,6 +659,11 @@ def handleSchedule(user_message):
 
     # 予定登録や削除、更新処理
     else:
+        # 繰り返し予定（「毎週月曜10時に定例」「毎週の定例を削除」）は RRULE 1件として扱う
+        recurring_result = handleRecurringSchedule(user_message)
+        if recurring_result is not None:
+            return recurring_result
+
         # 予定削除や更新、登録の処理
         new_event = extractNewEventDetails(user_message, require_time=True)
         title = new_event["title"]
@@ -379,7 +678,7 @@ def handleSchedule(user_message):
         # 更新処理
         elif any(v in user_message for v in actions['update']):
             print(f"🚩 予定変更リクエスト：{title} の更新を実行")
-            update_result = updateEvent(title, new_event)  # updateEvent 関数を呼び出して更新
+            update_result = updateEvent(title, new_event, originalDay(user_message))  # updateEvent 関数を呼び出して更新
             result_messages.append(update_result)
 
         # 予定登録処理
@@ -394,6 +693,69 @@ def handleSchedule(user_message):
     # 結果を文字列として返す
     return "\n".join(result_messages)
 
+# 📅 発言に出てくる日付（今日・明日・明後日・5月10日・5/10）を出てきた順に返す
+_MENTIONED_DAY = re.compile(r"明後日|明日|今日|(\d{1,2})月(\d{1,2})日|(\d{1,2})/(\d{1,2})")
+_RELATIVE_DAYS = {"今日": 0, "明日": 1, "明後日": 2}
+
+def mentionedDays(user_message, today=None):
+    today = today or datetime.now().date()
+    days = []
+    for match in _MENTIONED_DAY.finditer(user_message):
+        if match.group(0) in _RELATIVE_DAYS:
+            days.append(today + timedelta(days=_RELATIVE_DAYS[match.group(0)]))
+            continue
+        month, day = int(match.group(1) or match.group(3)), int(match.group(2) or match.group(4))
+        try:
+            value = today.replace(month=month, day=day)
+        except ValueError:
+            continue
+        days.append(value if value >= today else value.replace(year=today.year + 1))
+    return days
+
+# 🗓️ 予定の変更で、変更前の日付（日付が2つ以上あれば最初のもの。1つ以下なら日付は変わらないとみなして None）
+def originalDay(user_message):
+    days = mentionedDays(user_message)
+    return days[0] if len(set(days)) >= 2 else None
+
+# 🔁 繰り返し予定の登録・シリーズ全体の削除／時刻変更（該当しなければ None を返して通常の処理へ）
+#    ※「全部」「すべて」は繰り返しの印にしない（「会議を全部削除」をシリーズ削除にしない）
+_SERIES_WORDS = ["毎週", "毎日", "毎月", "毎年", "平日", "隔週", "毎回", "シリーズ", "定期"]
+
+def handleRecurringSchedule(user_message):
+    is_delete = any(v in user_message for v in actions['delete'])
+    is_update = any(v in user_message for v in actions['update'])
+
+    if is_delete or is_update:
+        if not any(w in user_message for w in _SERIES_WORDS):
+            return None   # 1回分だけの削除・変更は通常の処理（繰り返し予定なら該当日の回だけ変わる）
+
+        parsed = recurrence.parseRecurrence(user_message, require_time=False)
+        title = (parsed or {}).get("title") or extractNewEventDetails(user_message, require_time=False)["title"]
+
+        if is_delete:
+            print(f"🚩 繰り返し予定削除リクエスト：{title}")
+            return deleteEventSeries(title)
+
+        new_time = recurrence.parseTime(user_message)
+        if not new_time:
+            return "変更後の時刻がわかりませんでした。（例：定例を毎回11時に変更）"
+        print(f"🚩 繰り返し予定変更リクエスト：{title} → {new_time[0]:02d}:{new_time[1]:02d}")
+        return updateEventSeries(title, *new_time)
+
+    # 「毎週月曜10時に定例」のように登録の動詞がなくても、繰り返し＋時刻があれば登録とみなす
+    parsed = recurrence.parseRecurrence(user_message)
+    if not parsed:
+        return None
+
+    title = parsed["title"] or extractNewEventDetails(user_message, require_time=False)["title"]
+    start_time = recurrence.firstOccurrence(parsed["rrule"], parsed["hour"], parsed["minute"])
+    print(f"🚩 繰り返し予定登録：{title}（{parsed['rrule']}）")
+
+    created = registerRecurringSchedule(title, start_time, parsed["rrule"])
+    if not created:
+        return "繰り返し予定の登録に失敗しました。"
+    return f"予定『{title}』を{recurrence.describe(parsed)}に繰り返し登録しました。（初回 {start_time.strftime('%m/%d')}）"
+
 def handleTask(user_message):
 
     # 1) 削除指示なら deleteTask
@@ -433,37 +795,26 @@ def handleTaskActions(intent, user_message, client, forced_type=None):
     elif intent == "task_list_due":
         return listTasksWithDue()
 
+    elif intent == "task_clear_completed":
+        return clearCompletedTasks()
+
+    elif intent == "task_complete_overdue":
+        return completeOverdueTasks()
+
+    elif intent == "task_delete_overdue":
+        return deleteOverdueTasks()
+
     # 🤖 雑談や意図不明系はChatGPTへフォールバック
     # ✅ ここで forced_type による補強プロンプトを追加
-    system_prompt = "あなたは親切で柔軟なAIアシスタントです。"
+    system_suffix = ""
 
     if forced_type == "task":
-        system_prompt += "\nこれはGoogle Tasksに関する命令です。恋愛やプロポーズなどとは関係ありません。"
+        system_suffix = "\nこれはGoogle Tasksに関する命令です。恋愛やプロポーズなどとは関係ありません。"
     elif forced_type == "schedule":
-        system_prompt += "\nこれはGoogle Calendarに関する命令です。"
+        system_suffix = "\nこれはGoogle Calendarに関する命令です。"
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_message}
-    ]
-
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    )
-    return response.choices[0].message.content
+    return callLLM(client, "free_chat", user_message, system_suffix=system_suffix)
     
 # 予定やタスク以外の処理
 def askFreeChat(user_message, client):
-    system_prompt = "あなたは親切で柔軟なAIアシスタントです。"
-
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_message}
-    ]
-
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages
-    )
-    return response.choices[0].message.content
+    return callLLM(client, "free_chat", user_message)
@@ -0,0 +1,133 @@
+import os
+import time
+import hashlib
+import threading
+import contextvars
+from logic import sync_utils
+
+# 💬 会話コンテキスト（ユーザーごとに直前に操作した予定・タスクを短時間だけ覚える）
+#    └─ 「それ16時に変更して」「それ削除して」のような続きの発言を、
+#       LLMによる再抽出やタイトル検索なしで ID 指定の1回の API 呼び出しで処理するために使う
+#       現在のユーザーは askChatgpt が contextvar に設定し、登録・変更処理は remember() で記録する
+
+_current_user = contextvars.ContextVar("current_user", default=None)
+_current_job = contextvars.ContextVar("current_job", default=None)   # {"key", "retry_since", "touched", "save"}（作業キューから処理中のとき）
+_touched_lock = threading.Lock()
+
+_contexts = {}              # user_id → {"kind", "id", "container_id", "title", "start_time", "end_time", "due", "touched_at"}
+_contexts_lock = threading.Lock()
+
+def contextTtl():
+    return int(os.getenv("CONVERSATION_CONTEXT_TTL", "300"))
+
+# 👤 処理中のユーザーを設定（戻り値の token を resetUser に渡して元に戻す）
+def bindUser(user_id):
+    return _current_user.set(user_id)
+
+def resetUser(token):
+    _current_user.reset(token)
+
+def currentUser():
+    return _current_user.get()
+
+# 🔁 作業キューのジョブを処理中であることを設定
+#    └─ retry_since は前回の試行を始めた時刻（副作用の途中で止まった可能性がある再試行のときだけ）
+#       touched は前回までの試行で削除・完了の対象にした予定・タスク、save_touched はそれをジョブに保存する関数
+def bindJob(job_key, retry_since=None, touched=None, save_touched=None):
+    return _current_job.set({"key": str(job_key), "retry_since": retry_since,
+                             "touched": dict(touched or {}), "save": save_touched})
+
+def resetJob(token):
+    _current_job.reset(token)
+
+def retrySince():
+    job = _current_job.get()
+    return job["retry_since"] if job else None
+
+# 📌 削除・完了の対象にした予定・タスクをジョブに記録（API を呼ぶ前に。再試行ではタイトルで探し直さず同じ ID を処理する）
+#    └─ operation は「task_delete:牛乳」のような操作とタイトルの組。保存できない（リース切れ）なら中止する
+def recordTouched(operation, container_id, item_id, title):
+    job = _current_job.get()
+    if not job:
+        return
+    with _touched_lock:
+        job["touched"][operation] = {"container_id": container_id, "id": item_id, "title": title}
+        touched = dict(job["touched"])
+    if job["save"] and job["save"](touched) is False:
+        raise RuntimeError("リースが切れたため処理を中止します")
+
+# 🔎 前回の試行で同じ操作の対象にした予定・タスク（再試行でなければ None）
+def touchedBefore(operation):
+    job = _current_job.get()
+    if not job or job["retry_since"] is None:
+        return None
+    with _touched_lock:
+        return job["touched"].get(operation)
+
+# 📋 これまでに記録した対象（ジョブの結果に保存し直す）
+def touchedItems():
+    job = _current_job.get()
+    if not job:
+        return {}
+    with _touched_lock:
+        return dict(job["touched"])
+
+# 🆔 ジョブと操作内容から決まる ID（再試行で同じ予定を二重に登録しないよう events.insert の id に使う）
+#    └─ Calendar のイベントIDに使える文字（0-9a-v）だけになるよう16進にする。ジョブ外なら None
+def idempotencyId(*parts):
+    job = _current_job.get()
+    if not job:
+        return None
+    return hashlib.sha1("\n".join([job["key"], *map(str, parts)]).encode("utf-8")).hexdigest()
+
+# 📝 直前に操作した予定・タスクを記録（ユーザー不明の呼び出し＝リマインダーや同期などでは何もしない）
+def remember(kind, item_id, container_id, title, start_time=None, end_time=None, due=None):
+    user_id = currentUser()
+    if not user_id or not item_id:
+        return
+    with _contexts_lock:
+        _contexts[user_id] = {
+            "kind": kind,
+            "id": item_id,
+            "container_id": container_id,
+            "title": title,
+            "start_time": start_time,
+            "end_time": end_time,
+            "due": due,
+            "touched_at": time.time()
+        }
+
+# 🔎 有効期限内のコンテキストを返す（なければ None）
+def recall():
+    user_id = currentUser()
+    if not user_id:
+        return None
+    with _contexts_lock:
+        context = _contexts.get(user_id)
+        if context and time.time() - context["touched_at"] > contextTtl():
+            del _contexts[user_id]
+            context = None
+    return dict(context) if context else None
+
+# 🧹 コンテキストを破棄（item_id 指定時は全ユーザーから該当IDのものだけ）
+def forget(item_id=None):
+    with _contexts_lock:
+        if item_id is None:
+            _contexts.pop(currentUser(), None)
+            return
+        for user_id in [uid for uid, context in _contexts.items() if context["id"] == item_id]:
+            del _contexts[user_id]
+
+# 🔔 ほかの端末などで削除された予定・タスクはコンテキストからも外す
+def onEventsChanged(calendar_id, events):
+    for event in events:
+        if event.get("status") == "cancelled":
+            forget(event.get("id"))
+
+def onTasksChanged(tasklist_id, tasks):
+    for task in tasks:
+        if task.get("deleted"):
+            forget(task.get("id"))
+
+sync_utils.addEventListener(onEventsChanged)
+sync_utils.addTaskListener(onTasksChanged)
@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+import pytz
+from logic import sync_utils
+from logic import shared_changes
+
+# 📰 今日・明日・明後日の予定ダイジェストを裏で作っておき、「今日の予定を教えて」にメモリから即答する
+#    └─ JST の日付ごとにマージ済みのイベント一覧を持ち、返信文は読み出し時に formatSchedule で作る
+#       （日付が変わると昨日の「明日」がそのまま「今日」になるので、作り直すのは新しい明後日の分だけ）
+#       登録・削除・変更の通知（sync_utils）が来た日は作り直すまで使わない（API から取得する通常の処理へ）
+#    ※ カレンダーを直接編集した分は、通知チャネルがなければ DIGEST_MAX_AGE 秒までは古いまま返ることがある
+#    ※ ダイジェストはプロセスごと。ほかのワーカーや queue_worker.py で登録・変更した分は共有変更ログ（SHARED_CHANGES_ENABLED=1）で届く
+#       届かない構成（共有ログなし・SINGLE_PROCESS=1 でもない）では DIGEST_UNSHARED_MAX_AGE 秒までに短くする
+#    ※ 予定はカレンダー設定（GOOGLE_CALENDAR_ID / GOOGLE_CALENDAR_IDS）単位なので、ダイジェストもプロセスで1組
+
+DIGEST_DAYS = 3
+
+_digests = {}          # JST日付 → (作成時刻 monotonic, イベント一覧)
+_dirty = set()         # 変更通知があり、作り直しが必要な JST 日付
+_lock = threading.Lock()
+_wake = threading.Event()
+_started = False
+
+def _maxAge():
+    max_age = float(os.getenv("DIGEST_MAX_AGE", "600"))
+    if not shared_changes.reachesAllProcesses():
+        return min(max_age, float(os.getenv("DIGEST_UNSHARED_MAX_AGE", "30")))
+    return max_age
+
+def _today():
+    return datetime.now(pytz.timezone("Asia/Tokyo")).date()
+
+# ⚡ ダイジェストから返信文を返す（なし・変更あり・DIGEST_MAX_AGE 秒より古いときは None）
+def getDigest(day_offset: int):
+    if not _started or not 0 <= day_offset < DIGEST_DAYS:
+        return None
+    day = _today() + timedelta(days=day_offset)
+
+    with _lock:
+        entry = _digests.get(day)
+        if entry is None or day in _dirty:
+            return None
+    if time.monotonic() - entry[0] >= _maxAge():
+        return None
+
+    from logic.calendar_utils import formatSchedule
+    return formatSchedule(entry[1], day_offset)
+
+# 🔨 指定日のダイジェストを作り直す（全カレンダーを同時に取得してマージ）
+def _build(day):
+    from logic import google_client
+    from logic.calendar_utils import getCalendarIds, getCalendarService, getEventsForDay, mergeEvents
+
+    day_offset = (day - _today()).days
+    calendar_ids = getCalendarIds()
+
+    # 通知が届いた時刻より後に取得したものだけを有効にする（取得中に来た変更で再度 dirty になる）
+    with _lock:
+        _dirty.discard(day)
+    fetched_at = time.monotonic()
+    try:
+        results = google_client.fanOut(
+            lambda calendar_id: getEventsForDay(getCalendarService(), calendar_id, day_offset), calendar_ids
+        )
+        if len(results) < len(calendar_ids):
+            raise RuntimeError("一部のカレンダーが取得できませんでした")
+    except Exception:
+        # 作り直せなかった日は古いダイジェストを返さないよう dirty に戻す
+        with _lock:
+            _dirty.add(day)
+        raise
+    events = [event for _, event in mergeEvents([(cid, results[cid]) for cid in calendar_ids])]
+
+    with _lock:
+        _digests[day] = (fetched_at, events)
+    print(f"📰 予定ダイジェストを作成：{day}（{len(events)}件）")
+
+# 🔄 作り直しが必要な日（未作成・変更あり・古くなりかけ）を更新し、範囲外の日を捨てる
+def refresh():
+    today = _today()
+    days = [today + timedelta(days=i) for i in range(DIGEST_DAYS)]
+    refresh_after = _maxAge() * 0.5
+
+    with _lock:
+        for day in [d for d in _digests if d < today]:
+            _digests.pop(day, None)
+            _dirty.discard(day)
+        targets = [day for day in days
+                   if day not in _digests or day in _dirty
+                   or time.monotonic() - _digests[day][0] >= refresh_after]
+
+    for day in targets:
+        try:
+            _build(day)
+        except Exception as error:
+            print("❌ 予定ダイジェスト作成エラー：", day, error)
+
+# 🔔 予定の変更通知を受けたら、その日のダイジェストを使用停止にして作り直しを依頼（sync_utils のリスナー）
+def onEventsChanged(calendar_id, events):
+    from logic.calendar_utils import _eventDates
+
+    today = _today()
+    window = {today + timedelta(days=i) for i in range(DIGEST_DAYS)}
+    stale = set()
+    with _lock:
+        for event in events:
+            # 新しい日時の日に加えて、そのイベントを含んでいる日（削除・別の日への移動）も対象にする
+            stale.update(_eventDates(event) & window)
+            stale.update(day for day, entry in _digests.items()
+                         if any(e.get("id") == event.get("id") for e in entry[1]))
+
+    if stale:
+        with _lock:
+            _dirty.update(stale)
+        _wake.set()
+
+# ⏳ 次の日付切り替え（JST 0:00）までの秒数
+def _secondsUntilRollover():
+    jst = pytz.timezone("Asia/Tokyo")
+    now = datetime.now(jst)
+    midnight = jst.localize(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+    return max((midnight - now).total_seconds(), 1.0)
+
+def _refreshLoop():
+    while True:
+        _wake.clear()
+        refresh()
+        # 変更通知・日付切り替え・DIGEST_MAX_AGE の半分のうち最も早いタイミングで起きる
+        _wake.wait(min(_maxAge() * 0.5, _secondsUntilRollover() + 1))
+
+# 🚀 ダイジェストの作成ジョブを起動（プロセス内で1回だけ）
+def start():
+    global _started
+    if _started:
+        return
+    _started = True
+
+    # 予定キャッシュの破棄（calendar_utils のリスナー）が先に動くよう、先に読み込んでおく
+    from logic import calendar_utils  # noqa: F401
+    sync_utils.addEventListener(onEventsChanged)
+    shared_changes.start()
+    threading.Thread(target=_refreshLoop, name="schedule-digest", daemon=True).start()
+    print("📰 予定ダイジェスト作成ジョブ起動")
@@ -0,0 +1,117 @@
+import os
+import threading
+
+# 🔐 Google API クライアントの共通処理
+#    └─ googleapiclient / google-auth は import が重いので、初回利用時にだけ読み込む
+#       認証情報はプロセス内で1つ、サービスオブジェクトは接続プールと一緒にプロセスで共有（GOOGLE_HTTP_POOL=0 ならスレッドごと）
+
+DEFAULT_TOKEN_PATH = "/home/bepro/projects/ai_butler/token.json"
+
+_credentials = {}
+_credentials_lock = threading.Lock()
+_local = threading.local()
+
+# ✅ token.json から認証情報を取得（期限切れならリフレッシュして保存）
+def getCredentials(scopes):
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
+    token_path = os.getenv("GOOGLE_TOKEN_JSON") or DEFAULT_TOKEN_PATH
+    if not token_path:
+        raise ValueError("GOOGLE_TOKEN_JSON が未設定です")
+
+    key = tuple(scopes)
+    with _credentials_lock:
+        creds = _credentials.get(key)
+        if creds is None:
+            creds = Credentials.from_authorized_user_file(token_path, scopes=list(scopes))
+            _credentials[key] = creds
+            print("✅ GOOGLE_TOKEN_JSON:", token_path)
+
+        # トークンが期限切れ（または未取得）ならリフレッシュ（同時リフレッシュで token.json が壊れないようロック内で実行）
+        if not creds.valid and creds.refresh_token:
+            creds.refresh(Request())
+            with open(token_path, "w") as token_file:
+                token_file.write(creds.to_json())
+
+    return creds
+
+# 🔎 キャッシュ済みの認証情報をそのまま返す（未読み込みなら None、リフレッシュはしない）
+def getCachedCredentials(scopes):
+    return _credentials.get(tuple(scopes))
+
+# 🧰 APIサービスを取得
+#    └─ GOOGLE_HTTP_POOL=1（既定）：接続プールを共有するスレッドセーフな HTTP（google_http）で1回だけ build し、全スレッドで共有
+#       GOOGLE_HTTP_POOL=0：従来どおり httplib2 でスレッドごとに build して使い回す
+_shared_services = {}
+_shared_lock = threading.Lock()
+
+def getService(api, version, scopes):
+    if os.getenv("GOOGLE_HTTP_POOL", "1") == "1":
+        return _getSharedService(api, version, scopes)
+
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+
+    service = services.get((api, version))
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build(api, version, credentials=getCredentials(scopes), cache_discovery=False)
+        services[(api, version)] = service
+
+    # 期限切れトークンはここで更新しておく（AuthorizedHttp は同じ認証情報オブジェクトを参照する）
+    getCredentials(scopes)
+    return service
+
+def _getSharedService(api, version, scopes):
+    # 期限切れトークンはここで更新しておく（AuthorizedSession は同じ認証情報オブジェクトを参照する）
+    credentials = getCredentials(scopes)
+
+    service = _shared_services.get((api, version))
+    if service is None:
+        with _shared_lock:
+            service = _shared_services.get((api, version))
+            if service is None:
+                from googleapiclient.discovery import build
+                from logic import google_http
+                http = google_http.getHttp(credentials, tuple(scopes))
+                service = _shared_services[(api, version)] = build(api, version, http=http, cache_discovery=False)
+    return service
+
+# 🌐 複数のカレンダー・タスクリストへの同時呼び出し（プロセス共通のスレッドプール）
+#    └─ func(key) を keys ごとに並行実行し {key: 結果} を返す
+#       （GOOGLE_HTTP_POOL=1 ならサービスと接続プール（google_http.PooledHttp）を全スレッドで共有、0 ならスレッドごとのサービス）
+#       一部が失敗しても成功した分は返す。全件失敗したときだけ例外を送出する
+_fanout_pool = None
+_fanout_lock = threading.Lock()
+
+def fanOut(func, keys):
+    global _fanout_pool
+    keys = list(keys)
+    if len(keys) == 1:
+        return {keys[0]: func(keys[0])}
+
+    if _fanout_pool is None:
+        with _fanout_lock:
+            if _fanout_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _fanout_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GOOGLE_FANOUT_WORKERS", "8")),
+                                                  thread_name_prefix="google-fanout")
+
+    futures = {key: _fanout_pool.submit(func, key) for key in keys}
+    results, last_error = {}, None
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as error:
+            print(f"❌ 同時取得エラー（{key}）：", error)
+            last_error = error
+    if not results and last_error is not None:
+        raise last_error
+    return results
+
+# 🔎 API エラーが「対象なし」（404 / 410。削除済みなど）か
+def isNotFound(error):
+    resp = getattr(error, "resp", None)
+    return getattr(resp, "status", None) in (404, 410)
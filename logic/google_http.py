@@ -0,0 +1,63 @@
+import os
+import threading
+
+# 🌐 Google API 用の HTTP トランスポート（プロセスで共有する接続プール）
+#    └─ googleapiclient 既定の httplib2.Http はスレッドセーフではなく、接続もサービスごとに別々になる
+#       ここでは requests（urllib3）のセッションを1つ共有し、keep-alive・gzip・プールサイズ指定に対応する
+#       googleapiclient には http= で httplib2 互換のオブジェクト（PooledHttp）として渡す
+#    ※ プールが埋まっているときは空くまで待つ（GOOGLE_HTTP_POOL_SIZE 本より多くは接続しない）
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def poolSize():
+    return int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "16"))
+
+# 🔌 セッションに接続プールを設定（keep-alive はプール内の接続を使い回す。gzip は requests が展開する）
+def mountPool(session, pool_size=None):
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size or poolSize(), pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+# 📨 httplib2.Response 互換のレスポンス（小文字ヘッダーの dict と status / reason 属性）
+class _Response(dict):
+    def __init__(self, response):
+        super().__init__((key.lower(), value) for key, value in response.headers.items())
+        # 本文は requests が展開済みなので、httplib2 と同じく圧縮関連のヘッダーは外す
+        if self.pop("content-encoding", None) is not None:
+            self.pop("content-length", None)
+        self.status = response.status_code
+        self.reason = response.reason
+        self["status"] = str(response.status_code)
+
+# 🧵 googleapiclient から使う httplib2 互換の HTTP オブジェクト（複数スレッドから同時に呼んでよい）
+class PooledHttp:
+    def __init__(self, session, timeout=None):
+        self.session = session
+        self.timeout = timeout or float(os.getenv("GOOGLE_HTTP_TIMEOUT", "30"))
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        response = self.session.request(
+            method, uri, data=body, headers=headers, timeout=self.timeout, allow_redirects=redirections > 0
+        )
+        return _Response(response), response.content
+
+    def close(self):
+        # 共有の接続プールなので、サービス側から閉じられても何もしない
+        pass
+
+# 🔐 認証付きの共有 HTTP（スコープの組ごとに1つ。トークンの付与・401 時の再取得は AuthorizedSession が行う）
+def getHttp(credentials, key):
+    http = _sessions.get(key)
+    if http is None:
+        with _sessions_lock:
+            http = _sessions.get(key)
+            if http is None:
+                from google.auth.transport.requests import AuthorizedSession
+                http = _sessions[key] = PooledHttp(mountPool(AuthorizedSession(credentials)))
+                print(f"🌐 Google API 接続プールを作成（最大 {poolSize()} 接続）")
+    return http
@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import math
+import random
+import threading
+
+# 🧭 ローカルの意図分類モデル（文字 n-gram ＋ 多クラスのロジスティック回帰、CPU のみ・依存ライブラリなし）
+#    └─ detectExplicitType / classifyIntent で振り分けられなかった発言（雑談扱い）を、
+#       予定・タスクの操作か判定して ChatGPT の雑談応答に回さずに処理するために使う
+#       学習は train_intent_model.py、評価は eval_intent_model.py（fixtures/intent_corpus.jsonl）
+#       学習済みの重みは models/intent_model.json に保存し、起動時（ウォームアップ）に読み込む
+#    ※ 確信度が INTENT_MODEL_THRESHOLD 未満なら None（従来どおり ChatGPT へ）
+#    ※ モデルの判定だけで実行するのは一覧表示（READ_ONLY_LABELS）のみ。登録・変更・削除・完了は
+#       雑談（「10時に寝る」「仕事終わった」）でも高い確信度で当たることがあるため、明示ルールか ChatGPT に任せる
+
+LABELS = [
+    "schedule_register", "schedule_list", "schedule_delete", "schedule_update",
+    "task_register", "task_list", "task_complete", "task_delete", "task_list_completed", "task_list_due",
+    "chat"
+]
+READ_ONLY_LABELS = ("schedule_list", "task_list", "task_list_completed", "task_list_due")
+NGRAM_RANGE = (1, 3)
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "intent_model.json")
+
+_DIGITS = re.compile(r"[0-9０-９]+")
+_SPACES = re.compile(r"\s+")
+
+_model = None
+_model_lock = threading.Lock()
+
+def modelPath():
+    return os.getenv("INTENT_MODEL_PATH") or DEFAULT_MODEL_PATH
+
+def threshold():
+    return float(os.getenv("INTENT_MODEL_THRESHOLD", "0.8"))
+
+def enabled():
+    return os.getenv("INTENT_MODEL_ENABLED", "1") == "1"
+
+# 🔤 特徴量：正規化した文（数字は 0 にまとめる）の文字 n-gram（文頭・文末の印付き）
+def extractFeatures(text, ngram_range=NGRAM_RANGE):
+    normalized = "^" + _DIGITS.sub("0", _SPACES.sub("", text.lower())) + "$"
+    features = set()
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(normalized) - n + 1):
+            features.add(normalized[i:i + n])
+    return features
+
+def _softmax(scores):
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+# 🧮 学習・推論に使うモデル本体（重みは 特徴量 → {ラベル番号: 重み} の疎な辞書）
+class IntentModel:
+    def __init__(self, labels, weights=None, bias=None, ngram_range=NGRAM_RANGE):
+        self.labels = list(labels)
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(self.labels)
+        self.ngram_range = tuple(ngram_range)
+
+    # 📊 ラベルごとの確率
+    def probabilities(self, text):
+        scores = list(self.bias)
+        for feature in extractFeatures(text, self.ngram_range):
+            for index, weight in self.weights.get(feature, {}).items():
+                scores[index] += weight
+        return _softmax(scores)
+
+    # 🎯 最も確率の高いラベルと確率
+    def predict(self, text):
+        probabilities = self.probabilities(text)
+        index = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.labels[index], probabilities[index]
+
+    # 🏋️ SGD で学習（交差エントロピー＋L2、学習率は epoch ごとに減衰）
+    def fit(self, texts, labels, epochs=30, learning_rate=0.5, l2=1e-4, seed=0):
+        rows = [(extractFeatures(text, self.ngram_range), self.labels.index(label)) for text, label in zip(texts, labels)]
+        dense = {}
+        rng = random.Random(seed)
+
+        for epoch in range(epochs):
+            rng.shuffle(rows)
+            rate = learning_rate / (1 + epoch * 0.2)
+            for features, target in rows:
+                scores = list(self.bias)
+                for feature in features:
+                    weights = dense.get(feature)
+                    if weights is not None:
+                        for index in range(len(scores)):
+                            scores[index] += weights[index]
+                probabilities = _softmax(scores)
+
+                for index, probability in enumerate(probabilities):
+                    gradient = probability - (1.0 if index == target else 0.0)
+                    self.bias[index] -= rate * gradient
+                    for feature in features:
+                        weights = dense.setdefault(feature, [0.0] * len(self.labels))
+                        weights[index] -= rate * (gradient + l2 * weights[index])
+
+        self.weights = {
+            feature: {index: weight for index, weight in enumerate(weights) if abs(weight) >= 0.02}
+            for feature, weights in dense.items()
+        }
+        self.weights = {feature: weights for feature, weights in self.weights.items() if weights}
+        return self
+
+    # 💾 保存（小数4桁に丸めた疎な JSON）
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "labels": self.labels,
+            "ngram_range": list(self.ngram_range),
+            "bias": [round(value, 4) for value in self.bias],
+            "weights": {
+                feature: [[index, round(weight, 4)] for index, weight in sorted(weights.items())]
+                for feature, weights in sorted(self.weights.items())
+            }
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as model_file:
+            json.dump(data, model_file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as model_file:
+            data = json.load(model_file)
+        weights = {feature: {index: weight for index, weight in pairs} for feature, pairs in data["weights"].items()}
+        return cls(data["labels"], weights, data["bias"], data.get("ngram_range", NGRAM_RANGE))
+
+# 📥 学習済みモデルを読み込む（プロセスで1回。ファイルがなければ False）
+def load():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                path = modelPath()
+                if not os.path.exists(path):
+                    print("⚠️ 意図分類モデルが見つかりません：", path)
+                    _model = False
+                else:
+                    _model = IntentModel.load(path)
+                    print(f"✅ 意図分類モデルを読み込み：{path}（特徴量 {len(_model.weights)} 件）")
+    return _model
+
+# 🧭 発言の意図を判定（確信度がしきい値未満・モデルなし・無効なら None）
+#    └─ 予定・タスクを変えるラベルも返すので、実行に使うのは READ_ONLY_LABELS のときだけにすること
+def classify(text):
+    if not enabled():
+        return None
+    model = load()
+    if not model:
+        return None
+
+    label, confidence = model.predict(text)
+    if confidence < threshold():
+        print(f"🧭 意図分類：{label}（{confidence:.2f}）しきい値未満のため ChatGPT へ")
+        return None
+    print(f"🧭 意図分類：{label}（{confidence:.2f}）")
+    return label
@@ -0,0 +1,58 @@
+import os
+import threading
+
+# 💬 LINE Messaging API のクライアント（プロセスで1つを使い回す）と返信メッセージの組み立て
+#    └─ 以前はメッセージごとに ApiClient を作って閉じていたため、毎回接続からやり直していた
+#       ApiClient（urllib3 の接続プール）は閉じずに持ち続け、全スレッドで共有する
+#       長い応答（予定・タスクの一覧など）は1通の上限で区切り、最大5通を1回の reply_message で返す
+
+LINE_TEXT_MAX = 5000             # テキストメッセージ1通の最大文字数
+LINE_MESSAGES_PER_REQUEST = 5    # 1回の返信・プッシュで送れるメッセージ数
+TRUNCATED_NOTE = "\n…（長いため以下省略）"
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# 🔌 プロセス共有の MessagingApi（fork 後のプロセスでは作り直す）
+def getMessagingApi():
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                from linebot.v3.messaging import MessagingApi, Configuration, ApiClient
+
+                configuration = Configuration(access_token=os.getenv("LINE_CHANNEL_ACCESS_TOKEN"))
+                configuration.connection_pool_maxsize = int(os.getenv("LINE_HTTP_POOL_SIZE", "8"))
+                _client = MessagingApi(ApiClient(configuration))
+                _client_pid = os.getpid()
+                print("✅ LINE Messaging API クライアントを作成")
+    return _client
+
+# ✂️ 長い文を行単位で limit 文字以内に詰める（1行が limit を超えるときだけ行の途中で区切る）
+def splitText(text, limit=LINE_TEXT_MAX):
+    chunks, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current or not chunks:
+        chunks.append(current)
+    return [chunk.rstrip("\n") or chunk for chunk in chunks]
+
+# 📦 返信1回分のテキスト（最大5通。入りきらない分は5通目の末尾を省略表記にする）
+def splitReply(text, limit=LINE_TEXT_MAX, max_messages=LINE_MESSAGES_PER_REQUEST):
+    chunks = splitText(text or " ", limit)
+    if len(chunks) <= max_messages:
+        return chunks
+
+    print(f"⚠️ 応答が長いため {len(chunks)} 通分を {max_messages} 通に切り詰めます")
+    last = "\n".join(chunks[max_messages - 1:])
+    return chunks[:max_messages - 1] + [last[:limit - len(TRUNCATED_NOTE)] + TRUNCATED_NOTE]
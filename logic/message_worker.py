@@ -0,0 +1,75 @@
+import os
+import time
+import threading
+from logic import work_queue
+from logic import context_store
+from logic import profiling
+from logic import line_client
+
+# 📨 作業キューに積まれた LINE メッセージの処理（app.py のスレッド・queue_worker.py のプロセスから利用）
+#    └─ 応答文はキューに保存してから返信するので、返信だけ失敗した場合の再実行では
+#       askChatgpt（予定登録などの副作用）を繰り返さない
+#       処理のエラーは送出してジョブごと再試行する。副作用の前に試行の開始を記録しておき、
+#       再試行では前回登録済みの予定・タスクを登録し直さず、削除・完了は前回と同じ ID だけを対象にする（context_store.bindJob）
+
+# 💬 LINEへ返信（長い応答は最大5通に分けて1回で返信。返信トークンの期限切れなどで失敗したら user_id 宛てのプッシュに切り替える）
+def replyText(reply_token, text, user_id=None):
+    from linebot.v3.messaging.models import ReplyMessageRequest, PushMessageRequest, TextMessage
+
+    messaging_api = line_client.getMessagingApi()
+    messages = [TextMessage(text=chunk) for chunk in line_client.splitReply(text)]
+    try:
+        messaging_api.reply_message(ReplyMessageRequest(reply_token=reply_token, messages=messages))
+    except Exception as error:
+        if not user_id:
+            raise
+        print("⚠️ 返信に失敗したためプッシュで送信します：", error)
+        messaging_api.push_message(PushMessageRequest(to=user_id, messages=messages))
+
+# 🧾 キューのジョブ1件を処理（work_queue.runWorker のハンドラ）
+@profiling.profiled("messageJob")
+def handleMessageJob(job, owner):
+    from logic.chatgpt_logic import askChatgpt
+
+    payload = job["payload"]
+    result = job["result"] or {}
+    reply_text = result.get("reply_text")
+
+    if reply_text is None:
+        print(f"📨 ジョブ {job['id']} 処理開始（{job['attempts']}回目）📩", payload["text"])
+        # 前回の試行の開始記録があれば、副作用の途中で止まった可能性がある
+        retry_since = result.get("started_at")
+        started_at = retry_since or time.time()
+        touched = result.get("touched") or {}
+        if not work_queue.saveResult(job["id"], owner, {"started_at": started_at, "touched": touched}):
+            raise RuntimeError("リースが切れたため処理を中止します")
+
+        # 削除・完了の対象はその都度ジョブに保存する（再試行では同じ ID を処理し、似たタイトルの別物に触れない）
+        def saveTouched(touched):
+            return work_queue.saveResult(job["id"], owner, {"started_at": started_at, "touched": touched})
+
+        token = context_store.bindJob(job["id"], retry_since, touched, saveTouched)
+        try:
+            reply_text = askChatgpt(payload["text"], user_id=payload.get("user_id"), raise_errors=True)
+        except Exception as error:
+            # 最後の試行でも失敗したらエラーを返信してから dead にする
+            if job["attempts"] >= work_queue.maxAttempts():
+                replyText(payload["reply_token"], f"応答処理エラー: {error}", payload.get("user_id"))
+            raise
+        finally:
+            touched = context_store.touchedItems()
+            context_store.resetJob(token)
+        print("🧠 応答内容：", reply_text)
+        work_queue.saveResult(job["id"], owner, {"started_at": started_at, "touched": touched, "reply_text": reply_text})
+    else:
+        print(f"♻️ ジョブ {job['id']} は応答作成済みのため返信のみ再試行します")
+
+    replyText(payload["reply_token"], reply_text, payload.get("user_id"))
+
+# 🚀 プロセス内でワーカースレッドを起動（WORK_QUEUE_THREADS 本）
+def startWorkers(count):
+    for i in range(count):
+        threading.Thread(
+            target=work_queue.runWorker, args=(handleMessageJob,), name=f"queue-worker-{i}", daemon=True
+        ).start()
+    print(f"📮 キューワーカースレッドを {count} 本起動")
@@ -0,0 +1,226 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import itertools
+import threading
+import functools
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# 🔬 メッセージ処理のプロファイリング（必要なときだけ有効化）
+#    └─ 1/N 件のリクエストは cProfile と tracemalloc のスナップショットを、
+#       PROFILE_SLOW_MS を超えたリクエストはスタックのサンプリング（flame graph 用の folded 形式）を PROFILE_DIR に保存する
+#       無効な間は bool を1回見るだけで、そのまま元の関数を呼ぶ
+#    ※ 設定は /admin/profiling から実行中に切り替えられる（プロセスごと）
+
+_settings = {
+    "enabled": os.getenv("PROFILE_ENABLED", "0") == "1",
+    "sample_rate": int(os.getenv("PROFILE_SAMPLE_RATE", "100")),     # 1/N 件を cProfile（0 で無効）
+    "slow_ms": float(os.getenv("PROFILE_SLOW_MS", "0")),             # これを超えたらスタックを採取（0 で無効）
+    "interval_ms": float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")),
+    "tracemalloc": os.getenv("PROFILE_TRACEMALLOC", "1") == "1"
+}
+_settings_lock = threading.Lock()
+
+PROFILE_DIR = os.getenv("PROFILE_DIR") or "profiles"
+
+_counter = itertools.count(1)
+_exclusive = threading.Lock()   # cProfile・tracemalloc はプロセスで同時に1つだけ
+_inflight = {}                  # スレッドID → {"name", "started", "stacks": Counter}
+_inflight_lock = threading.Lock()
+_watchdog = None
+_watch_wake = threading.Event() # 監視が必要になったら（処理中のリクエスト・設定変更）起こす
+
+def getSettings():
+    with _settings_lock:
+        return dict(_settings)
+
+# 🎛️ 設定を変更（/admin/profiling から）。値が不正なら ValueError（どの設定も変えない）
+def configure(**changes):
+    with _settings_lock:
+        updates = {}
+        for key, value in changes.items():
+            if key not in _settings or value is None:
+                continue
+            if isinstance(_settings[key], bool):
+                updates[key] = str(value).lower() in ("1", "true", "on")
+                continue
+            try:
+                updates[key] = type(_settings[key])(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} の値が不正です：{value!r}")
+            if updates[key] < 0 or (key == "interval_ms" and updates[key] == 0):
+                raise ValueError(f"{key} の値が範囲外です：{value!r}")
+        _settings.update(updates)
+        settings = dict(_settings)
+    _watch_wake.set()
+    print("🔬 プロファイリング設定：", settings)
+    return settings
+
+# 📁 保存と古いファイルの削除（新しい順に PROFILE_KEEP 件だけ残す）
+def _write(filename, writer):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, filename)
+    writer(path)
+
+    keep = int(os.getenv("PROFILE_KEEP", "50"))
+    files = sorted(
+        (os.path.join(PROFILE_DIR, f) for f in os.listdir(PROFILE_DIR)),
+        key=os.path.getmtime, reverse=True
+    )
+    for old in files[keep:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return path
+
+def _writeText(text):
+    def writer(path):
+        with open(path, "w") as out:
+            out.write(text)
+    return writer
+
+# 🧵 処理中のスレッドのうち、しきい値を超えたものだけスタックを採取する監視スレッド（プロセスで1本）
+def _frameLabel(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _watchLoop():
+    while True:
+        # 無効な間・処理中のリクエストがない間は起こされるまで眠る（先に clear してから確かめ、起こし漏れを防ぐ）
+        _watch_wake.clear()
+        settings = getSettings()
+        with _inflight_lock:
+            idle = not _inflight
+        if not settings["enabled"] or settings["slow_ms"] <= 0 or idle:
+            _watch_wake.wait()
+            continue
+
+        time.sleep(settings["interval_ms"] / 1000)
+        now = time.perf_counter()
+        with _inflight_lock:
+            slow = {ident: entry for ident, entry in _inflight.items()
+                    if (now - entry["started"]) * 1000 >= settings["slow_ms"]}
+        if not slow:
+            continue
+
+        frames = sys._current_frames()
+        for ident, entry in slow.items():
+            frame = frames.get(ident)
+            labels = []
+            while frame is not None:
+                labels.append(_frameLabel(frame))
+                frame = frame.f_back
+            if labels:
+                entry["stacks"][";".join(reversed(labels))] += 1
+
+def _ensureWatchdog():
+    global _watchdog
+    if _watchdog is None:
+        with _inflight_lock:
+            if _watchdog is None:
+                _watchdog = threading.Thread(target=_watchLoop, name="profile-watchdog", daemon=True)
+                _watchdog.start()
+
+# ⏱️ プロファイル付きで1リクエストを実行
+def _runProfiled(name, func, args, kwargs):
+    settings = getSettings()
+    rate = settings["sample_rate"]
+    sampled = rate > 0 and next(_counter) % rate == 0 and _exclusive.acquire(blocking=False)
+
+    ident = threading.get_ident()
+    if settings["slow_ms"] > 0:
+        _ensureWatchdog()
+        with _inflight_lock:
+            _inflight[ident] = {"name": name, "started": time.perf_counter(), "stacks": Counter()}
+        _watch_wake.set()
+
+    profiler = None
+    tracing = False
+    if sampled:
+        if settings["tracemalloc"] and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            tracing = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+        if profiler is not None:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot() if tracing else None
+            if tracing:
+                tracemalloc.stop()
+            _exclusive.release()
+            try:
+                _write(f"{stamp}-{name}-{elapsed_ms:.0f}ms.prof", profiler.dump_stats)
+                if snapshot is not None:
+                    top = snapshot.statistics("lineno")[:30]
+                    _write(f"{stamp}-{name}-{elapsed_ms:.0f}ms.mem.txt", _writeText("\n".join(str(s) for s in top) + "\n"))
+                print(f"🔬 プロファイル保存：{name} {elapsed_ms:.0f}ms")
+            except Exception as error:
+                print("⚠️ プロファイル保存エラー：", error)
+
+        if settings["slow_ms"] > 0:
+            with _inflight_lock:
+                entry = _inflight.pop(ident, None)
+            if entry and entry["stacks"]:
+                folded = "".join(f"{stack} {count}\n" for stack, count in entry["stacks"].items())
+                try:
+                    _write(f"{stamp}-{name}-{elapsed_ms:.0f}ms.folded", _writeText(folded))
+                    print(f"🐢 遅いリクエストのスタックを保存：{name} {elapsed_ms:.0f}ms")
+                except Exception as error:
+                    print("⚠️ スタック保存エラー：", error)
+
+# 🎯 デコレータ：@profiled("handleMessage")
+def profiled(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _settings["enabled"]:
+                return func(*args, **kwargs)
+            return _runProfiled(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+# 📊 保存済みプロファイルの集計
+#    └─ folded：遅いリクエストのスタックを合算（flamegraph.pl / speedscope にそのまま渡せる）
+#       pstats：1/N 件の cProfile を合算し、累積時間の上位を表示
+#       files ：保存されているファイル一覧
+def aggregate(fmt="folded", limit=40):
+    if not os.path.isdir(PROFILE_DIR):
+        return ""
+    names = sorted(os.listdir(PROFILE_DIR))
+
+    if fmt == "files":
+        return "".join(f"{name}\n" for name in names)
+
+    if fmt == "pstats":
+        paths = [os.path.join(PROFILE_DIR, n) for n in names if n.endswith(".prof")]
+        if not paths:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(*paths, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    merged = Counter()
+    for name in names:
+        if not name.endswith(".folded"):
+            continue
+        with open(os.path.join(PROFILE_DIR, name)) as folded:
+            for line in folded:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    merged[stack] += int(count)
+    return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+# 🗒️ プロンプトレジストリと呼び出しごとのトークン計測
+#    └─ 抽出系プロンプトはバージョン付きで管理し、既定は短い JSON モード版（v2）
+#       v1 は従来の長い文面（比較用）。PROMPT_VARIANTS=event=v1,task_title=v1 のように切り替えられる
+#       すべての呼び出しでプロンプト／応答トークン数と所要時間を記録し、LLM_METRICS_PATH があれば JSONL に追記する
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+WEEKDAYS = "月火水木金土日"
+
+PROMPTS = {
+    "event": {
+        "v1": {
+            "system": (
+                "あなたは自然文から予定の日時とタイトルを抽出するアシスタントです。\n"
+                "今日の日付は {today} です。『明日』『明後日』なども正しく認識してください。\n"
+                "絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
+                "{{\"title\": \"予定名\", \"start_time\": \"2025-04-30 15:00:00\"}}\n"
+                "※形式が正しくないと処理ができません。"
+            ),
+            "json": False,
+            "max_tokens": None
+        },
+        "v2": {
+            "system": (
+                "今日={today}({weekday})。予定名と開始日時をJSONで返す。"
+                "title は「の予定」や動詞を除いた名詞のみ。"
+                "{{\"title\":\"歯医者\",\"start_time\":\"YYYY-MM-DD HH:MM:SS\"}}"
+            ),
+            "json": True,
+            "max_tokens": 60
+        }
+    },
+    "event_title": {
+        "v1": {
+            "system": (
+                "あなたは自然文から予定のタイトルだけを抽出するアシスタントです。\n"
+                "今日の日付は {today} です。『明日』『明後日』なども正しく認識してください。\n"
+                "絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
+                "{{\"title\": \"予定名\"}}\n"
+                "※形式が正しくないと処理ができません。"
+            ),
+            "json": False,
+            "max_tokens": None
+        },
+        "v2": {
+            "system": "予定名をJSONで返す。「の予定」や動詞は除く。{{\"title\":\"歯医者\"}}",
+            "json": True,
+            "max_tokens": 40
+        }
+    },
+    "task_title": {
+        "v1": {
+            "system": (
+                "あなたは自然文からタスク名を抽出するアシスタントです。\n"
+                "今日の日付は {today} です。『明日までにやること』などの文脈を正しく判断してください。\n"
+                "絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
+                "{{\"title\": \"タスク名\"}}\n"
+                "※形式が正しくないと処理ができません。"
+            ),
+            "json": False,
+            "max_tokens": None
+        },
+        "v2": {
+            "system": "タスク名をJSONで返す。「タスク」「を追加」「を削除」「を完了」などの語は除く。{{\"title\":\"レポート提出\"}}",
+            "json": True,
+            "max_tokens": 40
+        }
+    },
+    "task_details": {
+        "v1": {
+            "system": (
+                "あなたは自然文からタスク名と期限日を抽出するアシスタントです。\n"
+                "今日の日付は {today} です。『明日までに』などの文脈も正しく解釈してください。\n"
+                "絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
+                "{{\"title\": \"タスク名\", \"due\": \"2025-05-10T00:00:00.000Z\"}}\n"
+                "期限がない場合は \"due\": null を設定してください。\n"
+                "※形式が正しくないと処理ができません。"
+            ),
+            "json": False,
+            "max_tokens": None
+        },
+        "v2": {
+            "system": (
+                "今日={today}({weekday})。タスク名と期限日をJSONで返す。期限なしは null。"
+                "{{\"title\":\"レポート提出\",\"due\":\"YYYY-MM-DD\"}}"
+            ),
+            "json": True,
+            "max_tokens": 60
+        }
+    },
+    "operations": {
+        "v1": {
+            "system": (
+                "あなたは自然文から予定とタスクの操作をすべて抽出するアシスタントです。\n"
+                "今日の日付は {today} です。『明日』『明後日』なども正しく認識してください。\n"
+                "日付が省略された操作は直前の操作と同じ日付として扱ってください。\n"
+                "絶対に自然文では返さず、以下の形式のJSONだけを返してください：\n"
+                "{{\"operations\": [{{\"type\": \"schedule\", \"action\": \"register\", \"title\": \"予定名\", "
+                "\"start_time\": \"2025-04-30 15:00:00\", \"new_start_time\": null, \"due\": null}}]}}\n"
+                "type は schedule（予定）か task（タスク）、action は register / delete / update / complete のいずれかです。\n"
+                "予定の変更では new_start_time に変更後の日時、期限付きタスクでは due に \"2025-05-10\" 形式の日付を入れてください。\n"
+                "※形式が正しくないと処理ができません。"
+            ),
+            "json": False,
+            "max_tokens": None
+        },
+        "v2": {
+            "system": (
+                "今日={today}({weekday})。文中の予定・タスク操作をすべてJSONで返す。日付省略は直前と同じ日。"
+                "type=schedule|task, action=register|delete|update|complete。"
+                "{{\"operations\":[{{\"type\":\"schedule\",\"action\":\"register\",\"title\":\"会議\","
+                "\"start_time\":\"YYYY-MM-DD HH:MM:SS\",\"new_start_time\":null,\"due\":null}}]}}"
+            ),
+            "json": True,
+            "max_tokens": 400
+        }
+    },
+    "free_chat": {
+        "v1": {
+            "system": "あなたは親切で柔軟なAIアシスタントです。",
+            "json": False,
+            "max_tokens": None
+        }
+    }
+}
+
+DEFAULT_VERSIONS = {
+    "event": "v2",
+    "event_title": "v2",
+    "task_title": "v2",
+    "task_details": "v2",
+    "operations": "v2",
+    "free_chat": "v1"
+}
+
+# 🔀 使用するバージョン（PROMPT_VARIANTS で上書き）
+def promptVersion(name):
+    overrides = dict(
+        item.split("=", 1) for item in os.getenv("PROMPT_VARIANTS", "").split(",") if "=" in item
+    )
+    version = overrides.get(name, DEFAULT_VERSIONS[name]).strip()
+    return version if version in PROMPTS[name] else DEFAULT_VERSIONS[name]
+
+# 🧱 chat.completions.create に渡す引数を組み立てる（today を渡すと日付を固定できる：評価用）
+def buildRequest(name, user_input, version=None, today=None, system_suffix=""):
+    version = version or promptVersion(name)
+    template = PROMPTS[name][version]
+    day = today or datetime.now()
+    if isinstance(day, str):
+        day = datetime.strptime(day, "%Y-%m-%d")
+
+    system_content = template["system"].format(today=day.strftime("%Y-%m-%d"), weekday=WEEKDAYS[day.weekday()])
+    request = {
+        "model": template.get("model", DEFAULT_MODEL),
+        "messages": [
+            {"role": "system", "content": system_content + system_suffix},
+            {"role": "user", "content": user_input}
+        ]
+    }
+    if template.get("max_tokens"):
+        request["max_tokens"] = template["max_tokens"]
+    if template.get("json"):
+        request["response_format"] = {"type": "json_object"}
+    return request, version
+
+# 📊 呼び出しごとの記録と集計
+_stats = {}
+_stats_lock = threading.Lock()
+
+_latencies = {}             # (name, version) → 直近の所要時間（ミリ秒）
+
+def recordUsage(name, version, response, latency_ms, hedge=False):
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    record = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "prompt": name,
+        "version": version,
+        "model": getattr(response, "model", None),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency_ms": round(latency_ms, 1),
+        "hedge": hedge
+    }
+    print(f"📊 LLM呼び出し：{name}/{version} in={prompt_tokens} out={completion_tokens} {record['latency_ms']}ms"
+          + ("（ヘッジ）" if hedge else ""))
+
+    with _stats_lock:
+        stat = _stats.setdefault((name, version), {
+            "calls": 0, "hedges": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0
+        })
+        stat["calls"] += 1
+        stat["hedges"] += int(hedge)
+        _latencies.setdefault((name, version), deque(maxlen=200)).append(latency_ms)
+        stat["prompt_tokens"] += prompt_tokens
+        stat["completion_tokens"] += completion_tokens
+        stat["latency_ms"] += latency_ms
+
+    # ファイルへの追記はロックの外で（1行ずつの追記なので行が混ざることはない）
+    metrics_path = os.getenv("LLM_METRICS_PATH")
+    if metrics_path:
+        with open(metrics_path, "a") as metrics_file:
+            metrics_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
+
+# 📈 プロンプト・バージョンごとの集計（平均トークン数・平均所要時間）
+def getUsageStats():
+    with _stats_lock:
+        return {
+            f"{name}/{version}": {
+                "calls": stat["calls"],
+                "hedges": stat["hedges"],
+                "avg_prompt_tokens": round(stat["prompt_tokens"] / stat["calls"], 1),
+                "avg_completion_tokens": round(stat["completion_tokens"] / stat["calls"], 1),
+                "avg_latency_ms": round(stat["latency_ms"] / stat["calls"], 1)
+            }
+            for (name, version), stat in _stats.items()
+        }
+
+# 🪁 ヘッジ（遅い応答の保険として同じリクエストをもう1本送る）
+#    └─ LLM_HEDGE_ENABLED=1 のとき、LLM_HEDGE_PROMPTS のプロンプトで、直近の所要時間の
+#       LLM_HEDGE_PERCENTILE パーセンタイルを過ぎても応答がなければ複製リクエストを送り、先に返った有効な応答を使う
+#       追加の支出は予算（通常の呼び出し1回ごとに LLM_HEDGE_BUDGET 回分たまる、上限 LLM_HEDGE_BURST）の範囲に限る
+#    ※ 本来のリクエストは専用スレッドで送り、プール（LLM_HEDGE_WORKERS 本）はヘッジにだけ使う
+#       プールが埋まっているときはヘッジを送らない（順番待ちのヘッジは間に合わず予算を無駄にするだけなので）
+_hedge_tokens = 0.0
+_hedge_running = 0
+_hedge_lock = threading.Lock()
+_hedge_pool = None
+
+def hedgeEnabled(name):
+    if os.getenv("LLM_HEDGE_ENABLED", "0") != "1":
+        return False
+    return name in [n.strip() for n in os.getenv("LLM_HEDGE_PROMPTS", "event,free_chat").split(",")]
+
+# ⏱️ ヘッジを送るまでの待ち時間（秒）。サンプルが少ない間は LLM_HEDGE_DEFAULT_DELAY_MS
+def hedgeDelay(name, version):
+    percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    with _stats_lock:
+        samples = sorted(_latencies.get((name, version), ()))
+    if len(samples) < int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")):
+        return float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "3000")) / 1000
+    index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+    return samples[index] / 1000
+
+# 💰 予算：通常の呼び出しで貯め、ヘッジを1本送るごとに1使う
+def earnHedgeBudget():
+    global _hedge_tokens
+    with _hedge_lock:
+        _hedge_tokens = min(float(os.getenv("LLM_HEDGE_BURST", "3")),
+                            _hedge_tokens + float(os.getenv("LLM_HEDGE_BUDGET", "0.05")))
+
+def takeHedgeBudget():
+    global _hedge_tokens
+    with _hedge_lock:
+        if _hedge_tokens < 1:
+            return False
+        _hedge_tokens -= 1
+        return True
+
+def _hedgeWorkers():
+    return int(os.getenv("LLM_HEDGE_WORKERS", "16"))
+
+def _hedgePool():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=_hedgeWorkers(), thread_name_prefix="llm-hedge")
+    return _hedge_pool
+
+# 🎟️ ヘッジ用プールの空きを1つ確保（空きがなければ False）。ヘッジが終わったら解放する
+def _reserveHedgeWorker():
+    global _hedge_running
+    with _hedge_lock:
+        if _hedge_running >= _hedgeWorkers():
+            return False
+        _hedge_running += 1
+        return True
+
+def _releaseHedgeWorker():
+    global _hedge_running
+    with _hedge_lock:
+        _hedge_running -= 1
+
+# 🧵 本来のリクエストは共有プールを通さず専用スレッドで実行する（同時の呼び出しが多くても順番待ちにならない）
+def _startThread(func, *args):
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, name="llm-primary", daemon=True).start()
+    return future
+
+# ✅ JSON モードのプロンプトは JSON として読める応答だけを有効とする
+def isValidContent(name, version, content):
+    if not PROMPTS[name][version].get("json"):
+        return bool(content)
+    try:
+        json.loads(content)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def _timedCall(client, name, version, request, hedge=False):
+    started = time.perf_counter()
+    response = client.chat.completions.create(**request)
+    recordUsage(name, version, response, (time.perf_counter() - started) * 1000, hedge=hedge)
+    return response.choices[0].message.content
+
+# 🪁 ヘッジ付き呼び出し（同期版）：先に返った有効な応答を使う
+#    └─ 同期クライアントの通信は途中で止められないため、負けた側は結果を捨てるだけ（トークンは記録される）
+def _hedgedCall(client, name, version, request):
+    primary = _startThread(_timedCall, client, name, version, request)
+    done, _ = wait([primary], timeout=hedgeDelay(name, version))
+    if done or not _reserveHedgeWorker():
+        return primary.result()
+    if not takeHedgeBudget():
+        _releaseHedgeWorker()
+        return primary.result()
+
+    print(f"🪁 応答が遅いためヘッジを送信：{name}/{version}")
+    hedge = _hedgePool().submit(_timedCall, client, name, version, request, True)
+    hedge.add_done_callback(lambda _: _releaseHedgeWorker())   # 取り消された場合も解放される
+    pending = {primary, hedge}
+    content, error = None, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if isValidContent(name, version, result):
+                for other in pending:
+                    other.cancel()
+                return result
+            content = result
+    if content is None and error is not None:
+        raise error
+    return content
+
+# 🤖 レジストリのプロンプトで ChatGPT を呼び出し、応答本文を返す
+def callLLM(client, name, user_input, version=None, today=None, system_suffix=""):
+    request, version = buildRequest(name, user_input, version=version, today=today, system_suffix=system_suffix)
+    if not hedgeEnabled(name):
+        return _timedCall(client, name, version, request)
+
+    earnHedgeBudget()
+    return _hedgedCall(client, name, version, request)
@@ -0,0 +1,113 @@
+import re
+from datetime import datetime
+
+# 🔁 繰り返し予定の言い回し（「毎週月曜10時に定例」「毎月第2火曜」「平日9時」など）を RRULE に変換する
+#    └─ ChatGPTは使わずローカルで解析する。時刻が読み取れない文は None（通常の予定処理へ）
+
+_WEEKDAY_CODES = {"月": "MO", "火": "TU", "水": "WE", "木": "TH", "金": "FR", "土": "SA", "日": "SU"}
+
+_TIME = re.compile(r"(\d{1,2})(?:時(半|(\d{1,2})分)?|:(\d{2}))")
+_COUNT = re.compile(r"(\d{1,3})回")
+_UNTIL = re.compile(r"(\d{1,2})月(\d{1,2})日まで")
+
+# 判定は上から順に（先に当てはまったものを使う）
+_RULES = [
+    (re.compile(r"毎月第([1-5１-５])([月火水木金土日])曜日?"),
+     lambda m: f"FREQ=MONTHLY;BYDAY={int(m.group(1))}{_WEEKDAY_CODES[m.group(2)]}",
+     lambda m: f"毎月第{int(m.group(1))}{m.group(2)}曜"),
+    (re.compile(r"毎月(\d{1,2})日"),
+     lambda m: f"FREQ=MONTHLY;BYMONTHDAY={int(m.group(1))}",
+     lambda m: f"毎月{int(m.group(1))}日"),
+    (re.compile(r"毎月末"),
+     lambda m: "FREQ=MONTHLY;BYMONTHDAY=-1",
+     lambda m: "毎月末"),
+    (re.compile(r"毎年(\d{1,2})月(\d{1,2})日"),
+     lambda m: f"FREQ=YEARLY;BYMONTH={int(m.group(1))};BYMONTHDAY={int(m.group(2))}",
+     lambda m: f"毎年{int(m.group(1))}月{int(m.group(2))}日"),
+    # 「毎日曜」「毎月曜」のような「毎＋曜日」も毎週として扱う
+    (re.compile(r"(毎週|隔週|毎(?=[月火水木金土日]曜))((?:[月火水木金土日]曜?日?[・、とや,]?)*)"),
+     lambda m: "FREQ=WEEKLY" + (";INTERVAL=2" if m.group(1) == "隔週" else "")
+               + (";BYDAY=" + ",".join(_WEEKDAY_CODES[d] for d in re.findall(r"[月火水木金土日]", m.group(2)))
+                  if m.group(2) else ""),
+     lambda m: ("毎週" + m.group(2) if m.group(1) == "毎" else m.group(0)).rstrip("・、とや,")),
+    (re.compile(r"毎?平日"),
+     lambda m: "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+     lambda m: "平日"),
+    (re.compile(r"毎日(?!曜)"),
+     lambda m: "FREQ=DAILY",
+     lambda m: "毎日"),
+]
+
+_TITLE_JUNK = re.compile(
+    r"^(?:の|に|は|、|で)+|(?:の予定|の予約|予定)?(?:を|も)?(?:全部|すべて|全て|毎回)?に?"
+    r"(?:入れて|追加|登録|作成|削除|消して|消す|消去|キャンセル|変更|更新)(?:して|する|しといて)?(?:ください)?$"
+)
+
+def _toTime(match):
+    hour = int(match.group(1))
+    minute = 30 if match.group(2) == "半" else int(match.group(3) or match.group(4) or 0)
+    return (hour, minute) if hour <= 23 and minute <= 59 else (None, None)
+
+# ⏰ 文中の時刻だけを取り出す（「11時」「9時半」「14:30」→ (時, 分)、なければ None）
+def parseTime(text):
+    match = _TIME.search(text)
+    if not match:
+        return None
+    hour, minute = _toTime(match)
+    return None if hour is None else (hour, minute)
+
+# 🔎 繰り返しの言い回しを解析（{"rrule", "label", "hour", "minute", "title"} または None）
+def parseRecurrence(text, require_time=True):
+    for pattern, to_rule, to_label in _RULES:
+        match = pattern.search(text)
+        if match:
+            break
+    else:
+        return None
+
+    rule, label = to_rule(match), to_label(match)
+    rest = text[:match.start()] + text[match.end():]
+
+    time_match = _TIME.search(rest)
+    if time_match:
+        hour, minute = _toTime(time_match)
+        if hour is None:
+            return None
+        rest = rest[:time_match.start()] + rest[time_match.end():]
+    elif require_time:
+        return None
+    else:
+        hour = minute = None
+
+    count = _COUNT.search(rest)
+    if count:
+        rule += f";COUNT={int(count.group(1))}"
+        rest = rest[:count.start()] + rest[count.end():]
+    until = _UNTIL.search(rest)
+    if until and not count:
+        today = datetime.now().date()
+        year = today.year + (1 if (int(until.group(1)), int(until.group(2))) < (today.month, today.day) else 0)
+        # JST の終日まで（23:59:59 JST = 14:59:59 UTC）
+        rule += f";UNTIL={year:04d}{int(until.group(1)):02d}{int(until.group(2)):02d}T145959Z"
+        rest = rest[:until.start()] + rest[until.end():]
+
+    title = rest.strip(" 　、。,")
+    for _ in range(3):
+        title = _TITLE_JUNK.sub("", title).strip(" 　、。,")
+
+    return {"rrule": rule, "label": label, "hour": hour, "minute": minute, "title": title}
+
+# 📅 初回の日時（今以降で最初に規則に合う日時。COUNT / UNTIL は初回の計算には使わない）
+def firstOccurrence(rule, hour, minute, now=None):
+    from dateutil.rrule import rrulestr
+
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    anchor = now.replace(hour=hour, minute=minute)
+    base = ";".join(part for part in rule.split(";") if not part.startswith(("COUNT=", "UNTIL=")))
+    return rrulestr(base, dtstart=anchor).after(now, inc=True)
+
+# 🏷️ 返信用の表記（「毎週月曜 10:00」）
+def describe(recurrence):
+    if recurrence.get("hour") is None:
+        return recurrence["label"]
+    return f"{recurrence['label']} {recurrence['hour']:02d}:{recurrence['minute']:02d}"
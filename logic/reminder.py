@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import heapq
+import threading
+from datetime import datetime
+from dateutil.parser import parse
+from pytz import timezone
+from logic import sync_utils
+
+# ⏰ リマインダーエンジン
+#    └─ 通知時刻を最小ヒープで持ち、次の通知時刻まで Condition で眠る（ポーリングしない）
+#       予定・タスクの登録／変更（sync_utils の変更通知）と定期的な差分同期から通知時刻を更新し、
+#       期限が来たものは LINE の multicast でまとめて送る
+#       状態はスナップショット（JSON）に保存し、再起動時に復元する
+#    ※ 通知先は REMINDER_OWNER_ID（カンマ区切り）と「リマインダー登録」と送ったユーザーだけ
+
+SNAPSHOT_PATH = os.getenv("REMINDER_SNAPSHOT_PATH") or "reminders.json"
+LINE_MESSAGES_PER_REQUEST = 5
+LINE_MULTICAST_MAX_RECIPIENTS = 500
+
+_heap = []           # (通知時刻のepoch秒, reminder_id)
+_reminders = {}      # reminder_id → {"fire_at", "text"}
+_subscribers = set() # 「リマインダー登録」で通知を希望した LINE userId
+_fired = {}          # reminder_id → 送信済みの本来の通知時刻（同じ通知を二重に送らないため）
+_condition = threading.Condition()
+_save_lock = threading.Lock()
+_version = 0         # 状態を変えるたびに増やす（古いスナップショットで上書きしないため）
+_saved_version = 0
+_started = False
+
+_SUBSCRIBE = re.compile(r"^\s*リマインダー(を)?(登録|受け取る|オン)\s*$")
+_UNSUBSCRIBE = re.compile(r"^\s*リマインダー(を)?(解除|停止|オフ)\s*$")
+
+def _leadMinutes():
+    return int(os.getenv("REMINDER_LEAD_MINUTES", "10"))
+
+def _taskHour():
+    return int(os.getenv("REMINDER_TASK_HOUR", "9"))
+
+def _ownerIds():
+    return {uid.strip() for uid in os.getenv("REMINDER_OWNER_ID", "").split(",") if uid.strip()}
+
+# 📸 保存する状態の写しを取る（_condition を持った状態で呼ぶ）
+def _takeSnapshot():
+    global _version
+    # 2日以上前の送信済み記録は捨てる
+    expired = time.time() - 2 * 24 * 3600
+    for reminder_id in [k for k, target in _fired.items() if target < expired]:
+        del _fired[reminder_id]
+
+    _version += 1
+    return _version, {"reminders": dict(_reminders), "subscribers": sorted(_subscribers), "fired": dict(_fired)}
+
+# 💾 スナップショット保存（_condition の外で呼ぶ。一時ファイルに書いてから置き換え）
+def _saveSnapshot(version, snapshot):
+    global _saved_version
+    with _save_lock:
+        # 後から取った写しが先に書かれていれば、古い写しは書かない
+        if version <= _saved_version:
+            return
+        tmp_path = SNAPSHOT_PATH + ".tmp"
+        with open(tmp_path, "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file, ensure_ascii=False)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+        _saved_version = version
+
+# 📂 スナップショットから復元（期限切れ分も残っていれば起動直後に送る）
+def _loadSnapshot():
+    try:
+        with open(SNAPSHOT_PATH) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+
+    with _condition:
+        # 以前の "recipients"（メッセージを送った全員）は引き継がない
+        _subscribers.update(snapshot.get("subscribers", []))
+        _fired.update(snapshot.get("fired", {}))
+        for reminder_id, reminder in snapshot.get("reminders", {}).items():
+            _reminders[reminder_id] = reminder
+            heapq.heappush(_heap, (reminder["fire_at"], reminder_id))
+    print(f"📂 リマインダー復元：{len(_reminders)} 件、登録ユーザー {len(_subscribers)} 人")
+
+# ➕ 通知の登録・更新・取り消しをまとめて反映（{reminder_id: (本来の通知時刻, 文言) または None}）
+#    └─ 同じ reminder_id は置き換え、古いヒープ要素は取り出し時に読み飛ばす
+#       本来の通知時刻を過ぎていれば即時通知、送信済みの通知時刻と同じなら何もしない
+def applyReminders(changes):
+    if not changes:
+        return
+    now = time.time()
+    with _condition:
+        for reminder_id, reminder in changes.items():
+            if reminder is None:
+                _reminders.pop(reminder_id, None)
+                continue
+            target, text = reminder
+            if _fired.get(reminder_id) == target:
+                continue
+            fire_at = max(now, target)
+            _reminders[reminder_id] = {"fire_at": fire_at, "target": target, "text": text}
+            heapq.heappush(_heap, (fire_at, reminder_id))
+        version, snapshot = _takeSnapshot()
+        _condition.notify()
+    _saveSnapshot(version, snapshot)
+
+def setReminder(reminder_id, target, text):
+    applyReminders({reminder_id: (target, text)})
+
+def cancelReminder(reminder_id):
+    if reminder_id in _reminders:
+        applyReminders({reminder_id: None})
+
+# 👤 「リマインダー登録」「リマインダー解除」なら通知先を更新して返信文を返す（それ以外は None）
+def handleSubscription(user_id, user_message):
+    if not user_id:
+        return None
+    if _SUBSCRIBE.match(user_message):
+        subscribe = True
+    elif _UNSUBSCRIBE.match(user_message):
+        subscribe = False
+    else:
+        return None
+
+    with _condition:
+        if subscribe:
+            _subscribers.add(user_id)
+        else:
+            _subscribers.discard(user_id)
+        version, snapshot = _takeSnapshot()
+    _saveSnapshot(version, snapshot)
+    return "⏰ リマインダーを登録しました。" if subscribe else "⏰ リマインダーを解除しました。"
+
+# 📅 予定の変更を通知時刻に反映（sync_utils のリスナー）
+def onEventsChanged(calendar_id, events):
+    jst = timezone("Asia/Tokyo")
+    now = time.time()
+    changes = {}
+    for event in events:
+        reminder_id = f"event:{calendar_id}:{event['id']}"
+        start_str = event.get("start", {}).get("dateTime")
+        start = parse(start_str) if start_str else None
+        if event.get("status") == "cancelled" or start is None or start.timestamp() <= now:
+            if reminder_id in _reminders:
+                changes[reminder_id] = None
+            continue
+
+        target = start.timestamp() - _leadMinutes() * 60
+        minutes = max(1, round((start.timestamp() - max(now, target)) / 60))
+        text = f"⏰ {minutes}分後に『{event.get('summary', '予定')}』です（{start.astimezone(jst).strftime('%H:%M')}〜）"
+        changes[reminder_id] = (target, text)
+    applyReminders(changes)
+
+# ✅ タスクの変更を通知時刻に反映（期限日の REMINDER_TASK_HOUR 時に通知）
+def onTasksChanged(tasklist_id, tasks):
+    jst = timezone("Asia/Tokyo")
+    now = time.time()
+    changes = {}
+    for task in tasks:
+        reminder_id = f"task:{tasklist_id}:{task['id']}"
+        due = task.get("due")
+        fire_at = None
+        if due and not task.get("deleted") and task.get("status") != "completed":
+            # Tasks API の due は日付のみ（UTC 0時）なので、JST の期限日の指定時刻に通知する
+            due_date = parse(due).date()
+            fire_at = jst.localize(datetime(due_date.year, due_date.month, due_date.day, _taskHour())).timestamp()
+
+        # 期限日を過ぎたもの・完了や削除されたものは取り消す
+        if fire_at is None or fire_at + 24 * 3600 <= now:
+            if reminder_id in _reminders:
+                changes[reminder_id] = None
+            continue
+
+        changes[reminder_id] = (fire_at, f"📌 今日が期限のタスク『{task.get('title', '')}』があります")
+    applyReminders(changes)
+
+# 📨 期限が来た通知を LINE でまとめて送る（最大5件を1リクエスト、最大500人に multicast）
+def pushReminders(texts):
+    with _condition:
+        recipients = sorted(_ownerIds() | _subscribers)
+    if not recipients:
+        print("⚠️ リマインダー通知先（REMINDER_OWNER_ID・登録ユーザー）がないため送信をスキップ：", texts)
+        return
+
+    from logic import line_client
+    from linebot.v3.messaging.models import MulticastRequest, TextMessage
+
+    messaging_api = line_client.getMessagingApi()
+    for i in range(0, len(texts), LINE_MESSAGES_PER_REQUEST):
+        messages = [TextMessage(text=text) for text in texts[i:i + LINE_MESSAGES_PER_REQUEST]]
+        for j in range(0, len(recipients), LINE_MULTICAST_MAX_RECIPIENTS):
+            messaging_api.multicast(MulticastRequest(
+                to=recipients[j:j + LINE_MULTICAST_MAX_RECIPIENTS],
+                messages=messages
+            ))
+    print(f"📨 リマインダー送信：{len(texts)} 件 → {len(recipients)} 人")
+
+# 🔁 通知ループ：次の通知時刻まで待機し、期限が来たものをまとめて取り出して送る
+def _dispatchLoop():
+    while True:
+        with _condition:
+            while True:
+                # 取り消し・置き換え済みのヒープ要素を読み飛ばす
+                while _heap and _reminders.get(_heap[0][1], {}).get("fire_at") != _heap[0][0]:
+                    heapq.heappop(_heap)
+                if _heap and _heap[0][0] <= time.time():
+                    break
+                _condition.wait(timeout=(_heap[0][0] - time.time()) if _heap else None)
+
+            due_texts = []
+            now = time.time()
+            while _heap and _heap[0][0] <= now:
+                fire_at, reminder_id = heapq.heappop(_heap)
+                reminder = _reminders.get(reminder_id)
+                if reminder and reminder["fire_at"] == fire_at:
+                    due_texts.append(reminder["text"])
+                    _fired[reminder_id] = reminder.get("target", fire_at)
+                    del _reminders[reminder_id]
+            snapshot = _takeSnapshot() if due_texts else None
+
+        if snapshot:
+            _saveSnapshot(*snapshot)
+        if due_texts:
+            try:
+                pushReminders(due_texts)
+            except Exception as error:
+                print("❌ リマインダー送信エラー：", error)
+
+# 🔄 定期的な差分同期（REMINDER_SYNC_INTERVAL 秒ごと。カレンダーを直接編集した分を拾う）
+def _syncLoop():
+    from logic.calendar_utils import getCalendarIds
+
+    interval = int(os.getenv("REMINDER_SYNC_INTERVAL", "900"))
+    while True:
+        try:
+            calendar_ids = getCalendarIds()
+        except Exception as error:
+            print("❌ リマインダー差分同期エラー：", error)
+            calendar_ids = []
+
+        for calendar_id in calendar_ids:
+            try:
+                sync_utils.syncEvents(calendar_id)
+            except Exception as error:
+                print("❌ リマインダー差分同期エラー：", calendar_id, error)
+        try:
+            sync_utils.syncTasks()
+        except Exception as error:
+            print("❌ リマインダー差分同期エラー：", "syncTasks", error)
+        time.sleep(interval)
+
+# 🚀 リマインダーエンジン起動（プロセス内で1回だけ）
+def start():
+    global _started
+    if _started:
+        return
+    _started = True
+
+    _loadSnapshot()
+    sync_utils.addEventListener(onEventsChanged)
+    sync_utils.addTaskListener(onTasksChanged)
+    threading.Thread(target=_dispatchLoop, name="reminder-dispatch", daemon=True).start()
+    threading.Thread(target=_syncLoop, name="reminder-sync", daemon=True).start()
+    print("⏰ リマインダーエンジン起動")
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+# 🔗 予定・タスクの変更通知をプロセス間で共有する（SQLite の追記ログ）
+#    └─ sync_utils の変更通知はプロセス内のリスナーにしか届かないため、gunicorn の別ワーカーや
+#       queue_worker.py のプロセスで登録・変更した予定が、このプロセスの予定キャッシュ・ダイジェストに反映されない
+#       SHARED_CHANGES_ENABLED=1 のとき、publishEvents / publishTasks の内容をここに書き込み、
+#       各プロセスのポーリングスレッドが他プロセスの書き込みを読んで自プロセスのリスナーへ配り直す
+#       カレンダー通知を受けたワーカーが通知チャネルの担当プロセスでない場合の差分同期依頼にも使う
+#    ※ 保存先の既定は作業キュー（WORK_QUEUE_PATH）と同じファイル（テーブルは別）
+
+_local = threading.local()
+_origin = None
+_origin_pid = None
+_sync_handlers = []
+_started = False
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    source_id   TEXT NOT NULL,
+    items       TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+"""
+
+def enabled():
+    return os.getenv("SHARED_CHANGES_ENABLED", "0") == "1"
+
+# 🧭 変更通知が全プロセスに届く構成か（共有ログあり、または SINGLE_PROCESS=1 で1プロセスだけで動かしている）
+def reachesAllProcesses():
+    return enabled() or os.getenv("SINGLE_PROCESS", "0") == "1"
+
+def _path():
+    return os.getenv("SHARED_CHANGES_PATH") or os.getenv("WORK_QUEUE_PATH") or "work_queue.db"
+
+def _pollInterval():
+    return float(os.getenv("SHARED_CHANGES_POLL_INTERVAL", "1"))
+
+# 🆔 このプロセスの識別子（自分の書き込みを読み飛ばすため。fork 後は作り直す）
+def _originId():
+    global _origin, _origin_pid
+    if _origin_pid != os.getpid():
+        _origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        _origin_pid = os.getpid()
+    return _origin
+
+# 🔌 スレッド・プロセスごとの接続（fork 後は作り直す）
+def getConnection():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(_path(), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+# 📝 変更を書き込む（kind は "events" / "tasks" / "sync"）。失敗しても本処理は止めない
+def append(kind, source_id, items):
+    if not enabled():
+        return
+    try:
+        getConnection().execute(
+            "INSERT INTO changes (origin, kind, source_id, items, created_at) VALUES (?, ?, ?, ?, ?)",
+            (_originId(), kind, source_id, json.dumps(items, ensure_ascii=False), time.time())
+        )
+    except sqlite3.Error as error:
+        print("⚠️ 共有変更ログへの書き込みエラー：", error)
+
+# 📡 差分同期の依頼（通知チャネルの担当プロセスが addSyncHandler で受け取る）
+def requestSync(calendar_id):
+    append("sync", calendar_id, [])
+
+def addSyncHandler(func):
+    if func not in _sync_handlers:
+        _sync_handlers.append(func)
+
+# 📬 他プロセスの変更を、このプロセスのリスナーへ配る
+def _dispatch(row):
+    from logic import sync_utils
+
+    items = json.loads(row["items"])
+    if row["kind"] == "events":
+        sync_utils._notify(sync_utils._event_listeners, row["source_id"], items)
+    elif row["kind"] == "tasks":
+        sync_utils._notify(sync_utils._task_listeners, row["source_id"], items)
+    elif row["kind"] == "sync":
+        for handler in list(_sync_handlers):
+            handler(row["source_id"])
+
+def _pollLoop():
+    conn = getConnection()
+    row = conn.execute("SELECT MAX(seq) AS seq FROM changes").fetchone()
+    last_seq = row["seq"] or 0
+    last_purge = 0.0
+
+    while True:
+        time.sleep(_pollInterval())
+        try:
+            rows = conn.execute(
+                "SELECT * FROM changes WHERE seq > ? ORDER BY seq", (last_seq,)
+            ).fetchall()
+            for row in rows:
+                last_seq = row["seq"]
+                if row["origin"] != _originId():
+                    _dispatch(row)
+
+            # 1時間より古い変更は捨てる（起動時は最新の seq から読むので不要）
+            if time.time() - last_purge > 600:
+                conn.execute("DELETE FROM changes WHERE created_at < ?", (time.time() - 3600,))
+                last_purge = time.time()
+        except Exception as error:
+            print("❌ 共有変更ログの読み込みエラー：", error)
+
+# 🚀 ポーリングスレッドを起動（プロセス内で1回だけ。SHARED_CHANGES_ENABLED=1 のときだけ）
+def start():
+    global _started
+    if _started or not enabled():
+        return
+    _started = True
+    threading.Thread(target=_pollLoop, name="shared-changes", daemon=True).start()
+    print(f"🔗 共有変更ログの監視を開始：{_path()}")
@@ -0,0 +1,170 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from logic import shared_changes
+
+# 🔄 予定・タスクの変更通知と差分同期
+#    └─ registerSchedule などの登録・変更処理と、syncToken / updatedMin を使った差分同期の結果を
+#       同じ形（API のイベント／タスク dict のリスト）でリスナーへ配る
+#       削除されたものは status が "cancelled"（予定）/ deleted=True（タスク）で届く
+
+SYNC_STATE_PATH = os.getenv("SYNC_STATE_PATH") or "sync_state.json"
+
+def _windowDays():
+    return int(os.getenv("SYNC_WINDOW_DAYS", "30"))
+
+_event_listeners = []
+_task_listeners = []
+_state = None
+_state_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+# 👂 リスナー登録（func(calendar_id, events) / func(tasklist_id, tasks)）
+def addEventListener(func):
+    if func not in _event_listeners:
+        _event_listeners.append(func)
+
+def addTaskListener(func):
+    if func not in _task_listeners:
+        _task_listeners.append(func)
+
+def _notify(listeners, source_id, items):
+    for listener in list(listeners):
+        try:
+            listener(source_id, items)
+        except Exception as error:
+            # リスナーの失敗で本処理（登録・削除など）を止めない
+            print("⚠️ 変更通知リスナーエラー：", listener, error)
+
+# 📣 変更を通知（予定）。SHARED_CHANGES_ENABLED=1 なら他プロセスにも共有ログ経由で届ける
+def publishEvents(calendar_id, events):
+    if events:
+        _notify(_event_listeners, calendar_id, events)
+        shared_changes.append("events", calendar_id, events)
+
+# 📣 変更を通知（タスク）
+def publishTasks(tasklist_id, tasks):
+    if tasks:
+        _notify(_task_listeners, tasklist_id, tasks)
+        shared_changes.append("tasks", tasklist_id, tasks)
+
+# 💾 同期状態（syncToken・最終同期時刻）の読み書き
+def _loadState():
+    global _state
+    if _state is None:
+        try:
+            with open(SYNC_STATE_PATH) as state_file:
+                _state = json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _state = {"event_sync_tokens": {}, "task_updated_min": {}}
+        _state.setdefault("event_sync_windows", {})
+    return _state
+
+def _saveState():
+    tmp_path = SYNC_STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as state_file:
+        json.dump(_state, state_file, ensure_ascii=False)
+    os.replace(tmp_path, SYNC_STATE_PATH)
+
+# 📆 予定の差分同期（初回は直近分を全件取得し、以降は syncToken で変更分だけ取得）
+def syncEvents(calendar_id=None):
+    from logic.calendar_utils import getCalendarService
+    from googleapiclient.errors import HttpError
+
+    calendar_id = calendar_id or os.getenv("GOOGLE_CALENDAR_ID")
+    if not calendar_id:
+        raise ValueError("GOOGLE_CALENDAR_ID が未設定です")
+
+    with _sync_lock:
+        now = datetime.now(timezone.utc)
+        with _state_lock:
+            state = _loadState()
+            sync_token = state["event_sync_tokens"].get(calendar_id)
+            window_end = state["event_sync_windows"].get(calendar_id)
+
+        # 全件同期は「昨日〜SYNC_WINDOW_DAYS 日後」に絞る（繰り返し予定の先々の回まで展開しない）
+        # 期間の半分を過ぎたら、新しく期間に入った回を拾うため全件同期し直す
+        if sync_token and (not window_end or datetime.fromisoformat(window_end) < now + timedelta(days=_windowDays() / 2)):
+            print("🔄 同期期間の更新のため全件同期します：", calendar_id)
+            sync_token = None
+
+        service = getCalendarService()
+        changed = []
+        page_token = None
+        full = sync_token is None
+        time_max = (now + timedelta(days=_windowDays())).isoformat()
+
+        while True:
+            params = {"calendarId": calendar_id, "singleEvents": True, "showDeleted": True,
+                      "maxResults": 2500, "pageToken": page_token}
+            if sync_token:
+                params["syncToken"] = sync_token
+            else:
+                params["timeMin"] = (now - timedelta(days=1)).isoformat()
+                params["timeMax"] = time_max
+
+            try:
+                result = service.events().list(**params).execute()
+            except HttpError as error:
+                if error.resp.status == 410 and sync_token:
+                    # syncToken が失効 → 全件同期からやり直す
+                    print("⚠️ syncToken 失効のため全件同期します：", calendar_id)
+                    sync_token, page_token, changed, full = None, None, [], True
+                    continue
+                raise
+
+            changed.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+
+        with _state_lock:
+            state = _loadState()
+            state["event_sync_tokens"][calendar_id] = result.get("nextSyncToken")
+            if full:
+                state["event_sync_windows"][calendar_id] = time_max
+            _saveState()
+
+    print(f"🔄 予定同期（{'全件' if full else '差分'}）：{calendar_id} 変更 {len(changed)} 件")
+    publishEvents(calendar_id, changed)
+    return changed
+
+# ✅ タスクの差分同期（対象の全タスクリストについて、updatedMin 以降に更新されたタスクだけ取得）
+def syncTasks():
+    from logic.task_utils import getTasksService, getTasklistIds
+
+    changed = []
+    for tasklist_id in getTasklistIds(getTasksService()):
+        changed.extend(_syncTasklist(tasklist_id))
+    return changed
+
+def _syncTasklist(tasklist_id):
+    from logic.task_utils import getTasksService
+
+    with _sync_lock:
+        service = getTasksService()
+        with _state_lock:
+            updated_min = _loadState()["task_updated_min"].get(tasklist_id)
+
+        started = datetime.now(timezone.utc).isoformat()
+        changed = []
+        page_token = None
+        while True:
+            params = {"tasklist": tasklist_id, "showCompleted": True, "showDeleted": True,
+                      "showHidden": True, "maxResults": 100, "pageToken": page_token}
+            if updated_min:
+                params["updatedMin"] = updated_min
+            result = service.tasks().list(**params).execute()
+            changed.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+
+        with _state_lock:
+            _loadState()["task_updated_min"][tasklist_id] = started
+            _saveState()
+
+    print(f"🔄 タスク同期：{tasklist_id} 変更 {len(changed)} 件")
+    publishTasks(tasklist_id, changed)
+    return changed
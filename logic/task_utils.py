@@ -1,49 +1,109 @@
 import os
 import re
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import time
+import threading
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from logic import google_client
+from logic.title_index import TitleIndex
+from logic import sync_utils
+from logic import context_store
 
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
+TASKS_SCOPES = ["https://www.googleapis.com/auth/tasks"]
+
 # ✅ Google認証情報を取得（token.jsonベース）
 def getCredentials():
-    token_path = os.getenv("GOOGLE_TOKEN_JSON") or "/home/bepro/projects/ai_butler/token.json"
-    if not token_path:
-        raise ValueError("GOOGLE_TOKEN_JSON が未設定です")
-
-    # token.json を元に認証情報を構築
-    creds = Credentials.from_authorized_user_file(
-        token_path,
-        scopes=["https://www.googleapis.com/auth/tasks"]
-    )
-
-    # トークンが期限切れならリフレッシュ
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        with open(token_path, "w") as token_file:
-            token_file.write(creds.to_json())
-
-    print("✅ GOOGLE_TOKEN_JSON:", token_path)
-    return creds
-
-# ✅ 「マイタスク」のIDをリスト一覧から検索
-def getDefaultTasklistId(service):
+    return google_client.getCredentials(TASKS_SCOPES)
+
+# 🧰 Tasks API サービスを取得（接続プールと一緒に使い回し）
+def getTasksService():
+    return google_client.getService("tasks", "v1", TASKS_SCOPES)
+
+# 📚 対象のタスクリスト名（GOOGLE_TASKLISTS、カンマ区切り。先頭が登録先。既定は「マイタスク」のみ）
+def getTasklistNames():
+    names = [n.strip() for n in os.getenv("GOOGLE_TASKLISTS", "マイタスク").split(",") if n.strip()]
+    return names or ["マイタスク"]
+
+# 🗂️ タスクリスト名 → ID（tasklists.list の結果を TASKLIST_CACHE_TTL 秒キャッシュ）
+_tasklist_ids = {}
+_tasklist_lock = threading.Lock()
+
+def getTasklistIds(service):
+    names = tuple(getTasklistNames())
+    with _tasklist_lock:
+        cached = _tasklist_ids.get(names)
+    if cached and time.monotonic() - cached[0] < float(os.getenv("TASKLIST_CACHE_TTL", "600")):
+        return cached[1]
+
     results = service.tasklists().list().execute()
+    by_title = {}
     for item in results.get("items", []):
         print("🧩 リスト検出:", item["title"], "→", item["id"])
-        if item["title"].strip() == "マイタスク":
-            return item["id"]
-    raise ValueError("『マイタスク』が見つかりませんでした。")
+        by_title.setdefault(item["title"].strip(), item["id"])
+
+    for name in names:
+        if name not in by_title:
+            print(f"⚠️ タスクリスト『{name}』が見つかりませんでした。")
+    ids = [by_title[name] for name in names if name in by_title]
+    if not ids or names[0] not in by_title:
+        raise ValueError(f"『{names[0]}』が見つかりませんでした。")
+
+    with _tasklist_lock:
+        _tasklist_ids[names] = (time.monotonic(), ids)
+    return ids
+
+# ✅ 登録先のタスクリスト（GOOGLE_TASKLISTS の先頭、既定は「マイタスク」）のID
+def getDefaultTasklistId(service):
+    return getTasklistIds(service)[0]
+
+# 🌐 対象の全タスクリストのタスクを同時に取得（(タスクリストID, タスク) のリスト、同じIDは1件に）
+def listTasksAcross(service, show_completed=True):
+    def fetch(tasklist_id):
+        items, page_token = [], None
+        while True:
+            result = getTasksService().tasks().list(
+                tasklist=tasklist_id, showCompleted=show_completed, maxResults=100, pageToken=page_token
+            ).execute()
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    tasklist_ids = getTasklistIds(service)
+    results = google_client.fanOut(fetch, tasklist_ids)
+
+    pairs, seen = [], set()
+    for tasklist_id in tasklist_ids:
+        for task in results.get(tasklist_id, []):
+            if task.get("id") in seen:
+                continue
+            seen.add(task.get("id"))
+            pairs.append((tasklist_id, task))
+    return pairs
+
+# ♻️ 作業キューの再試行時、前回の試行で登録済みの同じタイトルの未完了タスクを探す（Tasks API は ID 指定で登録できないため）
+def _findRetriedTask(service, tasklist_id, title, due=None):
+    since = context_store.retrySince()
+    if since is None:
+        return None
+
+    result = service.tasks().list(tasklist=tasklist_id, showCompleted=False, maxResults=100).execute()
+    for task in result.get("items", []):
+        if task.get("title") != title or (due and (task.get("due") or "")[:10] != due[:10]):
+            continue
+        # 前回の試行より前からあるタスクは別物として扱う
+        if task.get("updated") and datetime.fromisoformat(task["updated"].replace("Z", "+00:00")).timestamp() >= since:
+            print("♻️ 前回の試行で登録済みのタスクです：", task.get("id"))
+            return task
+    return None
 
 # ✅ タスク登録処理（タイトルのみ登録）
 def registerTask(title):
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
+        service = getTasksService()
 
         tasklist_id = getDefaultTasklistId(service)
         task = {
@@ -51,76 +111,146 @@ def registerTask(title):
         }
 
         # タスク登録実行
-        result = service.tasks().insert(tasklist=tasklist_id, body=task).execute()
+        result = _findRetriedTask(service, tasklist_id, title) or service.tasks().insert(tasklist=tasklist_id, body=task).execute()
         print("✅ 登録タスク:", result.get("title"))
+        sync_utils.publishTasks(tasklist_id, [result])
+        context_store.remember("task", result.get("id"), tasklist_id, title)
         return f"タスク『{title}』を登録しました。"
 
     except Exception as e:
         print(f"❌ タスク登録エラー：{e}")
         return f"タスク登録中にエラーが発生しました。エラー詳細: {e}"
 
-# ✅ タスク一覧を取得し、整形して返す
-def listTasks():
-    try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
+# 📝 未完了タスク一覧を返信用の文字列に整形
+def formatTaskList(tasks):
+    if not tasks:
+        return "現在、タスクは登録されていません。"
 
-        tasklist_id = getDefaultTasklistId(service)
-        print("📦 使用中のtasklist_id:", tasklist_id)
+    response = "現在のタスク一覧です：\n"
+    for task in tasks:
+        title = task.get("title", "").strip()
+        status = task.get("status", "")
+        due_str = task.get("due", None)
 
-        results = service.tasks().list(tasklist=tasklist_id, showCompleted=True).execute()
-        tasks = results.get("items", [])
+        if not title or status != "needsAction":
+            continue
 
-        if not tasks:
-            return "現在、タスクは登録されていません。"
+        if due_str:
+            try:
+                due = datetime.strptime(due_str[:10], "%Y-%m-%d")
+                if due.year < 2015:
+                    continue
+            except Exception as e:
+                print("⚠️ 日付パース失敗:", e)
 
-        response = "現在のタスク一覧です：\n"
-        for task in tasks:
-            title = task.get("title", "").strip()
-            status = task.get("status", "")
-            due_str = task.get("due", None)
+        response += f"・{title}\n"
 
-            if not title or status != "needsAction":
-                continue
+    if response.strip() == "現在のタスク一覧です：":
+        return "現在、タイトルのあるタスクは登録されていません。"
+
+    return response
+
+# 📝 完了済みタスク一覧を返信用の文字列に整形
+def formatCompletedTasks(tasks):
+    completed_tasks = [task for task in tasks if task.get("status") == "completed"]
 
-            if due_str:
-                try:
-                    due = datetime.strptime(due_str[:10], "%Y-%m-%d")
-                    if due.year < 2015:
-                        continue
-                except Exception as e:
-                    print("⚠️ 日付パース失敗:", e)
+    print("📦 完了済みタスク数:", len(completed_tasks))
+    print("📦 完了済みタスク内容:", completed_tasks)
 
+    if not completed_tasks:
+        return "完了済みのタスクはありません。"
+
+    response = "✅ 完了済みタスク一覧です：\n"
+    for task in completed_tasks:
+        title = task.get("title", "").strip()
+        if title:
             response += f"・{title}\n"
 
-        if response.strip() == "現在のタスク一覧です：":
-            return "現在、タイトルのあるタスクは登録されていません。"
+    return response
+
+# 📝 期限付きタスク（未完了）一覧を返信用の文字列に整形
+def formatTasksWithDue(tasks):
+    response = "期限付きタスク一覧：\n"
+    for task in tasks:
+        title = task.get("title", "").strip()
+        due = task.get("due")
+        status = task.get("status")
+
+        if due and status != "completed":
+            due_date = due.split("T")[0]
+            response += f"・{title}：期限 {due_date}\n"
 
-        return response
+    if response.strip() == "期限付きタスク一覧：":
+        return "現在、期限付きのタスクは登録されていません。"
+
+    return response
+
+# ✅ タスク一覧を取得し、整形して返す
+def listTasks():
+    try:
+        service = getTasksService()
+
+        # 未完了だけ取得（完了済みがたまっても取得件数が増えない）
+        tasks = [task for _, task in listTasksAcross(service, show_completed=False)]
+
+        return formatTaskList(tasks)
 
     except Exception as e:
         print(f"❌ タスク一覧取得エラー：{e}")
         return f"タスクの一覧取得中にエラーが発生しました。エラー詳細: {e}"
 
-# ✅ 指定タイトルのタスクを削除（先頭一致1件）
+# 🔤 タスク名の類似検索インデックス（取得した一覧から差分で更新）
+_task_index = TitleIndex()
+
+# 🔍 一覧からタイトルに合うタスクを1件探す（完全一致 → n-gram 類似度の順）
+#    └─ 先頭一致・部分一致も類似度のしきい値を通す（長さの比で採点されるので「牛」だけでは「牛乳を買う」に当たらない）
+#    ※ タイトルが空なら None（一覧の先頭のタスクを削除・完了にしないため）
+#    ※ exact=True なら完全一致だけ（作業キューの再試行で、前回削除したタスクの代わりに似た別のタスクを選ばないため）
+def findTaskByTitle(tasks, target_title, prune=False, exact=False):
+    target = (target_title or "").strip().lower()
+    if not target:
+        return None
+
+    by_id = {task["id"]: task for task in tasks if task.get("id")}
+    _task_index.sync({task_id: task.get("title", "") for task_id, task in by_id.items()}, prune=prune)
+
+    for task in by_id.values():
+        if task.get("title", "").strip().lower() == target:
+            return task
+    if exact:
+        return None
+
+    best_id = _task_index.best(target_title, candidates=by_id.keys())
+    if best_id:
+        print(f"🔤 類似タイトルで一致：{target_title} → {by_id[best_id].get('title')}")
+        return by_id[best_id]
+    return None
+
+# ✅ 指定タイトルのタスクを削除（完全一致・類似タイトルの1件）
 def deleteTask(target_title):
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
+        service = getTasksService()
 
-        tasklist_id = getDefaultTasklistId(service)
-        results = service.tasks().list(tasklist=tasklist_id, showCompleted=True).execute()
-        tasks = results.get("items", [])
+        # 作業キューの再試行：前回の試行で対象にしたタスクを ID で削除し直す（削除済みなら成功扱い）
+        operation = f"task_delete:{target_title}"
+        touched = context_store.touchedBefore(operation)
+        if touched:
+            return deleteTaskById({"container_id": touched["container_id"], "id": touched["id"], "title": touched["title"]})
 
-        for task in tasks:
-            title = task.get("title", "").strip()
-            task_id = task.get("id")
+        pairs = listTasksAcross(service, show_completed=True)
+        owners = {task.get("id"): tasklist_id for tasklist_id, task in pairs}
 
-            # タイトルが先頭一致するか部分一致で削除対象を判定
-            if title.lower().startswith(target_title.lower()):  # 前方一致を使用
-                service.tasks().delete(tasklist=tasklist_id, task=task_id).execute()
-                print(f"✅ タスク削除成功：{title}")
-                return f"タスク『{title}』を削除しました。"
+        task = findTaskByTitle([task for _, task in pairs], target_title, prune=True,
+                               exact=context_store.retrySince() is not None)
+        if task:
+            tasklist_id = owners[task["id"]]
+            title = task.get("title", "").strip()
+            context_store.recordTouched(operation, tasklist_id, task["id"], title)
+            service.tasks().delete(tasklist=tasklist_id, task=task["id"]).execute()
+            _task_index.remove(task["id"])
+            sync_utils.publishTasks(tasklist_id, [{"id": task["id"], "deleted": True}])
+            print(f"✅ タスク削除成功：{title}")
+            return f"タスク『{title}』を削除しました。"
 
         return f"指定されたタスク『{target_title}』は見つかりませんでした。"
 
@@ -131,25 +261,32 @@ def deleteTask(target_title):
 # ✅ 指定されたタイトルのタスクを完了状態にする
 def completeTask(target_title):
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
+        service = getTasksService()
 
-        tasklist_id = getDefaultTasklistId(service)
+        # 作業キューの再試行：前回の試行で対象にしたタスクを ID で完了にし直す
+        operation = f"task_complete:{target_title}"
+        touched = context_store.touchedBefore(operation)
+        if touched:
+            return completeTaskById({"container_id": touched["container_id"], "id": touched["id"], "title": touched["title"]})
 
         # 未完了タスクのみ取得（完了済みは対象外）
-        results = service.tasks().list(tasklist=tasklist_id, showCompleted=False).execute()
-        tasks = results.get("items", [])
+        pairs = listTasksAcross(service, show_completed=False)
+        owners = {task.get("id"): tasklist_id for tasklist_id, task in pairs}
 
-        for task in tasks:
+        task = findTaskByTitle([task for _, task in pairs], target_title, exact=context_store.retrySince() is not None)
+        if task:
+            tasklist_id = owners[task["id"]]
             title = task.get("title", "").strip()
-            if title == target_title:
-                if task["status"] == "completed":  # すでに完了していたらスキップ
-                    print(f"⚠️ タスク『{title}』はすでに完了しています。")
-                    return f"タスク『{title}』はすでに完了しています。"
-                task["status"] = "completed"
-                service.tasks().update(tasklist=tasklist_id, task=task["id"], body=task).execute()
-                print(f"✅ 完了マークを付けたタスク: {title}")
-                return f"タスク『{title}』を完了にしました。"
+            if task["status"] == "completed":  # すでに完了していたらスキップ
+                print(f"⚠️ タスク『{title}』はすでに完了しています。")
+                return f"タスク『{title}』はすでに完了しています。"
+            context_store.recordTouched(operation, tasklist_id, task["id"], title)
+            task["status"] = "completed"
+            service.tasks().update(tasklist=tasklist_id, task=task["id"], body=task).execute()
+            sync_utils.publishTasks(tasklist_id, [task])
+            context_store.remember("task", task["id"], tasklist_id, title, due=task.get("due"))
+            print(f"✅ 完了マークを付けたタスク: {title}")
+            return f"タスク『{title}』を完了にしました。"
 
         return f"指定されたタスク『{target_title}』は見つかりませんでした。"
     except Exception as e:
@@ -160,71 +297,21 @@ def completeTask(target_title):
 # ✅ 完了済みタスク一覧を返す関数
 def listCompletedTasks():
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
-
-        tasklist_id = getDefaultTasklistId(service)
-        print("📦 使用中のtasklist_id（完了済み確認）:", tasklist_id)
+        service = getTasksService()
 
         # 完了タスクのみ取得（showCompleted=True + statusで絞り込み）
-        results = service.tasks().list(
-            tasklist=tasklist_id,
-            showCompleted=True
-        ).execute()
-
-        tasks = results.get("items", [])
-        completed_tasks = [task for task in tasks if task.get("status") == "completed"]
+        tasks = [task for _, task in listTasksAcross(service, show_completed=True)]
 
-        print("📦 完了済みタスク数:", len(completed_tasks))
-        print("📦 完了済みタスク内容:", completed_tasks)
-
-        if not completed_tasks:
-            return "完了済みのタスクはありません。"
-
-        response = "✅ 完了済みタスク一覧です：\n"
-        for task in completed_tasks:
-            title = task.get("title", "").strip()
-            if title:
-                response += f"・{title}\n"
-
-        return response
+        return formatCompletedTasks(tasks)
 
     except Exception as e:
         print("❌ 完了済みタスク取得エラー：", e)
         return "完了済みタスク一覧の取得中にエラーが発生しました。"
 
 # 📌 期限付きタスクを登録する
-def registerTaskWithDue(title, due):
-    try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
-
-        tasklist_id = getDefaultTasklistId(service)
-        print("📦 使用中のtasklist_id:", tasklist_id)
-
-        task_body = {
-            "title": title
-        }
-
-        if due:
-            # 文字列からdatetimeへ変換し、UTCのISO形式にする
-            from datetime import datetime, timezone
-            due_dt = datetime.strptime(due, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-            task_body["due"] = due_dt.isoformat()
-
-        result = service.tasks().insert(tasklist=tasklist_id, body=task_body).execute()
-        print("✅ 登録されたタスク:", result)
-        return f"✅ タスク『{title}』を登録しました。期限: {due if due else '指定なし'}"
-
-    except Exception as e:
-        print("❌ タスク登録（期限付き）エラー：", e)
-        return "タスク登録中にエラーが発生しました。"
-
-# ✅ 期限付きのタスク（未完了）だけを抽出して一覧表示
 def registerTaskWithDue(title, due_raw):
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
+        service = getTasksService()
         tasklist_id = getDefaultTasklistId(service)
         print("📦 使用中のtasklist_id:", tasklist_id)
 
@@ -247,8 +334,10 @@ def registerTaskWithDue(title, due_raw):
             "due": due
         }
 
-        result = service.tasks().insert(tasklist=tasklist_id, body=task_body).execute()
+        result = _findRetriedTask(service, tasklist_id, title, due) or service.tasks().insert(tasklist=tasklist_id, body=task_body).execute()
         print("✅ 登録されたタスク:", result)
+        sync_utils.publishTasks(tasklist_id, [result])
+        context_store.remember("task", result.get("id"), tasklist_id, title, due=due)
         
   # 🔧 ここでフォーマット変換（末尾の"Z"は除去）
         formatted_due = datetime.strptime(due.replace("Z", ""), "%Y-%m-%dT%H:%M:%S").strftime("%Y-%m-%d")
@@ -263,32 +352,157 @@ def registerTaskWithDue(title, due_raw):
 # ✅ 期限付きタスク（未完了）を一覧で返す
 def listTasksWithDue():
     try:
-        creds = getCredentials()
-        service = build("tasks", "v1", credentials=creds)
-        tasklist_id = getDefaultTasklistId(service)
-        print("📦 使用中のtasklist_id:", tasklist_id)
+        service = getTasksService()
 
-        results = service.tasks().list(tasklist=tasklist_id, showCompleted=True).execute()
-        tasks = results.get("items", [])
+        # 全リストの未完了分を期限順に並べる（期限なしは formatTasksWithDue で除外される）
+        tasks = [task for _, task in listTasksAcross(service, show_completed=False)]
+        tasks.sort(key=lambda task: task.get("due") or "")
+        return formatTasksWithDue(tasks)
 
-        response = "期限付きタスク一覧：\n"
-        for task in tasks:
-            title = task.get("title", "").strip()
-            due = task.get("due")
-            status = task.get("status")
+    except Exception as e:
+        print("❌ 期限付きタスク一覧取得エラー：", e)
+        return "期限付きタスク一覧の取得中にエラーが発生しました。"
+
+        import re
+        
+
+# ✅ 直前に操作したタスク（会話コンテキスト）を ID 指定で完了にする（一覧取得なしの patch 1回）
+def completeTaskById(context):
+    try:
+        service = getTasksService()
+        result = service.tasks().patch(
+            tasklist=context["container_id"], task=context["id"], body={"status": "completed"}
+        ).execute()
+        sync_utils.publishTasks(context["container_id"], [result])
+        print(f"✅ 完了マークを付けたタスク: {context['title']}")
+        return f"タスク『{context['title']}』を完了にしました。"
+
+    except Exception as e:
+        # 再試行で前回の試行の後に消されていた場合は、完了にしたのと同じ扱い
+        if context_store.retrySince() is not None and google_client.isNotFound(e):
+            print(f"♻️ タスク『{context['title']}』は見つからないため処理済みとみなします")
+            return f"タスク『{context['title']}』を完了にしました。"
+        print("❌ タスク完了エラー：", e)
+        return "タスクの完了処理中にエラーが発生しました。"
+
+# ✅ 直前に操作したタスク（会話コンテキスト）を ID 指定で削除
+def deleteTaskById(context):
+    try:
+        service = getTasksService()
+        service.tasks().delete(tasklist=context["container_id"], task=context["id"]).execute()
+        _task_index.remove(context["id"])
+        sync_utils.publishTasks(context["container_id"], [{"id": context["id"], "deleted": True}])
+        print(f"✅ タスク削除成功：{context['title']}")
+        return f"タスク『{context['title']}』を削除しました。"
+
+    except Exception as e:
+        # 再試行で見つからない＝前回の試行で削除済み
+        if context_store.retrySince() is not None and google_client.isNotFound(e):
+            print(f"♻️ タスク『{context['title']}』は前回の試行で削除済みです")
+            _task_index.remove(context["id"])
+            sync_utils.publishTasks(context["container_id"], [{"id": context["id"], "deleted": True}])
+            return f"タスク『{context['title']}』を削除しました。"
+        print("❌ タスク削除エラー：", e)
+        return "タスク削除中にエラーが発生しました。"
 
-            if due and status != "completed":
-                due_date = due.split("T")[0]
-                response += f"・{title}：期限 {due_date}\n"
+# 🧹 完了済みタスクをまとめて片付ける（タスクリストごとに tasks.clear を1回。完了済みは非表示になり一覧に返らなくなる）
+def clearCompletedTasks():
+    try:
+        service = getTasksService()
 
-        if response.strip() == "期限付きタスク一覧：":
-            return "現在、期限付きのタスクは登録されていません。"
+        def clear(tasklist_id):
+            getTasksService().tasks().clear(tasklist=tasklist_id).execute()
+            return True
 
-        return response
+        tasklist_ids = getTasklistIds(service)
+        cleared = google_client.fanOut(clear, tasklist_ids)
+        print(f"🧹 完了済みタスクをクリア：{len(cleared)}/{len(tasklist_ids)} リスト")
+        if len(cleared) < len(tasklist_ids):
+            return (f"完了済みのタスクを削除しましたが、{len(tasklist_ids) - len(cleared)} 件のタスクリストで失敗しました。"
+                    "時間をおいて再度お試しください。")
+        return "完了済みのタスクをすべて削除しました。"
 
     except Exception as e:
-        print("❌ 期限付きタスク一覧取得エラー：", e)
-        return "期限付きタスク一覧の取得中にエラーが発生しました。"
+        print("❌ 完了済みタスクのクリアエラー：", e)
+        return "完了済みタスクの削除中にエラーが発生しました。"
+
+# 📦 複数件の変更をバッチリクエストでまとめて送る（TASKS_BATCH_SIZE 件ずつ、成功したタスクIDの集合を返す）
+def _executeBatch(service, requests):
+    succeeded = set()
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            print(f"❌ バッチ内の処理エラー（{request_id}）：", exception)
+        else:
+            succeeded.add(request_id)
+
+    size = int(os.getenv("TASKS_BATCH_SIZE", "50"))
+    for i in range(0, len(requests), size):
+        batch = service.new_batch_http_request(callback=callback)
+        for task_id, request in requests[i:i + size]:
+            batch.add(request, request_id=task_id)
+        batch.execute()
+    return succeeded
+
+# ⏰ 期限切れ（期限日が今日より前）の未完了タスク
+def _overdueTasks(pairs):
+    today = datetime.now(timezone(timedelta(hours=9))).strftime("%Y-%m-%d")   # 日本時間の今日
+    return [(tasklist_id, task) for tasklist_id, task in pairs
+            if task.get("status") == "needsAction" and task.get("due") and task["due"][:10] < today]
+
+# ✅ 期限切れタスクをまとめて完了にする
+def completeOverdueTasks():
+    try:
+        service = getTasksService()
+        targets = _overdueTasks(listTasksAcross(service, show_completed=False))
+        if not targets:
+            return "期限切れのタスクはありません。"
+
+        succeeded = _executeBatch(service, [
+            (task["id"], service.tasks().patch(tasklist=tasklist_id, task=task["id"], body={"status": "completed"}))
+            for tasklist_id, task in targets
+        ])
+
+        done = {}
+        for tasklist_id, task in targets:
+            if task["id"] in succeeded:
+                done.setdefault(tasklist_id, []).append(dict(task, status="completed"))
+        for tasklist_id, tasks in done.items():
+            sync_utils.publishTasks(tasklist_id, tasks)
+
+        print(f"✅ まとめて完了：{len(succeeded)}/{len(targets)} 件")
+        return f"{len(succeeded)}件のタスクを完了にしました。" + \
+            (f"（{len(targets) - len(succeeded)}件は失敗）" if len(succeeded) < len(targets) else "")
 
-        import re
-        
\ No newline at end of file
+    except Exception as e:
+        print("❌ まとめて完了エラー：", e)
+        return "タスクの完了処理中にエラーが発生しました。"
+
+# 🗑️ 期限切れタスクをまとめて削除する
+def deleteOverdueTasks():
+    try:
+        service = getTasksService()
+        targets = _overdueTasks(listTasksAcross(service, show_completed=False))
+        if not targets:
+            return "期限切れのタスクはありません。"
+
+        succeeded = _executeBatch(service, [
+            (task["id"], service.tasks().delete(tasklist=tasklist_id, task=task["id"]))
+            for tasklist_id, task in targets
+        ])
+
+        deleted = {}
+        for tasklist_id, task in targets:
+            if task["id"] in succeeded:
+                _task_index.remove(task["id"])
+                deleted.setdefault(tasklist_id, []).append({"id": task["id"], "deleted": True})
+        for tasklist_id, tasks in deleted.items():
+            sync_utils.publishTasks(tasklist_id, tasks)
+
+        print(f"✅ まとめて削除：{len(succeeded)}/{len(targets)} 件")
+        return f"期限切れのタスクを{len(succeeded)}件削除しました。" + \
+            (f"（{len(targets) - len(succeeded)}件は失敗）" if len(succeeded) < len(targets) else "")
+
+    except Exception as e:
+        print("❌ まとめて削除エラー：", e)
+        return "タスク削除中にエラーが発生しました。"
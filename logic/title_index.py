@@ -0,0 +1,109 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+# 🔤 タスク名・予定名の文字 n-gram インデックス
+#    └─ 「レポート提出」と「レポートを提出する」のような LLM のタイトルゆらぎを吸収するための類似検索
+#       取得済みの一覧から差分だけ登録し、検索は転置インデックスの集計だけで済ませる
+
+_JUNK_WORDS = ("の予定", "の予約", "予約", "のタスク", "タスク")
+_PAT_SYMBOLS = re.compile(r"[\s、。・,.!?！？「」『』()（）]")
+
+# 🧹 比較用にタイトルを正規化（全角半角・大文字小文字・記号・定型語をそろえる）
+def normalizeTitle(title):
+    text = unicodedata.normalize("NFKC", title or "").lower()
+    for junk in _JUNK_WORDS:
+        text = text.replace(junk, "")
+    return _PAT_SYMBOLS.sub("", text)
+
+# 🎚️ 類似度のしきい値（TITLE_MATCH_THRESHOLD、既定 0.5）
+def matchThreshold():
+    return float(os.getenv("TITLE_MATCH_THRESHOLD", "0.5"))
+
+class TitleIndex:
+    def __init__(self, n=2):
+        self.n = n
+        self._titles = {}                 # key → 正規化済みタイトル
+        self._grams = {}                  # key → n-gram 集合
+        self._postings = defaultdict(set)  # n-gram → key 集合
+        self._lock = threading.Lock()
+
+    def _ngrams(self, text):
+        if len(text) <= self.n:
+            return {text} if text else set()
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def _removeLocked(self, key):
+        for gram in self._grams.pop(key, ()):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+        self._titles.pop(key, None)
+
+    # ➕ 1件登録（タイトルが変わっていなければ何もしない）
+    def add(self, key, title):
+        normalized = normalizeTitle(title)
+        with self._lock:
+            if self._titles.get(key) == normalized:
+                return
+            self._removeLocked(key)
+            grams = self._ngrams(normalized)
+            self._titles[key] = normalized
+            self._grams[key] = grams
+            for gram in grams:
+                self._postings[gram].add(key)
+
+    # ➖ 1件削除
+    def remove(self, key):
+        with self._lock:
+            self._removeLocked(key)
+
+    # 🔄 取得した一覧（{key: タイトル}）を差分反映（prune=True なら一覧にない key を削除）
+    def sync(self, items, prune=False):
+        for key, title in items.items():
+            self.add(key, title)
+        if prune:
+            with self._lock:
+                for key in [k for k in self._titles if k not in items]:
+                    self._removeLocked(key)
+
+    # 🔍 類似度順に (スコア, key) を返す（Dice係数と問い合わせ側の一致率の平均、部分一致は加点）
+    def search(self, query, limit=5, threshold=0.0, candidates=None):
+        normalized = normalizeTitle(query)
+        query_grams = self._ngrams(normalized)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            overlap = defaultdict(int)
+            for gram in query_grams:
+                for key in self._postings.get(gram, ()):
+                    if candidates is None or key in candidates:
+                        overlap[key] += 1
+
+            scored = []
+            for key, shared in overlap.items():
+                title = self._titles[key]
+                dice = 2 * shared / (len(query_grams) + len(self._grams[key]))
+                score = (dice + shared / len(query_grams)) / 2
+                if title == normalized:
+                    score = 1.0
+                elif normalized in title or title in normalized:
+                    # 一方がもう一方を含む場合は長さの比で下限を引き上げる
+                    score = max(score, min(len(title), len(normalized)) / max(len(title), len(normalized)) + 0.2)
+                score = min(score, 1.0)
+                if score >= threshold:
+                    scored.append((score, key))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+    # 🎯 最も近い key を1件だけ返す（しきい値未満なら None）
+    def best(self, query, threshold=None, candidates=None):
+        results = self.search(query, limit=1, threshold=matchThreshold() if threshold is None else threshold,
+                              candidates=candidates)
+        return results[0][1] if results else None
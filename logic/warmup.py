@@ -0,0 +1,62 @@
+import os
+import time
+
+# 🔥 ワーカー起動時のウォームアップ
+#    └─ 重いモジュールの import・トークンのリフレッシュ・TLS接続の確立を最初のメッセージより前に済ませる
+#       WARMUP_NETWORK=0 のときは import とクライアント生成だけ行い、外部APIには接続しない
+
+def warmUp():
+    started = time.perf_counter()
+    network = os.getenv("WARMUP_NETWORK", "1") == "1"
+    timings = {}
+
+    def step(name, func):
+        step_started = time.perf_counter()
+        try:
+            func()
+        except Exception as error:
+            # ウォームアップの失敗で起動を止めない（本番の初回リクエストで改めて処理される）
+            print(f"⚠️ ウォームアップ失敗（{name}）：", error)
+        timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    def importLogic():
+        import logic.chatgpt_logic  # noqa: F401 （calendar_utils / task_utils / pytz / dateutil をまとめて読み込む）
+
+    def importLine():
+        # 返信用 Messaging API クライアント（プロセスで共有するものをここで作っておく）
+        from logic.line_client import getMessagingApi
+        getMessagingApi()
+
+    def warmOpenAI():
+        from logic.chatgpt_logic import getOpenAIClient
+        client = getOpenAIClient()
+        if network:
+            client.models.retrieve("gpt-3.5-turbo")
+
+    def warmCalendar():
+        from logic.calendar_utils import getCalendarService
+        service = getCalendarService()
+        calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+        if network and calendar_id:
+            service.calendars().get(calendarId=calendar_id).execute()
+
+    def warmTasks():
+        from logic.task_utils import getTasksService
+        service = getTasksService()
+        if network:
+            service.tasklists().list(maxResults=1).execute()
+
+    def loadIntentModel():
+        from logic import intent_model
+        intent_model.load()
+
+    step("import", importLogic)
+    step("intent_model", loadIntentModel)
+    step("line", importLine)
+    step("openai", warmOpenAI)
+    step("calendar", warmCalendar)
+    step("tasks", warmTasks)
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    print("🔥 ウォームアップ完了（ms）：", timings)
+    return timings
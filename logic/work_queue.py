@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+# 📮 SQLite（WALモード）によるディスク上の作業キュー
+#    └─ Webhook で受けたメッセージをまず書き込み、処理はワーカーがリース付きで取り出す
+#       ワーカーが途中で落ちてもリース期限（可視性タイムアウト）が切れれば別のワーカーが再取得する（at-least-once）
+#       同じホストの複数プロセス・複数スレッドから同時に使える（取り出しは BEGIN IMMEDIATE で排他）
+
+QUEUE_PATH = os.getenv("WORK_QUEUE_PATH") or "work_queue.db"
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key    TEXT UNIQUE,
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL NOT NULL,
+    lease_owner   TEXT,
+    lease_until   REAL,
+    result        TEXT,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+"""
+
+def visibilityTimeout():
+    return float(os.getenv("WORK_QUEUE_VISIBILITY_TIMEOUT", "300"))
+
+def maxAttempts():
+    return int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "5"))
+
+# 🔌 スレッド・プロセスごとの接続（fork 後は作り直す）
+def getConnection():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+# 🆔 リース所有者ID（プロセスID＋スレッド＋ランダム）
+def newOwnerId():
+    return f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}"
+
+# 📥 ジョブを追加（dedupe_key が同じジョブは追加しない＝Webhookの再送対策）
+def enqueue(payload, dedupe_key=None):
+    now = time.time()
+    cursor = getConnection().execute(
+        "INSERT OR IGNORE INTO jobs (dedupe_key, payload, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (dedupe_key, json.dumps(payload, ensure_ascii=False), now, now, now)
+    )
+    if cursor.rowcount == 0:
+        print("♻️ 重複したジョブのため追加しません：", dedupe_key)
+        return None
+    return cursor.lastrowid
+
+def _toJob(row):
+    return {
+        "id": row["id"],
+        "payload": json.loads(row["payload"]),
+        "attempts": row["attempts"],
+        "result": json.loads(row["result"]) if row["result"] else None
+    }
+
+# 📤 実行可能なジョブを最大 batch_size 件まとめてリース（期限切れのリースも再取得対象）
+#    └─ リース切れ＝処理中にワーカーごと落ちたジョブは fail() を通らないので、ここで試行回数を確かめて dead にする
+def dequeue(owner, batch_size=1, visibility_timeout=None):
+    visibility_timeout = visibility_timeout or visibilityTimeout()
+    conn = getConnection()
+    now = time.time()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        dead = conn.execute(
+            "UPDATE jobs SET status = 'dead', lease_owner = NULL, lease_until = NULL, "
+            "last_error = COALESCE(last_error, 'lease expired'), updated_at = ? "
+            "WHERE status = 'leased' AND lease_until <= ? AND attempts >= ?",
+            (now, now, maxAttempts())
+        ).rowcount
+        if dead:
+            print(f"💀 リース切れのまま再試行上限に達したジョブを {dead} 件 dead にしました")
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+            "OR (status = 'leased' AND lease_until <= ?) ORDER BY id LIMIT ?",
+            (now, now, batch_size)
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(owner, now + visibility_timeout, now, row["id"]) for row in rows]
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    jobs = [_toJob(row) for row in rows]
+    for job in jobs:
+        job["attempts"] += 1
+    return jobs
+
+# ⏳ リースを延長（処理が長引くとき）。他のワーカーに取られていたら False
+def extendLease(job_id, owner, visibility_timeout=None):
+    visibility_timeout = visibility_timeout or visibilityTimeout()
+    now = time.time()
+    cursor = getConnection().execute(
+        "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+        (now + visibility_timeout, now, job_id, owner)
+    )
+    return cursor.rowcount == 1
+
+# 💾 途中結果を保存（再実行時に副作用のある処理を繰り返さないため）。リースも延長する
+def saveResult(job_id, owner, result, visibility_timeout=None):
+    visibility_timeout = visibility_timeout or visibilityTimeout()
+    now = time.time()
+    cursor = getConnection().execute(
+        "UPDATE jobs SET result = ?, lease_until = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+        (json.dumps(result, ensure_ascii=False), now + visibility_timeout, now, job_id, owner)
+    )
+    return cursor.rowcount == 1
+
+# ✅ 完了
+def complete(job_id, owner):
+    cursor = getConnection().execute(
+        "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_until = NULL, updated_at = ? "
+        "WHERE id = ? AND lease_owner = ?",
+        (time.time(), job_id, owner)
+    )
+    return cursor.rowcount == 1
+
+# ❌ 失敗（指数バックオフで再キュー、上限回数を超えたら dead）
+def fail(job_id, owner, error):
+    conn = getConnection()
+    row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)).fetchone()
+    if row is None:
+        return False
+
+    now = time.time()
+    if row["attempts"] >= maxAttempts():
+        status, available_at = "dead", now
+        print(f"💀 ジョブ {job_id} は再試行上限に達しました：{error}")
+    else:
+        status, available_at = "queued", now + min(300, 2 ** row["attempts"])
+    conn.execute(
+        "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_until = NULL, last_error = ?, "
+        "updated_at = ? WHERE id = ? AND lease_owner = ?",
+        (status, available_at, str(error), now, job_id, owner)
+    )
+    return True
+
+# 🧹 完了済みジョブを削除（dedupe_key の保持期間を兼ねる）
+def purgeDone(older_than_seconds=86400):
+    cursor = getConnection().execute(
+        "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (time.time() - older_than_seconds,)
+    )
+    return cursor.rowcount
+
+# 📊 状態ごとの件数
+def stats():
+    rows = getConnection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+# 🔁 ワーカーのループ：まとめて取り出し、ジョブごとに handler(job, owner) を実行
+#    └─ handler が正常終了すれば完了、例外なら再キュー。stop_event がセットされたら終了
+def runWorker(handler, batch_size=None, poll_interval=None, stop_event=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    batch_size = batch_size or int(os.getenv("WORK_QUEUE_BATCH", "4"))
+    poll_interval = poll_interval or float(os.getenv("WORK_QUEUE_POLL_INTERVAL", "0.5"))
+    stop_event = stop_event or threading.Event()
+    owner = newOwnerId()
+    last_purge = 0.0
+    inflight = set()
+    inflight_lock = threading.Lock()
+
+    # 処理中のジョブのリースを可視性タイムアウトの 1/3 ごとに延長（長い処理が他のワーカーに再取得されないように）
+    def heartbeat():
+        while not stop_event.wait(visibilityTimeout() / 3):
+            with inflight_lock:
+                job_ids = list(inflight)
+            for job_id in job_ids:
+                try:
+                    if not extendLease(job_id, owner):
+                        print(f"⚠️ ジョブ {job_id} のリースを延長できませんでした（他のワーカーに取られた可能性）")
+                except sqlite3.Error as error:
+                    print("❌ リース延長エラー：", error)
+
+    def run(job):
+        with inflight_lock:
+            inflight.add(job["id"])
+        try:
+            handler(job, owner)
+            complete(job["id"], owner)
+        except Exception as error:
+            print(f"❌ ジョブ {job['id']} の処理エラー（{job['attempts']}回目）：", error)
+            fail(job["id"], owner, error)
+        finally:
+            with inflight_lock:
+                inflight.discard(job["id"])
+
+    threading.Thread(target=heartbeat, name="queue-heartbeat", daemon=True).start()
+    print(f"📮 キューワーカー開始：{owner}（batch={batch_size}）")
+    with ThreadPoolExecutor(max_workers=batch_size) as pool:
+        while not stop_event.is_set():
+            try:
+                jobs = dequeue(owner, batch_size)
+                if time.time() - last_purge > 3600:
+                    purgeDone()
+                    last_purge = time.time()
+            except sqlite3.Error as error:
+                print("❌ キュー取り出しエラー：", error)
+                jobs = []
+
+            if not jobs:
+                stop_event.wait(poll_interval)
+                continue
+            list(pool.map(run, jobs))
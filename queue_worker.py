@@ -0,0 +1,55 @@
+import signal
+import argparse
+import threading
+import multiprocessing
+from dotenv import load_dotenv
+
+# 📮 作業キュー（work_queue.db）のワーカーを別プロセスで起動するスクリプト
+#    └─ Webhook サーバ（app.py）は WORK_QUEUE_ENABLED=1 のときメッセージをキューに積むだけになり、
+#       処理はこのスクリプトのプロセス（と app.py 内の WORK_QUEUE_THREADS 本のスレッド）が分担する
+#    例：python queue_worker.py --processes 4 --batch 4
+#        python queue_worker.py --stats
+
+load_dotenv()
+
+def runProcess(batch_size):
+    from logic import work_queue
+    from logic.message_worker import handleMessageJob
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    work_queue.runWorker(handleMessageJob, batch_size=batch_size, stop_event=stop_event)
+
+def main():
+    parser = argparse.ArgumentParser(description="作業キューのワーカー")
+    parser.add_argument("--processes", type=int, default=1, help="起動するワーカープロセス数")
+    parser.add_argument("--batch", type=int, default=None, help="1回に取り出すジョブ数（WORK_QUEUE_BATCH）")
+    parser.add_argument("--stats", action="store_true", help="状態ごとのジョブ件数を表示して終了")
+    args = parser.parse_args()
+
+    if args.stats:
+        from logic import work_queue
+        print(work_queue.stats())
+        return
+
+    if args.processes <= 1:
+        runProcess(args.batch)
+        return
+
+    processes = [
+        multiprocessing.Process(target=runProcess, args=(args.batch,), name=f"queue-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+if __name__ == "__main__":
+    main()
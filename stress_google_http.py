@@ -0,0 +1,188 @@
+import re
+import sys
+import gzip
+import json
+import time
+import argparse
+import threading
+import statistics
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+# 🧪 Google API 用 HTTP トランスポート（logic/google_http.py）の同時実行ストレステスト
+#    └─ 手元に Calendar API 風の偽サーバ（keep-alive・gzip 対応）を立て、多数のスレッドから同時に呼び出して
+#       ・応答の取り違えがないか（リクエストごとの番号が一致するか）
+#       ・gzip が展開されているか
+#       ・張った接続数がプールサイズ以下か（keep-alive で使い回されているか）
+#       を確認する。googleapiclient が入っていれば、その HttpRequest 経由でも呼び出す
+#    例：python stress_google_http.py --threads 32 --requests 50 --pool-size 8
+#        python stress_google_http.py --no-pool   （比較用：リクエストごとに新しい接続）
+#    失敗があれば終了コード1
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if self.server.delay_ms:
+            time.sleep(self.server.delay_ms / 1000)
+
+        body = json.dumps({
+            "kind": "calendar#events",
+            "summary": url.path,
+            "items": [{"id": query.get("n", [""])[0], "summary": "テスト予定" * 20}]
+        }, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+            with self.server.stats_lock:
+                self.server.gzipped += 1
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # 📦 バッチ（multipart/mixed）：パートごとに中のリクエストを読み、taskId に "missing" を含むものは 404 で返す
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8").replace("\r\n", "\n")
+        boundary = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", "")).group(1)
+
+        parts = []
+        for part in body.split("--" + boundary)[1:-1]:
+            headers, _, inner = part.strip("\n").partition("\n\n")
+            content_id = re.search(r"Content-ID: <(.+?)>", headers, re.IGNORECASE).group(1)
+            request_line = inner.splitlines()[0]
+            inner_body = inner.partition("\n\n")[2].strip()
+            if "missing" in request_line:
+                status, payload = "404 Not Found", {"error": {"code": 404, "message": "Not Found"}}
+            else:
+                status, payload = "200 OK", dict(json.loads(inner_body or "{}"), request=request_line)
+            parts.append(
+                f"--batch_fake\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                + json.dumps(payload, ensure_ascii=False) + "\r\n"
+            )
+        response = ("".join(parts) + "--batch_fake--\r\n").encode("utf-8")
+        with self.server.stats_lock:
+            self.server.batches += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/mixed; boundary=batch_fake")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            response = gzip.compress(response)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+def startServer(delay_ms):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCalendarHandler)
+    server.daemon_threads = True
+    server.delay_ms = delay_ms
+    server.connections = 0
+    server.gzipped = 0
+    server.batches = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="fake-google-api", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Google API 用 HTTP トランスポートのストレステスト")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="1スレッドあたりのリクエスト数")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=2, help="偽サーバの応答遅延")
+    parser.add_argument("--no-pool", action="store_true", help="比較用：リクエストごとに新しいセッション（接続）を使う")
+    args = parser.parse_args()
+
+    import requests
+    from logic import google_http
+
+    server = startServer(args.delay_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/calendar/v3/calendars/primary/events"
+
+    shared_http = google_http.PooledHttp(google_http.mountPool(requests.Session(), args.pool_size))
+    try:
+        from googleapiclient.http import HttpRequest
+        from googleapiclient.model import JsonModel
+    except ImportError:
+        HttpRequest = None
+        print("ℹ️ googleapiclient が見つからないため、PooledHttp を直接呼び出します")
+
+    failures = []
+    latencies = []
+    stats_lock = threading.Lock()
+
+    def call(n):
+        http = shared_http
+        if args.no_pool:
+            http = google_http.PooledHttp(google_http.mountPool(requests.Session(), 1))
+        uri = f"{base_url}?n={n}"
+
+        started = time.perf_counter()
+        try:
+            if HttpRequest is not None and n % 2 == 0:
+                data = HttpRequest(http, JsonModel().response, uri, headers={"accept-encoding": "gzip"}).execute()
+            else:
+                resp, content = http.request(uri, "GET")
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+                data = json.loads(content.decode("utf-8"))
+            if data["items"][0]["id"] != str(n):
+                raise RuntimeError(f"応答の取り違え：{n} → {data['items'][0]['id']}")
+        except Exception as error:
+            with stats_lock:
+                failures.append((n, repr(error)))
+        finally:
+            if args.no_pool:
+                http.session.close()
+        with stats_lock:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    total = args.threads * args.requests
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies.sort()
+    print(json.dumps({
+        "requests": total,
+        "threads": args.threads,
+        "pool_size": None if args.no_pool else args.pool_size,
+        "failures": len(failures),
+        "connections": server.connections,
+        "gzipped": server.gzipped,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2)
+    }, ensure_ascii=False, indent=2))
+
+    for n, error in failures[:10]:
+        print(f"❌ {n}: {error}")
+    if failures:
+        sys.exit(1)
+    if not args.no_pool and server.connections > args.pool_size:
+        print(f"❌ 接続数 {server.connections} がプールサイズ {args.pool_size} を超えました")
+        sys.exit(1)
+    if server.gzipped < total:
+        print(f"❌ gzip で返った応答が {server.gzipped}/{total} 件でした")
+        sys.exit(1)
+    print("✅ ストレステスト成功")
+
+if __name__ == "__main__":
+    main()
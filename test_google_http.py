@@ -0,0 +1,70 @@
+import json
+import pytest
+
+# 🧪 Google API 用 HTTP トランスポート（logic/google_http.py）経由のバッチリクエスト
+#    └─ stress_google_http.py の偽サーバに multipart/mixed のバッチを送り、task_utils._executeBatch が
+#       パートごとの成功・失敗（404）を正しく振り分けられるか、gzip の応答を展開できるかを確認する
+#    例：python -m pytest -q test_google_http.py
+
+requests = pytest.importorskip("requests")
+googleapiclient_http = pytest.importorskip("googleapiclient.http")
+from googleapiclient.model import JsonModel
+
+from stress_google_http import startServer
+from logic import google_http
+
+class _BatchService:
+    # _executeBatch が使う new_batch_http_request だけを持つ、偽サーバ宛てのサービス
+    def __init__(self, batch_uri):
+        self.batch_uri = batch_uri
+
+    def new_batch_http_request(self, callback=None):
+        return googleapiclient_http.BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+
+@pytest.fixture
+def server():
+    server = startServer(0)
+    yield server
+    server.shutdown()
+
+def test_execute_batch_through_pooled_http(server, monkeypatch):
+    from logic import task_utils
+
+    monkeypatch.setenv("TASKS_BATCH_SIZE", "3")
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    http = google_http.PooledHttp(google_http.mountPool(requests.Session(), 2))
+
+    def patch(task_id):
+        return googleapiclient_http.HttpRequest(
+            http, JsonModel().response, f"{base_url}/tasks/v1/lists/list1/tasks/{task_id}",
+            method="PATCH", body=json.dumps({"status": "completed", "title": "牛乳を買う"}),
+            headers={"content-type": "application/json"}
+        )
+
+    task_ids = ["t1", "t2", "missing1", "t3", "t4"]
+    succeeded = task_utils._executeBatch(_BatchService(f"{base_url}/batch/tasks/v1"),
+                                         [(task_id, patch(task_id)) for task_id in task_ids])
+
+    assert succeeded == {"t1", "t2", "t3", "t4"}
+    assert server.batches == 2            # TASKS_BATCH_SIZE=3 件ずつ
+    assert server.connections <= 2        # プール内の接続を使い回す
+
+def test_batch_response_is_decoded(server):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    http = google_http.PooledHttp(google_http.mountPool(requests.Session(), 1))
+    results = {}
+
+    batch = googleapiclient_http.BatchHttpRequest(
+        callback=lambda request_id, response, exception: results.setdefault(request_id, (response, exception)),
+        batch_uri=f"{base_url}/batch/tasks/v1"
+    )
+    batch.add(googleapiclient_http.HttpRequest(
+        http, JsonModel().response, f"{base_url}/tasks/v1/lists/list1/tasks/a",
+        method="PATCH", body=json.dumps({"title": "会議の資料"}), headers={"content-type": "application/json"}
+    ), request_id="a")
+    batch.execute()
+
+    response, exception = results["a"]
+    assert exception is None
+    assert response["title"] == "会議の資料"
+    assert response["request"].startswith("PATCH /tasks/v1/lists/list1/tasks/a")
@@ -0,0 +1,37 @@
+from logic.recurrence import parseRecurrence
+
+# 🧪 繰り返し予定の言い回しの解析（logic/recurrence.py）
+#    例：python -m pytest -q test_recurrence.py  または  python test_recurrence.py
+
+def test_weekly_with_every_prefix():
+    # 「毎日曜」は毎日ではなく毎週日曜（「毎日」が先頭に当たってタイトルが「曜にジム」になっていた）
+    result = parseRecurrence("毎日曜10時にジム")
+    assert result["rrule"] == "FREQ=WEEKLY;BYDAY=SU"
+    assert result["label"] == "毎週日曜"
+    assert (result["hour"], result["minute"]) == (10, 0)
+    assert result["title"] == "ジム"
+
+    assert parseRecurrence("毎月曜9時半に朝会")["rrule"] == "FREQ=WEEKLY;BYDAY=MO"
+    assert parseRecurrence("毎水曜日19時に英会話")["title"] == "英会話"
+
+def test_daily_and_weekly():
+    result = parseRecurrence("毎日7時にストレッチ")
+    assert result["rrule"] == "FREQ=DAILY"
+    assert result["title"] == "ストレッチ"
+
+    assert parseRecurrence("毎週月・水10時に定例")["rrule"] == "FREQ=WEEKLY;BYDAY=MO,WE"
+    assert parseRecurrence("隔週金曜15時に1on1")["rrule"] == "FREQ=WEEKLY;INTERVAL=2;BYDAY=FR"
+
+def test_monthly_rules_take_precedence():
+    assert parseRecurrence("毎月第2火曜10時に定例")["rrule"] == "FREQ=MONTHLY;BYDAY=2TU"
+    assert parseRecurrence("毎月25日9時に振込")["rrule"] == "FREQ=MONTHLY;BYMONTHDAY=25"
+
+def test_requires_time():
+    assert parseRecurrence("毎日曜にジム") is None
+    assert parseRecurrence("毎日曜にジム", require_time=False)["rrule"] == "FREQ=WEEKLY;BYDAY=SU"
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print("✅", name)
@@ -0,0 +1,48 @@
+import json
+import time
+import argparse
+
+# 🏋️ 意図分類モデルの学習（fixtures/intent_corpus.jsonl → models/intent_model.json）
+#    └─ 文字 n-gram ＋ ロジスティック回帰を標準ライブラリだけで学習し、評価用の分（約2割）の結果も表示する
+#       コーパスに発言を追加したら再学習して、models/intent_model.json をコミットする
+#    例：python train_intent_model.py
+#        python train_intent_model.py --epochs 40 --all   （評価用の分も含めて全件で学習）
+
+def main():
+    parser = argparse.ArgumentParser(description="意図分類モデルの学習")
+    parser.add_argument("--corpus", default="fixtures/intent_corpus.jsonl")
+    parser.add_argument("--out", help="保存先（省略時は INTENT_MODEL_PATH / models/intent_model.json）")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--all", action="store_true", help="評価用の分も学習に使う")
+    args = parser.parse_args()
+
+    from logic import intent_model
+    from eval_intent_model import loadCorpus, splitCorpus, evaluate
+
+    cases = loadCorpus(args.corpus)
+    training = cases if args.all else splitCorpus(cases, "train")
+    unknown = {case["label"] for case in cases} - set(intent_model.LABELS)
+    if unknown:
+        raise SystemExit(f"❌ 未知のラベル：{sorted(unknown)}")
+
+    started = time.perf_counter()
+    model = intent_model.IntentModel(intent_model.LABELS).fit(
+        [case["text"] for case in training], [case["label"] for case in training],
+        epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2
+    )
+    print(f"🏋️ 学習完了：{len(training)} 件 / {time.perf_counter() - started:.1f} 秒 / 特徴量 {len(model.weights)} 件")
+
+    out = args.out or intent_model.modelPath()
+    model.save(out)
+    print("💾 保存：", out)
+
+    # 保存したファイルを読み直して評価（丸めた重みでの結果を確認する）
+    saved = intent_model.IntentModel.load(out)
+    for split in (["all"] if args.all else ["train", "holdout"]):
+        result = evaluate(saved, splitCorpus(cases, split), intent_model.threshold())
+        print(f"📊 {split}:", json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()